@@ -1,41 +1,315 @@
-from flask import request
+import contextvars
+import functools
+import hashlib
+import inspect
+import itertools
+import json
+import logging
+import os
+import time
+import weakref
+
+from flask import Response, request, stream_with_context
 import pyard
+from pyard import metrics
 from pyard.blender import DRBXBlenderError
+from pyard.cache import create_cache
+from pyard.constants import VALID_REDUCTION_MODES
 from pyard.exceptions import PyArdError, InvalidAlleleError
+from pyard.misc import validate_reduction_type
+from pyard.pool import VersionNotAvailableError
 
 # Globally accessible for all endpoints
 global ard
+# IMGT version of ard, read once at startup
+global ipd_version
+# ARD instances of the IMGT versions requests can select
+global ard_pool
+
+logger = logging.getLogger(__name__)
+
+# Number of /redux-batch items reduced together
+REDUX_BATCH_CHUNK_SIZE = 1000
+
+# Best Accept mimetype of the request when called outside of a Flask request
+# e.g. from the async app
+request_mimetype = contextvars.ContextVar("request_mimetype", default=None)
+# If-None-Match header of the request and function creating the responses,
+# when called outside of a Flask request
+request_if_none_match = contextvars.ContextVar("request_if_none_match", default=None)
+response_factory = contextvars.ContextVar("response_factory", default=None)
+
+# Serialized responses of the endpoints that only depend on their input and
+# the IMGT version, by ETag
+RESPONSE_CACHE_SIZE = int(os.environ.get("PYARD_RESPONSE_CACHE_SIZE", 10000))
+# Seconds clients and CDNs can use a response before revalidating it
+RESPONSE_MAX_AGE = int(os.environ.get("PYARD_RESPONSE_MAX_AGE", 3600))
+response_cache = create_cache("lru", RESPONSE_CACHE_SIZE)
+# IMGT version, py-ard version and config hash of each ARD for the response keys
+_ard_response_keys = weakref.WeakKeyDictionary()
+
+# Metrics of the requests, served at /metrics when PYARD_METRICS is set
+metrics_enabled = os.environ.get("PYARD_METRICS", "").lower() in ("1", "true", "yes")
+REQUESTS = metrics.Counter(
+    "pyard_requests_total",
+    "Requests by endpoint, reduction method and status",
+    ("endpoint", "reduction_method", "status"),
+)
+REQUEST_SECONDS = metrics.Histogram(
+    "pyard_request_duration_seconds",
+    "Request latency by endpoint and reduction method",
+    ("endpoint", "reduction_method"),
+)
+ERRORS = metrics.Counter(
+    "pyard_errors_total", "py-ard errors by exception type", ("type",)
+)
+
+
+def _env_versions(name):
+    return [v.strip() for v in os.environ.get(name, "").split(",") if v.strip()]
 
 
 def init_pyard():
-    global ard
+    global ard, ipd_version, ard_pool
     print("py-ard version: ", pyard.__version__)
-    ard = pyard.init()
-    print("IMGT version:   ", ard.get_db_version())
+    # Versions loaded at startup, e.g. before gunicorn forks the workers
+    preload_versions = _env_versions("PYARD_PRELOAD_VERSIONS")
+    versions = _env_versions("PYARD_IPD_VERSIONS")
+    memory_budget = os.environ.get("PYARD_MEMORY_BUDGET_MB")
+    ard_pool = pyard.ARDPool(
+        versions=None if versions == ["*"] else versions + preload_versions,
+        max_versions=int(os.environ.get("PYARD_MAX_VERSIONS", 4)),
+        memory_budget=int(memory_budget) * 2**20 if memory_budget else None,
+    )
+    ard_pool.preload(preload_versions)
+    ard = ard_pool.get()
+    ipd_version = ard.get_db_version()
+    print("IMGT version:   ", ipd_version)
+    if len(ard_pool.loaded_versions()) > 1:
+        print("Loaded versions:", ", ".join(sorted(ard_pool.loaded_versions())))
+
+
+def versioned_ard(version=None):
+    """
+    ARD instance and IMGT version requested, the default ones if version is None
+
+    :raises VersionNotAvailableError: if the version can't be requested
+    """
+    if version is None:
+        return ard, ipd_version
+    return ard_pool.entry(version)
+
+
+def best_mimetype():
+    mimetype = request_mimetype.get()
+    if mimetype is None:
+        return request.accept_mimetypes.best
+    return mimetype
+
+
+def if_none_match():
+    value = request_if_none_match.get()
+    if value is None:
+        return request.headers.get("If-None-Match", "")
+    return value
+
+
+def make_response(content, status, headers):
+    factory = response_factory.get()
+    if factory is None:
+        return Response(content, status, headers)
+    return factory(content, status, headers)
+
+
+def response_key(endpoint, arguments, version_ard) -> str:
+    """Key of a response of the endpoint in the response cache"""
+    ard_key = _ard_response_keys.get(version_ard)
+    if ard_key is None:
+        ard_key = _ard_response_keys[version_ard] = (
+            version_ard.get_db_version(),
+            pyard.__version__,
+            version_ard.config.config_hash(),
+        )
+    return json.dumps(
+        [endpoint, arguments, best_mimetype(), *ard_key], sort_keys=True, default=str
+    )
+
+
+def etag_matches(if_none_match_value: str, etag: str) -> bool:
+    if if_none_match_value.strip() == "*":
+        return True
+    for tag in if_none_match_value.split(","):
+        tag = tag.strip()
+        # If-None-Match uses the weak comparison
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _serialize(response):
+    body, _, *rest = response
+    headers = rest[0] if rest else {}
+    content = body if isinstance(body, str) else json.dumps(body)
+    return content, headers.get("Content-Type", "application/json")
+
+
+def cached_response(controller):
+    """
+    Serve the responses of the controller from the response cache
+
+    The responses get a strong ETag, the hash of the endpoint, its arguments,
+    the Accept mimetype, and the IMGT version, py-ard version and
+    configuration of the ARD used. Requests with the ETag in If-None-Match get
+    a 304 response. Only 200 responses are cached.
+    """
+    endpoint = controller.__name__.replace("_controller", "")
+    parameter_names = list(inspect.signature(controller).parameters)
+
+    @functools.wraps(controller)
+    def wrapper(*args, **kwargs):
+        arguments = dict(zip(parameter_names, args), **kwargs)
+        version = arguments.pop("ipd_version", None)
+        if isinstance(arguments.get("body"), dict):
+            arguments["body"] = dict(arguments["body"])
+            version = arguments["body"].pop("ipd_version", None)
+        version_ard, _ = versioned_ard(version)
+        key = response_key(endpoint, arguments, version_ard)
+
+        # (ETag, content, content type)
+        cached = response_cache.get(key)
+        if cached is None:
+            etag = f'"{hashlib.sha256(key.encode()).hexdigest()}"'
+        else:
+            etag = cached[0]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={RESPONSE_MAX_AGE}",
+            "Vary": "Accept",
+        }
+        if etag_matches(if_none_match(), etag):
+            return make_response("", 304, headers)
+
+        if cached is None:
+            response = controller(*args, **kwargs)
+            if _status(response) != 200:
+                return response
+            cached = (etag, *_serialize(response))
+            response_cache.put(key, cached)
+        _, content, content_type = cached
+        return make_response(content, 200, {**headers, "Content-Type": content_type})
+
+    return wrapper
+
+
+def instrumented(controller):
+    """Record the requests of the endpoint in the metrics"""
+    endpoint = controller.__name__.replace("_controller", "")
+
+    @functools.wraps(controller)
+    def wrapper(*args, **kwargs):
+        if not metrics_enabled:
+            return controller(*args, **kwargs)
+        start = time.perf_counter()
+        status = 500
+        streamed = False
+        try:
+            response = controller(*args, **kwargs)
+            status = _status(response)
+            streamed = getattr(response, "is_streamed", False)
+            return response
+        finally:
+            reduction_method = _reduction_method(endpoint, args, kwargs)
+            if streamed:
+                # Recorded once the whole response is sent
+                response.call_on_close(
+                    functools.partial(
+                        record_request, endpoint, reduction_method, status, start
+                    )
+                )
+            else:
+                record_request(endpoint, reduction_method, status, start)
+
+    return wrapper
+
+
+def record_request(endpoint, reduction_method, status, start):
+    """Record a request that started at the `time.perf_counter()` start"""
+    if metrics_enabled:
+        REQUEST_SECONDS.observe(
+            (endpoint, reduction_method), time.perf_counter() - start
+        )
+        REQUESTS.inc((endpoint, reduction_method, str(status)))
+
+
+def with_ipd_version(controller):
+    """Answer 404 for the IMGT versions that aren't available"""
+
+    @functools.wraps(controller)
+    def wrapper(*args, **kwargs):
+        try:
+            return controller(*args, **kwargs)
+        except VersionNotAvailableError as e:
+            return {"message": str(e)}, 404
+
+    return wrapper
+
+
+def _reduction_method(endpoint, args, kwargs):
+    if endpoint == "ard":
+        return "lgx"
+    body = kwargs.get("body", args[0] if args else None)
+    # Only valid methods, so requests can't add labels
+    if isinstance(body, dict) and body.get("reduction_method") in VALID_REDUCTION_MODES:
+        return body["reduction_method"]
+    return ""
 
 
+def _status(response):
+    if isinstance(response, tuple):
+        return response[1] if len(response) > 1 else 200
+    return getattr(response, "status_code", 200)
+
+
+def count_error(error: PyArdError):
+    if metrics_enabled:
+        ERRORS.inc((type(error).__name__,))
+
+
+def error_response(error: PyArdError, status: int = 400):
+    count_error(error)
+    return {"message": error.message}, status
+
+
+@instrumented
+@with_ipd_version
 def validate_controller(body):
     if body:
         try:
             gl_string = body["gl_string"]
         except KeyError:
             return {"message": "gl_string not provided"}, 400
-        return validate_gl(gl_string)
+        return validate_gl(gl_string, body.get("ipd_version"))
 
 
-def valid_controller(gl_string: str):
-    return validate_gl(gl_string)
+@instrumented
+@with_ipd_version
+def valid_controller(gl_string: str, ipd_version: int = None):
+    return validate_gl(gl_string, ipd_version)
 
 
-def validate_gl(gl_string):
+def validate_gl(gl_string, version=None):
+    ard, _ = versioned_ard(version)
     try:
         ard.validate(gl_string)
-        if request.accept_mimetypes.best == "application/json":
+        if best_mimetype() == "application/json":
             return {"valid": True}, 200, {"Content-Type": "application/json"}
         else:
             return "true", 200, {"Content-Type": "text/plain"}
     except InvalidAlleleError as e:
-        if request.accept_mimetypes.best == "application/json":
+        count_error(e)
+        if best_mimetype() == "application/json":
             return (
                 {
                     "valid": False,
@@ -48,9 +322,12 @@ def validate_gl(gl_string):
         else:
             return "false", 404, {"Content-Type": "text/plain"}
     except PyArdError as e:
-        return {"message": e.message}, 400
+        return error_response(e)
 
 
+@instrumented
+@with_ipd_version
+@cached_response
 def redux_controller(body):
     if body:
         try:
@@ -58,32 +335,159 @@ def redux_controller(body):
             reduction_method = body["reduction_method"]
         except KeyError:
             return {"message": "gl_string and reduction_method not provided"}, 404
+        ard, version = versioned_ard(body.get("ipd_version"))
         # Perform redux
         try:
             redux_string = ard.redux(gl_string, reduction_method)
-            ipd_version = ard.get_db_version()
             return {
                 "ard": redux_string,
-                "ipd_version": ipd_version,
+                "ipd_version": version,
                 "pyard_version": pyard.__version__,
             }, 200
         except PyArdError as e:
-            return {"message": e.message}, 400
+            return error_response(e)
 
     # if no data is sent
     return {"message": "No input data provided"}, 404
 
 
-def ard_controller(allele):
+@instrumented
+def redux_batch_controller(body=None):
+    if isinstance(body, list):
+        items = body
+    elif request.mimetype == "application/x-ndjson":
+        # Connexion passes the bodies it doesn't parse as bytes
+        lines = body.splitlines() if isinstance(body, bytes) else request.stream
+        items = ndjson_items(lines)
+    else:
+        return {"message": "Provide a JSON array or NDJSON of items"}, 400
+
+    return Response(
+        stream_with_context(redux_batch_chunks(items)), 200, redux_batch_headers()
+    )
+
+
+def redux_batch_headers():
+    # X-IPD-Version is the default version, items can select another one
+    return {
+        "Content-Type": "application/x-ndjson",
+        "X-IPD-Version": str(ipd_version),
+        "X-Pyard-Version": pyard.__version__,
+    }
+
+
+def ndjson_items(lines):
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Reported as an invalid item
+                yield line
+
+
+def _batch_typing(item):
+    """Validate a /redux-batch item and return its typing or an error"""
+    if not isinstance(item, dict):
+        return None, "Item is not a JSON object"
+    gl_string = item.get("gl_string")
+    reduction_method = item.get("reduction_method")
+    if not isinstance(gl_string, str) or not isinstance(reduction_method, str):
+        return None, "gl_string and reduction_method not provided"
+    try:
+        validate_reduction_type(reduction_method)
+    except ValueError as e:
+        return None, str(e)
+    version = item.get("ipd_version")
+    if version is not None and not isinstance(version, (int, str)):
+        return None, "ipd_version is not a version number"
+    return (gl_string, reduction_method, version), None
+
+
+def _batch_redux(version_ard, gl_strings, reduction_method):
+    """Reductions of the GL Strings, or the error of each one that failed"""
+    try:
+        return version_ard.redux_many(gl_strings, reduction_method, return_errors=True)
+    except Exception:
+        logger.exception(
+            "Reducing a /redux-batch chunk with %s failed, reducing each item",
+            reduction_method,
+        )
+        # The response has started, so an item failing mustn't end the stream
+        results = []
+        for gl_string in gl_strings:
+            try:
+                results.append(version_ard.redux(gl_string, reduction_method))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def redux_batch_chunks(items):
+    """Reduce the items in chunks and yield the NDJSON results of each chunk"""
+    indexed_items = enumerate(items)
+    while True:
+        chunk = [
+            (index, *_batch_typing(item))
+            for index, item in itertools.islice(indexed_items, REDUX_BATCH_CHUNK_SIZE)
+        ]
+        if not chunk:
+            return
+
+        # Reduce each distinct typing of the chunk once
+        gl_strings = {}
+        for _, typing, _ in chunk:
+            if typing:
+                gl_string, reduction_method, version = typing
+                gl_strings.setdefault((reduction_method, version), {})[gl_string] = None
+        reduced = {}
+        for (reduction_method, version), method_gl_strings in gl_strings.items():
+            try:
+                version_ard, _ = versioned_ard(version)
+                results = _batch_redux(
+                    version_ard, list(method_gl_strings), reduction_method
+                )
+            except VersionNotAvailableError as e:
+                results = [e] * len(method_gl_strings)
+            for gl_string, result in zip(method_gl_strings, results):
+                reduced[(gl_string, reduction_method, version)] = result
+
+        lines = []
+        for index, typing, error in chunk:
+            line = {"index": index}
+            if typing:
+                line["gl_string"], line["reduction_method"], version = typing
+                if version is not None:
+                    line["ipd_version"] = version
+                result = reduced[typing]
+                if isinstance(result, PyArdError):
+                    count_error(result)
+                    line["message"] = result.message
+                elif isinstance(result, VersionNotAvailableError):
+                    line["message"] = str(result)
+                elif isinstance(result, Exception):
+                    line["message"] = f"{line['gl_string']} could not be reduced"
+                else:
+                    line["ard"] = result
+            else:
+                line["message"] = error
+            lines.append(json.dumps(line) + "\n")
+        yield "".join(lines)
+
+
+@instrumented
+@with_ipd_version
+@cached_response
+def ard_controller(allele, ipd_version: int = None):
+    ard, version = versioned_ard(ipd_version)
     # Perform redux in `lgx` mode
     if allele:
         try:
             redux_string = ard.redux(allele, "lgx")
-            if request.accept_mimetypes.best == "application/json":
-                ipd_version = ard.get_db_version()
+            if best_mimetype() == "application/json":
                 return (
                     {
-                        "ipd_version": ipd_version,
+                        "ipd_version": version,
                         "pyard_version": pyard.__version__,
                         "allele": allele,
                         "ard": redux_string,
@@ -94,16 +498,20 @@ def ard_controller(allele):
             else:
                 return redux_string, 200, {"Content-Type": "text/plain"}
         except PyArdError as e:
-            return {"message": e.message}, 400
+            return error_response(e)
     else:
         return {"message": "No allele provided"}, 404
 
 
-def xx_expand_controller(xx_code: str):
+@instrumented
+@with_ipd_version
+@cached_response
+def xx_expand_controller(xx_code: str, ipd_version: int = None):
+    ard, _ = versioned_ard(ipd_version)
     try:
         if ard.is_XX(xx_code):
             allele_list = ard.expand_xx(xx_code)
-            if request.accept_mimetypes.best == "application/json":
+            if best_mimetype() == "application/json":
                 return (
                     {
                         "xx_code": xx_code,
@@ -118,14 +526,18 @@ def xx_expand_controller(xx_code: str):
         else:
             return {"message": f"{xx_code} is not a valid XX Code"}, 404
     except PyArdError as e:
-        return {"message": e.message}, 400
+        return error_response(e)
 
 
-def mac_expand_controller(allele_code: str):
+@instrumented
+@with_ipd_version
+@cached_response
+def mac_expand_controller(allele_code: str, ipd_version: int = None):
+    ard, _ = versioned_ard(ipd_version)
     try:
         if ard.is_mac(allele_code):
             allele_list = ard.expand_mac(allele_code)
-            if request.accept_mimetypes.best == "application/json":
+            if best_mimetype() == "application/json":
                 return (
                     {
                         "mac": allele_code,
@@ -140,14 +552,17 @@ def mac_expand_controller(allele_code: str):
         else:
             return {"message": f"{allele_code} is not a valid MAC"}, 404
     except PyArdError as e:
-        return {"message": e.message}, 400
+        return error_response(e)
 
 
-def mac_hats_expand_controller(allele_code: str):
+@instrumented
+@with_ipd_version
+def mac_hats_expand_controller(allele_code: str, ipd_version: int = None):
+    ard, _ = versioned_ard(ipd_version)
     try:
         if ard.is_mac(allele_code):
             allele_list = ard.expand_mac_to_hats_alleles(allele_code)
-            if request.accept_mimetypes.best == "application/json":
+            if best_mimetype() == "application/json":
                 return (
                     {
                         "mac": allele_code,
@@ -162,11 +577,14 @@ def mac_hats_expand_controller(allele_code: str):
         else:
             return {"message": f"{allele_code} is not a valid MAC"}, 404
     except PyArdError as e:
-        return {"message": e.message}, 400
+        return error_response(e)
 
 
+@instrumented
+@with_ipd_version
 def mac_lookup_controller(body):
     if body:
+        ard, _ = versioned_ard(body.get("ipd_version"))
         try:
             allele_list = body["gl_string"]
             mac_code = ard.lookup_mac(allele_list)
@@ -176,9 +594,10 @@ def mac_lookup_controller(body):
                 "gl_string": allele_list,
             }, 200
         except PyArdError as e:
-            return {"message": e.message}, 400
+            return error_response(e)
 
 
+@instrumented
 def drbx_blender_controller(body):
     if body:
         try:
@@ -196,9 +615,9 @@ def drbx_blender_controller(body):
             return {"found": e.found, "expected": e.expected}
 
 
+@instrumented
 def version_controller():
-    ipd_version = ard.get_db_version()
-    if request.accept_mimetypes.best == "application/json":
+    if best_mimetype() == "application/json":
         return (
             {
                 "ipd_version": ipd_version,
@@ -211,7 +630,10 @@ def version_controller():
         return f"{ipd_version}/{pyard.__version__}", 200, {"Content-Type": "text/plain"}
 
 
-def splits_controller(allele: str):
+@instrumented
+@with_ipd_version
+def splits_controller(allele: str, ipd_version: int = None):
+    ard, _ = versioned_ard(ipd_version)
     mapping = ard.find_broad_splits(allele)
     if mapping:
         return {"broad": mapping[0], "splits": mapping[1]}, 200
@@ -219,17 +641,20 @@ def splits_controller(allele: str):
     return {"message": f"No Broad/Splits matched {allele}"}, 404
 
 
+@instrumented
+@with_ipd_version
 def cwd_redux_controller(body):
     if body:
         try:
             gl_string = body["gl_string"]
         except KeyError:
             return {"message": "gl_string and reduction_method not provided"}, 404
+        ard, _ = versioned_ard(body.get("ipd_version"))
         # Perform CWD redux
         try:
             cwd = ard.cwd_redux(gl_string)
         except PyArdError as e:
-            return {"message": e.message}, 400
+            return error_response(e)
 
         # If the cwd reduction is a single locus or empty
         if "/" in cwd:
@@ -246,10 +671,24 @@ def cwd_redux_controller(body):
     return {"message": "No input data provided"}, 404
 
 
-def similar_controller(allele_prefix: str):
+@instrumented
+@with_ipd_version
+@cached_response
+def similar_controller(allele_prefix: str, limit: int = None, ipd_version: int = None):
+    ard, _ = versioned_ard(ipd_version)
     if allele_prefix:
-        alleles = ard.similar_alleles(allele_prefix)
+        alleles = ard.similar_alleles(allele_prefix, limit)
         if alleles:
             return alleles, 200
         return {"message": "No similar alleles found."}, 400
     return {"message": "No input data provided"}, 404
+
+
+def metrics_controller():
+    if not metrics_enabled:
+        return {"message": "Metrics are not enabled"}, 404
+    return (
+        metrics.expose((REQUESTS, REQUEST_SECONDS, ERRORS), ard_pool.loaded_ards()),
+        200,
+        {"Content-Type": metrics.CONTENT_TYPE},
+    )
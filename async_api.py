@@ -0,0 +1,201 @@
+"""
+Async controllers of the REST service used by `async_app.py`.
+
+Each controller runs the matching controller of `api` in a bounded thread
+pool so the event loop stays free while reductions run. At most
+`MAX_PENDING` requests are running or waiting for a thread; further
+requests are answered right away with 503 instead of queueing.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from connexion import request
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+
+import api
+
+# Threads reducing typings in each worker process
+EXECUTOR_THREADS = int(os.environ.get("PYARD_EXECUTOR_THREADS", 4))
+# Requests running or waiting for a thread in each worker process
+MAX_PENDING = int(os.environ.get("PYARD_MAX_PENDING", 64))
+
+OVERLOADED_RESPONSE = (
+    {"message": "Too many requests in progress, retry later"},
+    503,
+    {"Retry-After": "1"},
+)
+
+# Created in the worker process on the first request
+_executor = None
+_pending = None
+
+
+class Overloaded(Exception):
+    pass
+
+
+def _limits():
+    global _executor, _pending
+    if _executor is None:
+        _executor = ThreadPoolExecutor(EXECUTOR_THREADS, thread_name_prefix="pyard")
+        _pending = asyncio.Semaphore(MAX_PENDING)
+    return _executor, _pending
+
+
+async def _offload(func, *args, wait: bool = False):
+    """
+    Run func in the thread pool
+
+    Raises Overloaded when MAX_PENDING calls are already pending, unless
+    wait is True.
+    """
+    executor, pending = _limits()
+    if pending.locked() and not wait:
+        raise Overloaded()
+    async with pending:
+        # The thread sees the context variables of the request e.g. the mimetype
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(context.run, func, *args)
+        )
+
+
+def _best_mimetype(accept: str) -> str:
+    """Mimetype of the Accept header with the highest quality"""
+    best_mimetype, best_quality = "", 0.0
+    for value in accept.split(","):
+        mimetype, *params = value.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        if mimetype.strip() and quality > best_quality:
+            best_mimetype, best_quality = mimetype.strip(), quality
+    return best_mimetype
+
+
+def _response(content, status, headers):
+    return Response(content, status, headers)
+
+
+def _set_request_context():
+    api.request_mimetype.set(_best_mimetype(request.headers.get("accept", "")))
+    api.request_if_none_match.set(request.headers.get("if-none-match", ""))
+    api.response_factory.set(_response)
+
+
+async def _call(controller, *args):
+    """Call an `api` controller in the thread pool"""
+    _set_request_context()
+    try:
+        return await _offload(controller, *args)
+    except Overloaded:
+        return OVERLOADED_RESPONSE
+
+
+async def validate_controller(body):
+    return await _call(api.validate_controller, body)
+
+
+async def valid_controller(gl_string: str, ipd_version: int = None):
+    return await _call(api.valid_controller, gl_string, ipd_version)
+
+
+async def redux_controller(body):
+    return await _call(api.redux_controller, body)
+
+
+async def redux_batch_controller(body=None):
+    start = time.perf_counter()
+    if isinstance(body, list):
+        items = body
+    elif request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        if not isinstance(body, bytes):
+            body = await request.body()
+        items = api.ndjson_items(body.splitlines())
+    else:
+        api.record_request("redux_batch", "", 400, start)
+        return {"message": "Provide a JSON array or NDJSON of items"}, 400
+
+    _, pending = _limits()
+    if pending.locked():
+        return OVERLOADED_RESPONSE
+    return StreamingResponse(
+        _stream_chunks(api.redux_batch_chunks(items)),
+        headers=api.redux_batch_headers(),
+        # Recorded once the whole response is sent
+        background=BackgroundTask(api.record_request, "redux_batch", "", 200, start),
+    )
+
+
+async def _stream_chunks(chunks):
+    # Once the response has started, each chunk waits for a thread
+    while True:
+        chunk = await _offload(next, chunks, None, wait=True)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def ard_controller(allele, ipd_version: int = None):
+    return await _call(api.ard_controller, allele, ipd_version)
+
+
+async def xx_expand_controller(xx_code: str, ipd_version: int = None):
+    return await _call(api.xx_expand_controller, xx_code, ipd_version)
+
+
+async def mac_expand_controller(allele_code: str, ipd_version: int = None):
+    return await _call(api.mac_expand_controller, allele_code, ipd_version)
+
+
+async def mac_hats_expand_controller(allele_code: str, ipd_version: int = None):
+    return await _call(api.mac_hats_expand_controller, allele_code, ipd_version)
+
+
+async def mac_lookup_controller(body):
+    return await _call(api.mac_lookup_controller, body)
+
+
+async def drbx_blender_controller(body):
+    # Blending doesn't use the reference data
+    return api.drbx_blender_controller(body)
+
+
+async def version_controller():
+    # The versions are read at startup
+    _set_request_context()
+    return api.version_controller()
+
+
+async def splits_controller(allele: str, ipd_version: int = None):
+    return await _call(api.splits_controller, allele, ipd_version)
+
+
+async def cwd_redux_controller(body):
+    return await _call(api.cwd_redux_controller, body)
+
+
+async def similar_controller(
+    allele_prefix: str, limit: int = None, ipd_version: int = None
+):
+    return await _call(api.similar_controller, allele_prefix, limit, ipd_version)
+
+
+async def metrics_controller():
+    return api.metrics_controller()
+
+
+def resolve_controller(operation_id: str):
+    """Async controller of an `api.<name>` operationId of api-spec.yaml"""
+    return globals()[operation_id.split(".")[-1]]
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+import connexion
+from connexion.resolver import Resolver
+from starlette.responses import RedirectResponse
+
+import async_api
+
+# Create the Connexion application instance with async controllers
+connexion_app = connexion.AsyncApp(__name__, specification_dir="./")
+connexion_app.add_api("api-spec.yaml", resolver=Resolver(async_api.resolve_controller))
+
+# Expose ASGI app for uvicorn/gunicorn with uvicorn workers
+app = connexion_app
+
+
+@app.route("/")
+async def index(request):
+    return RedirectResponse("/ui")
+
+
+if __name__ == "__main__":
+    # Run the application on port 8080
+    import api
+
+    api.init_pyard()
+    connexion_app.run(port=8080)
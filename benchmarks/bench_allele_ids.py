@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark the memory and lookups of the mappings stored as integer ID arrays.
+
+Loads the ARS, code and allele mappings from a reference database and
+compares the memory allocated for them as dicts and sets, and as
+`allele_ids` ID arrays, with the time to look up every key.
+
+    python benchmarks/bench_allele_ids.py ~/.py-ard/pyard-3580.sqlite3
+"""
+
+import argparse
+import sqlite3
+import time
+import tracemalloc
+from collections.abc import Mapping
+
+from pyard import db
+from pyard.allele_ids import encode_mappings
+
+
+def look_up_seconds(all_mappings) -> float:
+    start = time.perf_counter()
+    for mappings in all_mappings:
+        for table in mappings:
+            for key in table:
+                if isinstance(table, Mapping):
+                    table.get(key)
+                else:
+                    key in table
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("db_filename", help="reference database")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(f"file:{args.db_filename}?mode=ro", uri=True)
+    tracemalloc.start()
+    ars_mappings = db.load_ars_mappings(connection)
+    code_mappings, allele_group = db.load_code_mappings(connection)
+    dict_size = tracemalloc.get_traced_memory()[0]
+    dict_seconds = look_up_seconds((ars_mappings, code_mappings, allele_group))
+
+    _, *id_mappings = encode_mappings(ars_mappings, code_mappings, allele_group)
+    del ars_mappings, code_mappings, allele_group
+    ids_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    ids_seconds = look_up_seconds(id_mappings)
+    connection.close()
+
+    for label, size, seconds in (
+        ("dicts", dict_size, dict_seconds),
+        ("ID arrays", ids_size, ids_seconds),
+    ):
+        print(f"{label:>9}: {size / 2**20:6.1f} MB, lookups {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
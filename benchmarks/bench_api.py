@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Load test the REST service with concurrent POST /redux requests.
+
+Opens `--connections` keep-alive connections to a running service and
+sends requests for `--seconds`, then reports the throughput, the latency
+percentiles and the count of each response status. Compare the Flask app
+and the async app by running the same load against each:
+
+    gunicorn -c gunicorn_config.py app:app
+    python benchmarks/bench_api.py --connections 256 --seconds 30
+
+    gunicorn -c gunicorn_config.py async_app:app
+    python benchmarks/bench_api.py --connections 256 --seconds 30
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+import urllib.parse
+
+GL_STRINGS = [
+    "A*01:01+A*01:01^B*08:ASXJP+B*07:02^C*02:02+C*07:HTGM",
+    "A*02:01:01:01",
+    "B*15:01:01",
+    "DRB1*04:01/DRB1*04:02",
+    "A*24:XX+A*02:XX",
+]
+
+
+async def read_response(reader) -> int:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    content_length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            content_length = int(value)
+        elif name.lower() == "transfer-encoding" and "chunked" in value:
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(content_length)
+    return status
+
+
+async def client(url, redux_type, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            gl_string = GL_STRINGS[i % len(GL_STRINGS)]
+            i += 1
+            body = json.dumps(
+                {"gl_string": gl_string, "reduction_method": redux_type}
+            ).encode()
+            request = (
+                f"POST {url.path.rstrip('/')}/redux HTTP/1.1\r\n"
+                f"Host: {url.netloc}\r\n"
+                "Content-Type: application/json\r\n"
+                "Accept: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode()
+            start = time.perf_counter()
+            writer.write(request + body)
+            await writer.drain()
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    except (ConnectionError, asyncio.IncompleteReadError):
+        statuses["connection error"] += 1
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--redux-type", default="lgx")
+    args = parser.parse_args()
+
+    url = urllib.parse.urlsplit(args.url)
+    latencies = []
+    statuses = collections.Counter()
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(
+        *(
+            client(url, args.redux_type, deadline, latencies, statuses)
+            for _ in range(args.connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    throughput = len(latencies) / elapsed
+    print(f"{len(latencies)} requests in {elapsed:.1f} s: {throughput:.0f}/s")
+    if latencies:
+        print(
+            "latency ms: "
+            + ", ".join(
+                f"{label} {percentile(latencies, fraction) * 1000:.1f}"
+                for label, fraction in (
+                    ("p50", 0.5),
+                    ("p90", 0.9),
+                    ("p99", 0.99),
+                    ("p99.9", 0.999),
+                )
+            )
+            + f", max {latencies[-1] * 1000:.1f}"
+        )
+    print("statuses:", dict(statuses))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
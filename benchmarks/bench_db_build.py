@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark building the reference database with each simple_table backend.
+
+Builds a new database from an IPD-IMGT/HLA release with the "sqlite" and
+the "columnar" `simple_table.Table` backends. MAC codes aren't loaded. To
+time the build instead of the downloads, point IMGT_HLA_URL to a local
+copy of the release files, e.g. a fixture release laid out like the
+IMGTHLA repository:
+
+    IMGT_HLA_URL=file:///path/to/IMGTHLA/ python benchmarks/bench_db_build.py
+"""
+
+import argparse
+import contextlib
+import io
+import sqlite3
+import tempfile
+import time
+
+import pyard
+from pyard import simple_table
+
+
+def build_database(imgt_version: str, data_dir: str) -> str:
+    with contextlib.redirect_stdout(io.StringIO()):
+        pyard.init(imgt_version, data_dir=data_dir, load_mac=False, cache_size=1)
+    return f"{data_dir}/pyard-{imgt_version}.sqlite3"
+
+
+def table_counts(db_filename: str) -> dict:
+    conn = sqlite3.connect(db_filename)
+    tables = [
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    ]
+    counts = {
+        table: conn.execute(f"SELECT COUNT(*) FROM '{table}'").fetchone()[0]
+        for table in tables
+    }
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--imgt-version", default="Latest")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Building the {args.imgt_version} reference database")
+    counts = {}
+    for backend in simple_table.TABLE_BACKENDS:
+        simple_table.set_backend(backend)
+        times = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as data_dir:
+                start = time.perf_counter()
+                db_filename = build_database(args.imgt_version, data_dir)
+                times.append(time.perf_counter() - start)
+                counts[backend] = table_counts(db_filename)
+        print(f"{backend:>10}: {min(times):7.2f} s")
+
+    assert all(a_counts == counts["sqlite"] for a_counts in counts.values())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark the startup and memory of ARD loaded for some loci only.
+
+Initializes ARD for all loci and for the given loci, from an existing
+reference database, and compares the time to initialize and the memory
+allocated for the reference data.
+
+    python benchmarks/bench_loci.py --imgt-version 3580 --loci A B C DRB1
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import time
+import tracemalloc
+
+import pyard
+
+
+def init_ard(args, loci) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ard = pyard.init(
+            args.imgt_version,
+            data_dir=args.data_dir,
+            load_mac=False,
+            config={"loci": loci},
+            precompute_redux=args.precompute_redux,
+        )
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return ard, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--imgt-version", default="Latest")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--loci", nargs="+", default=["A", "B", "C", "DRB1"])
+    parser.add_argument("--precompute-redux", action="store_true")
+    args = parser.parse_args()
+
+    runs = (("all loci", ()), (" ".join(args.loci), args.loci))
+    # Build the database, the snapshot and the precomputed reductions of each
+    # configuration before timing
+    for _, loci in runs:
+        init_ard(args, loci)
+
+    for label, loci in runs:
+        ard, size, elapsed = init_ard(args, loci)
+        print(
+            f"{label:>16}: {len(ard.allele_group.alleles)} alleles, "
+            f"{size / 2**20:6.1f} MB, init {elapsed:.2f} s"
+        )
+        del ard
+
+
+if __name__ == "__main__":
+    main()
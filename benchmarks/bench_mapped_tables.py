@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark the memory of forked workers with and without mapped tables.
+
+Like gunicorn with `preload_app`, ARD is initialized in the parent and
+workers are forked from it. Each worker looks up every key of the ARS,
+code and allele mappings, and reports how much of its memory became
+private (Linux only, from /proc/self/smaps_rollup). With Python dicts the
+reference counts written by the lookups copy the pages of the mappings
+into each worker; with `mapped_tables=True` the pages stay shared.
+
+    python benchmarks/bench_mapped_tables.py --imgt-version 3440 --workers 4
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import time
+from collections.abc import Mapping
+
+import pyard
+
+
+def private_memory_kb() -> int:
+    with open("/proc/self/smaps_rollup") as smaps:
+        return sum(
+            int(line.split()[1])
+            for line in smaps
+            if line.startswith(("Private_Clean:", "Private_Dirty:"))
+        )
+
+
+def look_up_mappings(ard) -> int:
+    lookups = 0
+    for mappings in (ard.ars_mappings, ard.code_mappings, ard.allele_group):
+        for table in mappings:
+            for key in table:
+                if isinstance(table, Mapping):
+                    table.get(key)
+                else:
+                    key in table
+                lookups += 1
+    return lookups
+
+
+def worker(ard, write_fd: int):
+    before = private_memory_kb()
+    start = time.perf_counter()
+    lookups = look_up_mappings(ard)
+    elapsed = time.perf_counter() - start
+    after = private_memory_kb()
+    os.write(write_fd, f"{after - before} {lookups} {elapsed}\n".encode())
+    os._exit(0)
+
+
+def fork_workers(ard, n_workers: int) -> list:
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(n_workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            worker(ard, write_fd)
+        pids.append(pid)
+    os.close(write_fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as results:
+        return [line.split() for line in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--imgt-version", default="Latest")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for mapped_tables in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            ard = pyard.init(
+                args.imgt_version,
+                data_dir=args.data_dir,
+                load_mac=False,
+                mapped_tables=mapped_tables,
+            )
+        gc.collect()
+        results = fork_workers(ard, args.workers)
+        private_kb = [int(kb) for kb, _, _ in results]
+        lookups = int(results[0][1])
+        elapsed = max(float(seconds) for _, _, seconds in results)
+        mode = "mapped" if mapped_tables else "dict"
+        print(
+            f"{mode:>7}: {lookups} lookups in {elapsed:.2f} s, private memory "
+            f"per worker {sum(private_kb) / len(private_kb) / 1024:.1f} MB"
+        )
+        del ard
+
+
+if __name__ == "__main__":
+    main()
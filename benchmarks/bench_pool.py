@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark the memory of several IMGT versions loaded in an ARDPool.
+
+Loads the versions as separate ARD instances and in an ARDPool, which
+shares the reference data the versions have in common, and compares the
+memory allocated for them and the pool's estimate.
+
+    python benchmarks/bench_pool.py --imgt-versions 3560 3570 3580
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import time
+import tracemalloc
+
+import pyard
+
+
+def load(label, load_versions):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        loaded = load_versions()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:>10}: {size / 2**20:7.1f} MB, load {elapsed:.2f} s")
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--imgt-versions", nargs="+", required=True)
+    parser.add_argument("--data-dir", default=None)
+    args = parser.parse_args()
+
+    init_kwargs = {"data_dir": args.data_dir, "load_mac": False}
+    default_version, *versions = args.imgt_versions
+    # Build the databases and the snapshots before measuring
+    with contextlib.redirect_stdout(io.StringIO()):
+        for version in args.imgt_versions:
+            pyard.init(version, **init_kwargs)
+
+    ards = load(
+        "separate",
+        lambda: [pyard.init(version, **init_kwargs) for version in args.imgt_versions],
+    )
+    del ards
+
+    def load_pool():
+        pool = pyard.ARDPool(
+            default_version, max_versions=len(args.imgt_versions), **init_kwargs
+        )
+        pool.preload(versions)
+        return pool
+
+    pool = load("ARDPool", load_pool)
+    print(f"{'estimate':>10}: {pool.memory_size() / 2**20:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark simple_table.Table operations on a synthetic table.
+
+Times table construction, column assignment (`__setitem__`), `union`,
+`where_in` and `agg`. Construction and column assignment are compared
+to the row at a time INSERT/UPDATE statements they replace.
+
+    python benchmarks/bench_simple_table.py --rows 100000
+"""
+
+import argparse
+import random
+import timeit
+
+from pyard.simple_table import Table
+
+COLUMNS = ["Locus", "Allele", "Serology"]
+
+
+def synthetic_rows(n_rows: int):
+    """n_rows rows of Locus, Allele, Serology"""
+    rng = random.Random(0)
+    loci = ["A", "B", "C", "DRB1", "DQB1", "DPB1"]
+    rows = []
+    for i in range(n_rows):
+        locus = rng.choice(loci)
+        group = rng.randint(1, 99)
+        rows.append((locus, f"{group:02}:{i:05}", f"{locus}{group}"))
+    return rows
+
+
+def row_at_a_time_table(rows):
+    table = Table([], COLUMNS)
+    table._conn.execute(
+        "CREATE TABLE data (" + ", ".join(f"`{c}` TEXT" for c in COLUMNS) + ")"
+    )
+    for row in rows:
+        table._conn.execute("INSERT INTO data VALUES (?, ?, ?)", row)
+    table._conn.commit()
+    return table
+
+
+def row_at_a_time_setitem(table, column, values):
+    table._conn.execute(f"ALTER TABLE data ADD COLUMN `{column}` TEXT")
+    for i, value in enumerate(values):
+        table._conn.execute(
+            f"UPDATE data SET `{column}` = ? WHERE rowid = ?", (value, i + 1)
+        )
+    table._conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    table = Table(rows, COLUMNS)
+    other = Table(synthetic_rows(args.rows // 10), COLUMNS)
+    loci_alleles = table.concat_columns(["Locus", "Allele"]).to_list()
+    wanted_alleles = {allele for _, allele, _ in rows[::3]}
+
+    def new_column(t):
+        t["Locus*Allele"] = loci_alleles
+
+    assert len(table.where_in("Allele", wanted_alleles, ["Allele"])) == len(
+        wanted_alleles
+    )
+
+    benchmarks = (
+        ("construction (row at a time)", lambda: row_at_a_time_table(rows), None),
+        ("construction", lambda: Table(rows, COLUMNS), None),
+        (
+            "__setitem__ (row at a time)",
+            lambda t: row_at_a_time_setitem(t, "Locus*Allele", loci_alleles),
+            lambda: row_at_a_time_table(rows),
+        ),
+        ("__setitem__", new_column, lambda: Table(rows, COLUMNS)),
+        ("union", lambda: table.union(other), None),
+        ("where_in", lambda: table.where_in("Allele", wanted_alleles, COLUMNS), None),
+        ("agg", lambda: table.agg("Serology", "Allele", list), None),
+    )
+
+    print(f"simple_table.Table with {len(rows)} rows")
+    for name, func, setup in benchmarks:
+        times = []
+        for _ in range(args.repeat):
+            if setup:
+                t = setup()
+                times.append(timeit.timeit(lambda: func(t), number=1))
+                t.close()
+            else:
+                times.append(timeit.timeit(func, number=1))
+        print(f"{name:>30}: {min(times) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
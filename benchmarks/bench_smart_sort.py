@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Benchmark sorting of XX code expansions.
+
+Compares sorting with `functools.cmp_to_key(smart_sort_comparator)` to
+sorting with `smart_sort_key` and with the integer rank table.
+
+    python benchmarks/bench_smart_sort.py --alleles 5000
+"""
+
+import argparse
+import functools
+import random
+import timeit
+
+from pyard import smart_sort
+
+
+def xx_expansion(n_alleles: int):
+    """Synthetic expansion of B*15:XX with n_alleles 2-4 field alleles"""
+    alleles = []
+    second_field = 1
+    while len(alleles) < n_alleles:
+        for third_field in range(1, 4):
+            alleles.append(f"B*15:{second_field:02}:{third_field:02}")
+            alleles.append(f"B*15:{second_field:02}:{third_field:02}:01")
+        alleles.append(f"B*15:{second_field:02}N")
+        second_field += 1
+    alleles = alleles[:n_alleles]
+    random.Random(0).shuffle(alleles)
+    return alleles
+
+
+def clear_caches():
+    smart_sort.smart_sort_key.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--alleles", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    alleles = xx_expansion(args.alleles)
+    sort_ranks = smart_sort.build_sort_ranks(alleles)
+
+    def comparator_sort():
+        clear_caches()
+        sorted(alleles, key=functools.cmp_to_key(smart_sort.smart_sort_comparator))
+
+    def key_sort():
+        clear_caches()
+        sorted(alleles, key=smart_sort.smart_sort_key)
+
+    def rank_sort():
+        smart_sort.smart_sorted(alleles, sort_ranks=sort_ranks)
+
+    assert (
+        sorted(alleles, key=functools.cmp_to_key(smart_sort.smart_sort_comparator))
+        == sorted(alleles, key=smart_sort.smart_sort_key)
+        == smart_sort.smart_sorted(alleles, sort_ranks=sort_ranks)
+    )
+
+    print(f"Sorting an XX expansion of {len(alleles)} alleles")
+    for name, func in (
+        ("cmp_to_key(smart_sort_comparator)", comparator_sort),
+        ("smart_sort_key", key_sort),
+        ("sort rank table", rank_sort),
+    ):
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"{name:>35}: {best * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
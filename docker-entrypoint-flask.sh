@@ -3,6 +3,8 @@ set -e
 
 # A positive integer generally in the 2-4 x $(NUM_CORES) range.
 WORKER_PROCESSES=${WORKERS:-4}
+# app:app for the Flask app or async_app:app for the async app
+APP_MODULE=${APP_MODULE:-app:app}
 
 echo "Starting py-ard service with" "${WORKER_PROCESSES}" worker processes.
 
@@ -15,4 +17,4 @@ echo "Importing py-ard latest IPD/IMGT version: "
 pyard-import
 
 # shellcheck disable=SC2086
-gunicorn -c gunicorn_config.py ${WORKER_FLAG} app:app
+gunicorn -c gunicorn_config.py ${WORKER_FLAG} "${APP_MODULE}"
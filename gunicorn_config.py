@@ -23,6 +23,7 @@ def on_starting(server):
     print("Preloading py-ard in master process...")
 
     # Initialize ard in master process - will be shared via fork
+    # Versions in PYARD_PRELOAD_VERSIONS are loaded too
     import api
 
     api.init_pyard()
@@ -24,8 +24,9 @@
 # exports for `pyard`
 from .blender import blender as dr_blender
 from .config import ARDConfig
-from .constants import DEFAULT_CACHE_SIZE
+from .constants import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_POLICY
 from .misc import get_imgt_db_versions as db_versions
+from .pool import ARDPool
 
 __author__ = """NMDP Bioinformatics"""
 __version__ = "2.3.1"
@@ -37,6 +38,16 @@ def init(
     load_mac: bool = True,
     cache_size: int = DEFAULT_CACHE_SIZE,
     config: dict = None,
+    precompute_redux: bool = False,
+    cache_policy: str = DEFAULT_CACHE_POLICY,
+    gl_cache_size: int = None,
+    allele_cache_size: int = None,
+    persistent_cache: bool = False,
+    mac_in_memory: bool = False,
+    bulk_build: bool = False,
+    use_snapshot: bool = True,
+    mapped_tables: bool = False,
+    allele_ids: bool = False,
 ):
     from .ard import ARD
 
@@ -46,5 +57,15 @@ def init(
         load_mac=load_mac,
         max_cache_size=cache_size,
         config=config,
+        precompute_redux=precompute_redux,
+        cache_policy=cache_policy,
+        gl_cache_size=gl_cache_size,
+        allele_cache_size=allele_cache_size,
+        persistent_cache=persistent_cache,
+        mac_in_memory=mac_in_memory,
+        bulk_build=bulk_build,
+        use_snapshot=use_snapshot,
+        mapped_tables=mapped_tables,
+        allele_ids=allele_ids,
     )
     return ard
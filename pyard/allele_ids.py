@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Integer IDs of allele and group names, and mappings stored as ID arrays.
+
+Every name in the mappings gets an integer ID, in sorted order of the
+names. A mapping is then an `array('I')` indexed by the ID of the key:
+
+* `IdDict`: the ID of the value of each key, `NO_ID` for missing keys.
+* `IdListDict`: offsets into an array of the IDs of the values.
+* `IdSet`: a byte per ID, 1 for the members.
+
+Each name is stored once, in `AlleleIds`, instead of once per mapping it
+appears in. The mappings are read-only and behave like the dicts and sets
+they replace, taking and returning names. The arrays can also be used
+directly to map many IDs at once, e.g. `IdDict.value_ids`.
+"""
+
+import array
+from collections.abc import Mapping, Set, ValuesView
+from typing import Dict, Iterable, List, Tuple
+
+from .mappings import AlleleGroups, ARSMapping, CodeMappings
+
+_UINT32 = "I"
+# ID of a missing name
+NO_ID = 0xFFFFFFFF
+
+
+class AlleleIds:
+    """Interned names with their integer IDs"""
+
+    def __init__(self, names: Iterable[str]):
+        """
+        :param names: names to give IDs. IDs are given in sorted order of the
+            names.
+        """
+        self.names: List[str] = sorted(set(names))
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def get_id(self, name: str) -> int:
+        """ID of a name or `NO_ID`"""
+        return self.ids.get(name, NO_ID)
+
+    def encode(self, names: Iterable[str]) -> array.array:
+        """
+        IDs of names
+
+        :param names: names to encode
+        :return: array of the IDs, `NO_ID` for unknown names
+        """
+        ids = self.ids
+        return array.array(_UINT32, [ids.get(name, NO_ID) for name in names])
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        """
+        Names of IDs
+
+        :param ids: IDs to decode
+        :return: names, None for `NO_ID`
+        """
+        names = self.names
+        return [None if i == NO_ID else names[i] for i in ids]
+
+
+class _IdTable:
+    def __init__(self, allele_ids: AlleleIds):
+        self._allele_ids = allele_ids
+
+    def _id(self, name) -> int:
+        try:
+            return self._allele_ids.ids.get(name, NO_ID)
+        except TypeError:
+            # Unhashable
+            return NO_ID
+
+    def __repr__(self):
+        return f"<{type(self).__name__} of {len(self)} names>"
+
+
+class IdSet(_IdTable, Set):
+    """Read-only set of names stored as a byte per ID"""
+
+    def __init__(self, allele_ids: AlleleIds, names: Iterable[str]):
+        super().__init__(allele_ids)
+        self.members = bytearray(len(allele_ids))
+        ids = allele_ids.ids
+        for name in names:
+            self.members[ids[name]] = 1
+        self._len = self.members.count(1)
+
+    def __contains__(self, name):
+        i = self._id(name)
+        return i != NO_ID and self.members[i] == 1
+
+    def __iter__(self):
+        names = self._allele_ids.names
+        for i, member in enumerate(self.members):
+            if member:
+                yield names[i]
+
+    def __len__(self):
+        return self._len
+
+
+class _IdValues(ValuesView):
+    def __contains__(self, value):
+        return self._mapping._has_value(value)
+
+
+class IdDict(_IdTable, Mapping):
+    """Read-only dict of names to names stored as value IDs by key ID"""
+
+    def __init__(self, allele_ids: AlleleIds, mapping: Mapping):
+        super().__init__(allele_ids)
+        ids = allele_ids.ids
+        self.value_ids = array.array(_UINT32, [NO_ID]) * len(allele_ids)
+        for key, value in mapping.items():
+            self.value_ids[ids[key]] = ids[value]
+        self._len = len(mapping)
+        self._is_value = bytearray(len(allele_ids))
+        for value_id in set(self.value_ids):
+            if value_id != NO_ID:
+                self._is_value[value_id] = 1
+
+    def __getitem__(self, key):
+        i = self._id(key)
+        if i == NO_ID or self.value_ids[i] == NO_ID:
+            raise KeyError(key)
+        return self._allele_ids.names[self.value_ids[i]]
+
+    def get(self, key, default=None):
+        i = self._id(key)
+        if i == NO_ID or self.value_ids[i] == NO_ID:
+            return default
+        return self._allele_ids.names[self.value_ids[i]]
+
+    def __contains__(self, key):
+        i = self._id(key)
+        return i != NO_ID and self.value_ids[i] != NO_ID
+
+    def __iter__(self):
+        names = self._allele_ids.names
+        for i, value_id in enumerate(self.value_ids):
+            if value_id != NO_ID:
+                yield names[i]
+
+    def __len__(self):
+        return self._len
+
+    def values(self):
+        return _IdValues(self)
+
+    def _has_value(self, value) -> bool:
+        i = self._id(value)
+        return i != NO_ID and self._is_value[i] == 1
+
+
+class IdListDict(_IdTable, Mapping):
+    """
+    Read-only dict of names to lists of names.
+
+    The value IDs of the key with ID i are
+    `value_ids[offsets[i]:offsets[i + 1]]`. A new list is returned on each
+    lookup.
+    """
+
+    def __init__(self, allele_ids: AlleleIds, mapping: Mapping):
+        super().__init__(allele_ids)
+        ids = allele_ids.ids
+        lists = [None] * len(allele_ids)
+        for key, value in mapping.items():
+            lists[ids[key]] = value
+        self.offsets = array.array(_UINT32, [0])
+        self.value_ids = array.array(_UINT32)
+        self._keys = bytearray(len(allele_ids))
+        for i, value in enumerate(lists):
+            if value is not None:
+                self._keys[i] = 1
+                self.value_ids.extend(ids[name] for name in value)
+            self.offsets.append(len(self.value_ids))
+        self._len = len(mapping)
+
+    def _value(self, i: int) -> List[str]:
+        names = self._allele_ids.names
+        value_ids = self.value_ids[self.offsets[i] : self.offsets[i + 1]]
+        return [names[value_id] for value_id in value_ids]
+
+    def __getitem__(self, key):
+        i = self._id(key)
+        if i == NO_ID or not self._keys[i]:
+            raise KeyError(key)
+        return self._value(i)
+
+    def get(self, key, default=None):
+        i = self._id(key)
+        if i == NO_ID or not self._keys[i]:
+            return default
+        return self._value(i)
+
+    def __contains__(self, key):
+        i = self._id(key)
+        return i != NO_ID and self._keys[i] == 1
+
+    def __iter__(self):
+        names = self._allele_ids.names
+        for i, is_key in enumerate(self._keys):
+            if is_key:
+                yield names[i]
+
+    def __len__(self):
+        return self._len
+
+
+def _mapping_names(mapping) -> Iterable[str]:
+    yield from mapping
+    if isinstance(mapping, Mapping):
+        for value in mapping.values():
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+
+def _encode(allele_ids: AlleleIds, mapping):
+    if not isinstance(mapping, Mapping):
+        return IdSet(allele_ids, mapping)
+    if all(isinstance(value, str) for value in mapping.values()):
+        return IdDict(allele_ids, mapping)
+    return IdListDict(allele_ids, mapping)
+
+
+def encode_mappings(
+    ars_mappings: ARSMapping, code_mappings: CodeMappings, allele_group: AlleleGroups
+) -> Tuple[AlleleIds, ARSMapping, CodeMappings, AlleleGroups]:
+    """
+    Store the ARS, code and allele mappings as ID arrays
+
+    :param ars_mappings: ARS mappings of dicts
+    :param code_mappings: code mappings of dicts
+    :param allele_group: allele groups of sets and dicts
+    :return: the IDs of all the names and the mappings of `IdDict`,
+        `IdListDict` and `IdSet`
+    """
+    all_mappings = (ars_mappings, code_mappings, allele_group)
+    allele_ids = AlleleIds(
+        name
+        for mappings in all_mappings
+        for mapping in mappings
+        for name in _mapping_names(mapping)
+    )
+    return (
+        allele_ids,
+        *(
+            type(mappings)(*(_encode(allele_ids, mapping) for mapping in mappings))
+            for mappings in all_mappings
+        ),
+    )
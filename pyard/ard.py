@@ -1,20 +1,36 @@
 # -*- coding: utf-8 -*-
 
-import functools
+import itertools
 import sys
-from typing import Union, List
+import weakref
+from typing import Dict, Iterable, Union, List, Tuple
 
 from . import data_repository as dr
 from . import db
+from . import parallel
 from . import smart_sort
+from . import mapped_tables
+from . import snapshot
+from . import vectorized
+from .allele_ids import encode_mappings
+from .cache import CacheInfo, CachedFunction, create_cache
+from .persistent_cache import PersistentCache, persistent_cache_filename
+from .pool import share_mappings
+from .prefix_index import PrefixIndex
 from .constants import (
     HLA_regex,
     DEFAULT_CACHE_SIZE,
+    DEFAULT_CACHE_POLICY,
     G_GROUP_LOCI,
     VALID_REDUCTION_TYPE,
     expression_chars,
 )
-from .exceptions import InvalidMACError, InvalidTypingError
+from .exceptions import (
+    InvalidMACError,
+    InvalidTypingError,
+    LocusNotLoadedError,
+    PyArdError,
+)
 from .handlers import (
     AlleleHandler,
     GLStringHandler,
@@ -25,8 +41,18 @@ from .handlers import (
     XXHandler,
     ShortNullHandler,
 )
-from .misc import get_2field_allele, is_2_field_allele
+from .handlers.gl_string_processor import parse_gl_string
+from .loci import locus_of, scope_mappings, scope_names
+from .misc import get_2field_allele, is_2_field_allele, validate_reduction_type
 from .serology import SerologyMapping
+from .mappings import (
+    ARSMapping,
+    AlleleGroups,
+    CodeMappings,
+    allele_tables,
+    ars_mapping_tables,
+    code_mapping_tables,
+)
 from .config import ARDConfig
 
 
@@ -42,29 +68,172 @@ class ARD(object):
         load_mac: bool = True,
         max_cache_size: int = DEFAULT_CACHE_SIZE,
         config: dict = None,
+        precompute_redux: bool = False,
+        cache_policy: str = DEFAULT_CACHE_POLICY,
+        gl_cache_size: int = None,
+        allele_cache_size: int = None,
+        persistent_cache: bool = False,
+        mac_in_memory: bool = False,
+        bulk_build: bool = False,
+        use_snapshot: bool = True,
+        mapped_tables: bool = False,
+        allele_ids: bool = False,
     ):
         self._data_dir = data_dir
+        self._imgt_version = imgt_version
         self.config = ARDConfig.from_dict(config)
+        # Loci of the reference data, all if empty
+        self._loci = frozenset(self.config.loci)
+        # Precomputed reductions of single alleles for each redux_type
+        self.allele_redux = {}
+        # allele_redux as vectorized lookup tables for redux_column
+        self._redux_tables = {}
+        # Integer smart sort order of the names in the database
+        self.sort_ranks = {}
+        # On-disk reduction cache shared across processes
+        self.persistent_cache = None
+        # Integer IDs of the names when the mappings are stored as ID arrays
+        self.allele_ids = None
+        # Seconds spent on each table when the database was built in bulk
+        self.build_timings = {}
+        # Prefix indexes for similar_alleles
+        self.allele_prefix_index = None
+        self._mac_prefix_index = None
 
         # Initialize specialized handlers
         self._initialize_handlers()
 
         # Setup caching
-        self._setup_caching(max_cache_size)
+        self._setup_caching(
+            max_cache_size, cache_policy, gl_cache_size, allele_cache_size
+        )
 
         # Initialize database and mappings
-        self._initialize_database(imgt_version, load_mac)
+        self._initialize_database(
+            imgt_version, load_mac, precompute_redux, bulk_build, use_snapshot
+        )
+
+        # Reopen connection in read-only mode
+        self.db_connection, db_filename = db.create_db_connection(
+            data_dir, imgt_version, ro=True
+        )
+
+        # Use the mapping tables from a memory-mapped file
+        if mapped_tables:
+            self._map_reference_data(db_filename)
+        # or store them as arrays of integer IDs
+        elif allele_ids:
+            self._encode_reference_data()
 
         # Freeze reference data for Python >= 3.9
         self._freeze_reference_data()
 
-        # Reopen connection in read-only mode
-        self.db_connection, _ = db.create_db_connection(data_dir, imgt_version, ro=True)
+        # Reductions stored on disk and shared with other processes
+        if persistent_cache:
+            self.persistent_cache = PersistentCache(
+                persistent_cache_filename(db_filename),
+                self.get_db_version(),
+                self.config.config_hash(),
+            )
+
+        # Look up MAC codes in memory instead of the database
+        if mac_in_memory:
+            self.mac_handler.load_mac_codes()
+            self._mac_prefix_index = PrefixIndex(self.mac_handler.mac_codes)
 
-    def _initialize_database(self, imgt_version: str, load_mac: bool):
+    def _initialize_database(
+        self,
+        imgt_version: str,
+        load_mac: bool,
+        precompute_redux: bool = False,
+        bulk_build: bool = False,
+        use_snapshot: bool = True,
+    ):
         """Initialize database connection and load all mappings"""
-        self.db_connection, _ = db.create_db_connection(self._data_dir, imgt_version)
+        self.db_connection, db_filename = db.create_db_connection(
+            self._data_dir, imgt_version, bulk_build=bulk_build
+        )
 
+        # Load the mappings from the snapshot of the database if it's current
+        snapshot_key = snapshot.snapshot_key(db_filename) if use_snapshot else None
+        loci = sorted(self._loci)
+        mappings = None
+        loci_mappings = None
+        loaded_from_db = False
+        if snapshot_key:
+            # The snapshot of the configured loci only, if any
+            if loci:
+                loci_mappings = snapshot.load_snapshot(
+                    snapshot.snapshot_filename(db_filename, loci), snapshot_key
+                )
+            if not loci_mappings:
+                mappings = snapshot.load_snapshot(
+                    snapshot.snapshot_filename(db_filename), snapshot_key
+                )
+        if loci_mappings:
+            self._set_mappings(loci_mappings)
+        elif mappings:
+            self._set_mappings(mappings)
+        else:
+            # Mappings generated for a new database aren't all of the same
+            # types as the ones loaded from the tables, so they aren't saved
+            loaded_from_db = db.tables_exist(
+                self.db_connection,
+                ars_mapping_tables + code_mapping_tables + allele_tables,
+            )
+            self._generate_mappings(imgt_version)
+
+        # Keep the reference data of the configured loci
+        all_mappings = None
+        if not loci_mappings:
+            all_mappings = self._get_mappings()
+            if loci:
+                self._set_mappings(scope_mappings(all_mappings, self._loci))
+
+        # Load other mappings
+        dr.generate_v2_to_v3_mapping(self.db_connection, imgt_version)
+        dr.set_db_version(self.db_connection, imgt_version)
+        dr.generate_mac_codes(self.db_connection, refresh_mac=False, load_mac=load_mac)
+
+        self.allele_prefix_index = PrefixIndex(
+            self.allele_group.alleles, self.sort_ranks
+        )
+
+        # Precompute reductions of all alleles for the current configuration
+        if precompute_redux:
+            self.allele_redux = dr.generate_allele_redux_mapping(
+                self.db_connection,
+                self.allele_group.alleles,
+                self.config.config_hash(),
+                self.redux,
+            )
+
+        if isinstance(self.db_connection, db.BulkBuildConnection):
+            self.build_timings = self.db_connection.finish_build()
+        self.db_connection.close()
+
+        # Save a snapshot for the next time, unless the database is unchanged
+        if use_snapshot and (mappings or loci_mappings or loaded_from_db):
+            current_key = snapshot.snapshot_key(db_filename)
+            if current_key and all_mappings and current_key != snapshot_key:
+                snapshot.save_snapshot(
+                    snapshot.snapshot_filename(db_filename),
+                    current_key,
+                    all_mappings,
+                )
+            if (
+                current_key
+                and loci
+                and (not loci_mappings or current_key != snapshot_key)
+            ):
+                snapshot.save_snapshot(
+                    snapshot.snapshot_filename(db_filename, loci),
+                    current_key,
+                    self._get_mappings(),
+                )
+
+    def _generate_mappings(self, imgt_version: str):
+        """Load the mappings from the database, generating missing tables"""
         # Load ARD mappings
         self.ars_mappings = dr.generate_ard_mapping(self.db_connection, imgt_version)
 
@@ -92,13 +261,86 @@ class ARD(object):
             self.db_connection, imgt_version, self.serology_mapping, self._redux_allele
         )
 
-        # Load other mappings
-        dr.generate_v2_to_v3_mapping(self.db_connection, imgt_version)
-        dr.set_db_version(self.db_connection, imgt_version)
-        dr.generate_mac_codes(self.db_connection, refresh_mac=False, load_mac=load_mac)
-        dr.generate_cwd_mapping(self.db_connection)
+        # CWD alleles of each locus
+        self.cwd_alleles = dr.generate_cwd_mapping(self.db_connection)
+
+        # Rank alleles, XX codes and serology in smart sort order
+        self.sort_ranks = self._build_sort_ranks()
+
+    # Attributes stored in the snapshot of the database
+    _SNAPSHOT_ATTRIBUTES = (
+        "ars_mappings",
+        "code_mappings",
+        "allele_group",
+        "shortnulls",
+        "serology_mapping",
+        "cwd_alleles",
+        "sort_ranks",
+    )
+
+    def _get_mappings(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self._SNAPSHOT_ATTRIBUTES}
+
+    def _set_mappings(self, mappings: Dict[str, object]):
+        for name in self._SNAPSHOT_ATTRIBUTES:
+            setattr(self, name, mappings[name])
+
+    def _map_reference_data(self, db_filename: str):
+        """Replace the ARS, code and allele mappings with memory-mapped tables"""
+        filename = mapped_tables.mapped_tables_filename(db_filename, sorted(self._loci))
+        key = snapshot.snapshot_key(db_filename)
+        tables = mapped_tables.load_mapped_tables(filename, key)
+        if tables is None:
+            # Save the tables as loaded from the database
+            ars_mappings = db.load_ars_mappings(self.db_connection)
+            code_mappings, allele_group = db.load_code_mappings(self.db_connection)
+            mappings = {
+                **ars_mappings._asdict(),
+                **code_mappings._asdict(),
+                **allele_group._asdict(),
+            }
+            if self._loci:
+                mappings = {
+                    name: scope_names(mapping, self._loci)
+                    for name, mapping in mappings.items()
+                }
+            if mapped_tables.save_mapped_tables(filename, key, mappings):
+                tables = mapped_tables.load_mapped_tables(filename, key)
+            if tables is None:
+                # Keep the mappings in memory
+                return
+
+        self.ars_mappings = ARSMapping(*(tables[name] for name in ARSMapping._fields))
+        self.code_mappings = CodeMappings(
+            *(tables[name] for name in CodeMappings._fields)
+        )
+        self.allele_group = AlleleGroups(
+            *(tables[name] for name in AlleleGroups._fields)
+        )
 
-        self.db_connection.close()
+    def _encode_reference_data(self):
+        """Replace the ARS, code and allele mappings with integer ID arrays"""
+        (
+            self.allele_ids,
+            self.ars_mappings,
+            self.code_mappings,
+            self.allele_group,
+        ) = encode_mappings(self.ars_mappings, self.code_mappings, self.allele_group)
+
+    def _build_sort_ranks(self):
+        """Build the integer sort rank table for names in the database"""
+        lgx_alleles = set(self.ars_mappings.lgx_group.values())
+        names = itertools.chain(
+            self.allele_group.alleles,
+            self.ars_mappings.g_group.values(),
+            self.ars_mappings.p_group.values(),
+            lgx_alleles,
+            (allele + "g" for allele in lgx_alleles),
+            (allele + "ARS" for allele in lgx_alleles),
+            self.code_mappings.xx_codes.keys(),
+            db.load_set(self.db_connection, "serology_mapping", "serology"),
+        )
+        return smart_sort.build_sort_ranks(names)
 
     def _initialize_handlers(self):
         """Initialize all specialized handlers"""
@@ -111,21 +353,100 @@ class ARD(object):
         self.xx_handler = XXHandler(self)
         self.shortnull_handler = ShortNullHandler(self)
 
-    def _setup_caching(self, max_cache_size: int):
-        """Setup caching for performance"""
-        if max_cache_size != DEFAULT_CACHE_SIZE:
-            self._redux_allele = functools.lru_cache(maxsize=max_cache_size)(
-                self._redux_allele
-            )
-            self.redux = functools.lru_cache(maxsize=max_cache_size)(self.redux)
-            self.is_mac = functools.lru_cache(maxsize=max_cache_size)(
-                self.mac_handler.is_mac
-            )
-            self.smart_sort_comparator = functools.lru_cache(maxsize=max_cache_size)(
-                smart_sort.smart_sort_comparator
+    def _setup_caching(
+        self,
+        max_cache_size: int,
+        cache_policy: str,
+        gl_cache_size: int = None,
+        allele_cache_size: int = None,
+    ):
+        """Setup per-instance caches for performance
+
+        GL string results from `redux` are cached up to `gl_cache_size`.
+        Single typing and allele results are cached up to `allele_cache_size`.
+        Both default to `max_cache_size`.
+        """
+        if gl_cache_size is None:
+            gl_cache_size = max_cache_size
+        if allele_cache_size is None:
+            allele_cache_size = max_cache_size
+
+        self.redux = CachedFunction(
+            self.redux, create_cache(cache_policy, gl_cache_size)
+        )
+        self._redux_single_typing = CachedFunction(
+            self._redux_single_typing, create_cache(cache_policy, allele_cache_size)
+        )
+        self._redux_allele = CachedFunction(
+            self._redux_allele, create_cache(cache_policy, allele_cache_size)
+        )
+        # MACHandler caches its own lookups
+        self.is_mac = self.mac_handler.is_mac
+        self.is_mac.cache = create_cache(cache_policy, allele_cache_size)
+        self.mac_handler.get_alleles.cache = create_cache(
+            cache_policy, allele_cache_size
+        )
+        self.is_serology = CachedFunction(
+            self.serology_handler.is_serology,
+            create_cache(cache_policy, allele_cache_size),
+        )
+        self.smart_sort_comparator = smart_sort.smart_sort_comparator
+
+    def cache_stats(self) -> Dict[str, CacheInfo]:
+        """Hit, miss and eviction counts of each of the caches
+
+        Returns:
+            Dictionary of cached method name to its CacheInfo
+        """
+        return {
+            "redux": self.redux.cache_info(),
+            "redux_single_typing": self._redux_single_typing.cache_info(),
+            "redux_allele": self._redux_allele.cache_info(),
+            "is_mac": self.is_mac.cache_info(),
+            "mac_alleles": self.mac_handler.get_alleles.cache_info(),
+            "is_serology": self.is_serology.cache_info(),
+        }
+
+    def clear_caches(self) -> None:
+        """Clear all the caches and reset their statistics"""
+        for cached_method in (
+            self.redux,
+            self._redux_single_typing,
+            self._redux_allele,
+            self.is_mac,
+            self.mac_handler.get_alleles,
+            self.is_serology,
+        ):
+            cached_method.cache_clear()
+
+    def share_reference_data(self, others: Iterable["ARD"]) -> None:
+        """Share the reference data equal to the one of other ARD instances
+
+        Mappings equal to the same mapping of another instance, e.g. of
+        another IMGT version, are replaced by it and the names of the other
+        mappings are interned, so the instances store the data they have in
+        common once.
+
+        Args:
+            others: ARD instances to share the reference data with
+        """
+        others = list(others)
+        self._set_mappings(
+            share_mappings(
+                self._get_mappings(), [other._get_mappings() for other in others]
             )
-        else:
-            self.smart_sort_comparator = smart_sort.smart_sort_comparator
+        )
+        self.allele_prefix_index = PrefixIndex(
+            self.allele_group.alleles, self.sort_ranks
+        )
+        # MAC codes loaded in memory are the same for most versions
+        mac_codes = self.mac_handler.mac_codes
+        if mac_codes is not None:
+            for other in others:
+                if other.mac_handler.mac_codes == mac_codes:
+                    self.mac_handler.mac_codes = other.mac_handler.mac_codes
+                    self._mac_prefix_index = other._mac_prefix_index
+                    break
 
     @staticmethod
     def _freeze_reference_data():
@@ -135,12 +456,69 @@ class ARD(object):
 
             gc.freeze()
 
+    def _reconnect(self) -> None:
+        """Open new database connections e.g. in a forked worker process"""
+        self.db_connection, db_filename = db.create_db_connection(
+            self._data_dir, self._imgt_version, ro=True
+        )
+        if self.persistent_cache is not None:
+            self.persistent_cache = PersistentCache(
+                persistent_cache_filename(db_filename),
+                self.persistent_cache.imgt_version,
+                self.persistent_cache.config_hash,
+            )
+
+    def _weaken_back_references(self) -> None:
+        """Refer back to the instance and its handlers through weak proxies
+
+        The handlers and reduction strategies refer back to the instance and
+        the cached methods to the instance they're bound to. Once these
+        references are weak, the instance is freed by reference counting as
+        soon as it's no longer used, without a garbage collection of the
+        frozen reference data. The instance can be used until then.
+        """
+        strategy_factory = self.allele_reducer.strategy_factory
+        helpers = (
+            self.allele_reducer,
+            self.gl_processor,
+            self.hats_handler,
+            self.mac_handler,
+            self.serology_handler,
+            self.v2_handler,
+            self.xx_handler,
+            self.shortnull_handler,
+            strategy_factory,
+            *strategy_factory._strategies.values(),
+        )
+        proxy = weakref.proxy(self)
+        for helper in helpers:
+            helper.ard = proxy
+        for owner in (self, *helpers):
+            for value in vars(owner).values():
+                if isinstance(value, CachedFunction):
+                    value.bind_weakly()
+
+    def close(self) -> None:
+        """Close the database connections and break the reference cycles
+
+        The instance is freed by reference counting once it's no longer
+        referenced. It can't be used after closing.
+        """
+        self._weaken_back_references()
+        if self.db_connection is not None:
+            self.db_connection.close()
+            self.db_connection = None
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+            self.persistent_cache = None
+
     def __del__(self):
         """Close database connection when ARD instance is destroyed"""
         if hasattr(self, "db_connection") and self.db_connection:
             self.db_connection.close()
+        if getattr(self, "persistent_cache", None):
+            self.persistent_cache.close()
 
-    @functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
     def _redux_allele(
         self, allele: str, redux_type: VALID_REDUCTION_TYPE, re_ping=True
     ) -> str:
@@ -185,9 +563,20 @@ class ARD(object):
 
         return self.allele_reducer.reduce_allele(allele, redux_type, re_ping)
 
+    def _check_locus(self, allele: str):
+        """Raise LocusNotLoadedError if the allele is of a locus not loaded"""
+        if self._loci:
+            locus = locus_of(allele)
+            if locus is not None and locus not in self._loci:
+                raise LocusNotLoadedError(
+                    f"{allele} is of the locus {locus}. "
+                    f"Loaded loci: {', '.join(sorted(self._loci))}"
+                )
+
     def _redux_non_glstring(
         self, allele: str, glstring: str, redux_type: VALID_REDUCTION_TYPE
     ):
+        self._check_locus(allele)
         if "*" in allele:
             locus, fields = allele.split("*")
             # Handle ignored allele suffixes
@@ -203,7 +592,7 @@ class ARD(object):
             return self.redux(allele, redux_type)
 
         # Handle Serology
-        if self.config.reduce_serology and self.serology_handler.is_serology(allele):
+        if self.config.reduce_serology and self.is_serology(allele):
             alleles = self.serology_handler.get_alleles_from_serology(allele)
             if alleles:
                 return self.redux("/".join(alleles), redux_type)
@@ -240,7 +629,7 @@ class ARD(object):
 
         # Handle MAC
         if self.config.reduce_MAC and code.isalpha():
-            if self.mac_handler.is_mac(allele):
+            if self.is_mac(allele):
                 alleles = self.mac_handler.get_alleles(code, loc_antigen)
                 return self.redux("/".join(alleles), redux_type)
             else:
@@ -253,14 +642,40 @@ class ARD(object):
         redux_allele = self._redux_allele(allele, redux_type)
         return redux_allele
 
-    @functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
     def redux(self, glstring: str, redux_type: VALID_REDUCTION_TYPE = "lgx") -> str:
         """Main redux method using specialized handlers"""
 
-        # Handle GL string delimiters first
-        processed_gl = self.gl_processor.process_gl_string(glstring, redux_type)
-        if processed_gl != glstring or self.is_glstring(processed_gl):
-            return processed_gl
+        # Single alleles with precomputed reductions
+        allele_redux = self.allele_redux.get(redux_type)
+        if allele_redux and glstring in allele_redux:
+            return allele_redux[glstring]
+
+        validate_reduction_type(redux_type)
+
+        # Reductions stored by this or other processes
+        if self.persistent_cache is not None:
+            reduced = self.persistent_cache.get(glstring, redux_type)
+            if reduced is None:
+                reduced = self._redux_gl(glstring, redux_type)
+                self.persistent_cache.put(glstring, redux_type, reduced)
+            return reduced
+
+        return self._redux_gl(glstring, redux_type)
+
+    def _redux_gl(self, glstring: str, redux_type: VALID_REDUCTION_TYPE) -> str:
+        """Validate and reduce a GL String"""
+        # Parse GL string delimiters once for validation and reduction
+        gl = parse_gl_string(glstring)
+        # Validate GL string structure if strict mode is enabled
+        if self.config.strict_enabled:
+            self.gl_processor.validate_gl(gl)
+
+        return self.gl_processor.reduce_gl(gl, redux_type)
+
+    def _redux_single_typing(
+        self, glstring: str, redux_type: VALID_REDUCTION_TYPE
+    ) -> str:
+        """Reduce a typing that isn't a GL string, e.g. an allele or a MAC"""
 
         # Remove HLA- prefix for processing the allele
         is_hla_prefix = HLA_regex.search(glstring)
@@ -279,6 +694,117 @@ class ARD(object):
                 redux_allele = f"HLA-{redux_allele}"
         return redux_allele
 
+    def redux_many(
+        self,
+        glstrings: Iterable[str],
+        redux_type: Union[VALID_REDUCTION_TYPE, Iterable[VALID_REDUCTION_TYPE]] = "lgx",
+        return_errors: bool = False,
+    ) -> List:
+        """Reduce a batch of GL Strings
+
+        Each distinct GL String in the batch is reduced only once per reduction
+        type and the result is shared by all of its occurrences. Fragments
+        common to several GL Strings are shared through the `redux` cache.
+
+        Args:
+            glstrings: GL Strings/alleles to reduce
+            redux_type: A reduction type, or an iterable of reduction types
+            return_errors: When True, a `PyArdError` raised while reducing an
+                item is returned in place of its result instead of being raised.
+                Malformed items are returned as `InvalidTypingError`.
+
+        Returns:
+            Results in input order. With a single reduction type, each result
+            is the reduced GL String. With multiple reduction types, each
+            result is a dict of reduction type to reduced GL String.
+        """
+        single_redux_type = isinstance(redux_type, str)
+        if single_redux_type:
+            redux_types = (redux_type,)
+        else:
+            redux_types = tuple(redux_type)
+        for a_redux_type in redux_types:
+            validate_reduction_type(a_redux_type)
+
+        glstrings = list(glstrings)
+        reduced = {}
+        # dict preserves the order of first occurrence of each GL String
+        for glstring in dict.fromkeys(glstrings):
+            results = {}
+            for a_redux_type in redux_types:
+                try:
+                    results[a_redux_type] = self.redux(glstring, a_redux_type)
+                except (PyArdError, ValueError) as e:
+                    if not return_errors:
+                        raise
+                    if not isinstance(e, PyArdError):
+                        # Malformed typings e.g. A*01*01 fail to parse
+                        e = InvalidTypingError(
+                            f"{glstring} is not a valid typing.", cause=e
+                        )
+                    results[a_redux_type] = e
+            reduced[glstring] = results[redux_type] if single_redux_type else results
+
+        return [reduced[glstring] for glstring in glstrings]
+
+    def redux_parallel(
+        self,
+        glstrings: Iterable[str],
+        redux_type: Union[VALID_REDUCTION_TYPE, Iterable[VALID_REDUCTION_TYPE]] = "lgx",
+        workers: int = None,
+        chunk_size: int = None,
+        return_errors: bool = False,
+    ) -> List:
+        """Reduce a large batch of GL Strings with multiple processes
+
+        Same as `redux_many` but the distinct GL Strings are reduced in chunks
+        by forked worker processes that share the loaded reference data.
+        Use it for batches large enough to outweigh the cost of starting
+        the workers.
+
+        Args:
+            glstrings: GL Strings/alleles to reduce
+            redux_type: A reduction type, or an iterable of reduction types
+            workers: Number of worker processes. Defaults to the number of CPUs
+            chunk_size: Number of distinct GL Strings sent to a worker at a time
+            return_errors: When True, a `PyArdError` raised while reducing an
+                item is returned in place of its result instead of being raised
+
+        Returns:
+            Results in input order, as returned by `redux_many`
+        """
+        return parallel.redux_parallel(
+            self, glstrings, redux_type, workers, chunk_size, return_errors
+        )
+
+    def redux_column(
+        self,
+        alleles,
+        redux_type: VALID_REDUCTION_TYPE = "lgx",
+        return_errors: bool = False,
+    ):
+        """Reduce a column of single alleles, e.g. a pandas Series
+
+        The column is factorized and each distinct allele is reduced once.
+        With `precompute_redux=True`, the distinct alleles are looked up in
+        the precomputed reductions as NumPy arrays when NumPy is installed.
+        MACs, XX codes, serology and GL Strings are reduced with `redux`.
+
+        Args:
+            alleles: pandas Series, NumPy array or sequence of alleles
+            redux_type: A reduction type
+            return_errors: When True, a `PyArdError` raised while reducing an
+                item is returned in place of its result instead of being raised.
+                Malformed items are returned as `InvalidTypingError`.
+
+        Returns:
+            Results in input order, as a Series with the same index for a
+            Series, an object array for a NumPy array, otherwise a list.
+            Values that aren't strings (e.g. NaN) or are empty are returned
+            unchanged.
+        """
+        return vectorized.redux_column(self, alleles, redux_type, return_errors)
+
     @staticmethod
     def is_glstring(gl_string: str) -> bool:
         return (
@@ -436,7 +962,14 @@ class ARD(object):
         return allele in self.allele_group.exp_alleles
 
     def cwd_redux(self, allele_list_gl: str) -> str:
-        """CWD reduction using existing logic"""
+        """Reduce an allele list to its CWD alleles
+
+        Args:
+            allele_list_gl: Allele list GL String e.g. A*02:01/A*02:02/A*02:AB
+
+        Returns:
+            Alleles of the list in the CWD Version 2 list of the locus
+        """
         alleles = []
         for allele in allele_list_gl.split("/"):
             if self.is_mac(allele):
@@ -449,40 +982,99 @@ class ARD(object):
         locus = allele_list_gl.split("*")[0]
         if HLA_regex.search(locus):
             locus = locus.split("-")[1]
-        ciwd_for_locus = db.load_cwd(self.db_connection, locus)
+        ciwd_for_locus = self.cwd_alleles.get(locus, frozenset())
 
         alleles_in_ciwd = ciwd_for_locus.intersection(alleles)
         return "/".join(sorted(alleles_in_ciwd))
 
+    def cwd_redux_many(
+        self, allele_list_gls: Iterable[str], return_errors: bool = False
+    ) -> List:
+        """Reduce a batch of allele lists to their CWD alleles
+
+        Each distinct allele list in the batch is reduced only once.
+
+        Args:
+            allele_list_gls: Allele list GL Strings
+            return_errors: When True, a `PyArdError` raised while reducing an
+                item is returned in place of its result instead of being raised
+
+        Returns:
+            CWD reductions in input order
+        """
+        allele_list_gls = list(allele_list_gls)
+        reduced = {}
+        for allele_list_gl in dict.fromkeys(allele_list_gls):
+            try:
+                reduced[allele_list_gl] = self.cwd_redux(allele_list_gl)
+            except PyArdError as e:
+                if not return_errors:
+                    raise
+                reduced[allele_list_gl] = e
+        return [reduced[allele_list_gl] for allele_list_gl in allele_list_gls]
+
+    def smart_sorted(
+        self, alleles: Iterable[str], ignore_suffixes: Tuple[str, ...] = ()
+    ) -> List[str]:
+        """Sort alleles in HLA nomenclature order using the sort rank table"""
+        return smart_sort.smart_sorted(alleles, ignore_suffixes, self.sort_ranks)
+
     def refresh_mac_codes(self) -> None:
         dr.generate_mac_codes(self.db_connection, refresh_mac=True)
+        self._mac_prefix_index = None
+        if self.mac_handler.mac_codes is not None:
+            self.mac_handler.load_mac_codes()
+            self._mac_prefix_index = PrefixIndex(self.mac_handler.mac_codes)
 
     def get_db_version(self) -> str:
         return dr.get_db_version(self.db_connection)
 
-    def similar_alleles(self, prefix: str) -> Union[List, None]:
-        """Find similar alleles using existing logic"""
+    @property
+    def mac_prefix_index(self) -> PrefixIndex:
+        """Prefix index of the MAC codes
+
+        Built on first use unless the MAC codes are loaded in memory.
+        """
+        if self._mac_prefix_index is None:
+            if db.table_exists(self.db_connection, "mac_codes"):
+                mac_codes = db.load_set(self.db_connection, "mac_codes", "code")
+            else:
+                mac_codes = ()
+            self._mac_prefix_index = PrefixIndex(mac_codes)
+        return self._mac_prefix_index
+
+    def similar_alleles(self, prefix: str, limit: int = None) -> Union[List, None]:
+        """Find alleles or MACs starting with the prefix
+
+        Args:
+            prefix: Prefix of an allele or MAC with at least the locus e.g. A*01:9
+            limit: Maximum number of results. Defaults to all the results.
+
+        Returns:
+            Matching alleles in smart sort order or MACs in alphabetical order,
+            None if nothing matches
+        """
         if "*" not in prefix:
             return None
 
+        # Same as the database's case-insensitive LIKE
+        prefix = prefix.upper()
         locus, fields = prefix.split("*")
         if fields:
             if len(fields.split(":")) == 2:
                 first_field, mac_prefix = fields.split(":")
                 if mac_prefix.isalpha():
-                    similar_mac_names = db.similar_mac(self.db_connection, mac_prefix)
-                    if similar_mac_names:
-                        locus_prefix = f"{locus}*{first_field}"
-                        mac_codes = [
-                            f"{locus_prefix}:{code}" for code in similar_mac_names
-                        ]
-                        return sorted(filter(lambda mac: self.is_mac(mac), mac_codes))
-
-            similar_allele_names = db.similar_alleles(self.db_connection, prefix)
+                    locus_prefix = f"{locus}*{first_field}"
+                    similar_mac_codes = self.mac_prefix_index.search(
+                        mac_prefix,
+                        limit,
+                        lambda code: self.is_mac(f"{locus_prefix}:{code}"),
+                    )
+                    if similar_mac_codes:
+                        return [f"{locus_prefix}:{code}" for code in similar_mac_codes]
+
+            similar_allele_names = self.allele_prefix_index.search(prefix, limit)
             if similar_allele_names:
-                return sorted(
-                    similar_allele_names,
-                    key=functools.cmp_to_key(smart_sort.smart_sort_comparator),
-                )
+                return similar_allele_names
 
         return None
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Per-instance caches for reduction results.
+
+Each ARD instance owns its caches, so instances don't share entries and
+are not kept alive by a class-level `functools.lru_cache`.
+"""
+
+import abc
+import functools
+import threading
+import types
+import weakref
+from collections import OrderedDict, defaultdict, namedtuple
+from typing import Callable, Hashable, Optional
+
+from .constants import VALID_CACHE_POLICIES
+
+# Compatible with functools' cache_info() with an additional eviction count
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize", "evictions"]
+)
+
+_MISSING = object()
+
+
+class Cache(abc.ABC):
+    """
+    Base class for the cache policies.
+
+    Subclasses implement `get`, `put`, `_clear` and `__len__`, and keep the
+    hit, miss and eviction counters up to date.
+    """
+
+    policy = None
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def get(self, key: Hashable, default=None):
+        pass
+
+    @abc.abstractmethod
+    def put(self, key: Hashable, value) -> None:
+        pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            self.hits, self.misses, self.maxsize, len(self), self.evictions
+        )
+
+    @abc.abstractmethod
+    def _clear(self):
+        pass
+
+    @abc.abstractmethod
+    def __len__(self):
+        pass
+
+
+class NoCache(Cache):
+    """Caching disabled. Every lookup is a miss."""
+
+    policy = "none"
+
+    def __init__(self, maxsize: Optional[int] = 0):
+        super().__init__(0)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        pass
+
+    def _clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class UnboundedCache(Cache):
+    """Keeps every result. Nothing is evicted."""
+
+    policy = "unbounded"
+
+    def __init__(self, maxsize: Optional[int] = None):
+        super().__init__(None)
+        self._data = {}
+
+    def get(self, key, default=None):
+        value = self._data.get(key, _MISSING)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+
+    def _clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LRUCache(Cache):
+    """Evicts the least recently used entry when full."""
+
+    policy = "lru"
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LFUCache(Cache):
+    """
+    Evicts the least frequently used entry when full.
+
+    Entries with the same use count are evicted least recently used first.
+    """
+
+    policy = "lfu"
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self._data = {}
+        self._counts = {}
+        # use count -> keys with that count in least recently used order
+        self._count_keys = defaultdict(OrderedDict)
+        self._min_count = 0
+
+    def _touch(self, key):
+        count = self._counts[key]
+        keys = self._count_keys[count]
+        del keys[key]
+        if not keys:
+            del self._count_keys[count]
+            if self._min_count == count:
+                self._min_count = count + 1
+        self._counts[key] = count + 1
+        self._count_keys[count + 1][key] = None
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._touch(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._data[key] = value
+                self._touch(key)
+                return
+            if len(self._data) >= self.maxsize:
+                keys = self._count_keys[self._min_count]
+                evicted, _ = keys.popitem(last=False)
+                if not keys:
+                    del self._count_keys[self._min_count]
+                del self._data[evicted]
+                del self._counts[evicted]
+                self.evictions += 1
+            self._data[key] = value
+            self._counts[key] = 1
+            self._count_keys[1][key] = None
+            self._min_count = 1
+
+    def _clear(self):
+        self._data.clear()
+        self._counts.clear()
+        self._count_keys.clear()
+        self._min_count = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+_cache_policies = {
+    "lru": LRUCache,
+    "lfu": LFUCache,
+    "unbounded": UnboundedCache,
+    "none": NoCache,
+}
+
+
+def create_cache(policy: str, maxsize: Optional[int]) -> Cache:
+    """
+    Create a cache for the given policy.
+
+    :param policy: one of 'lru', 'lfu', 'unbounded' or 'none'
+    :param maxsize: maximum number of entries. `None` is unbounded and
+        0 disables caching.
+    :return: the cache
+    """
+    if policy not in VALID_CACHE_POLICIES:
+        raise ValueError(
+            f"Cache policy {policy} is not supported. "
+            f"Supported policies are {VALID_CACHE_POLICIES}"
+        )
+    if maxsize == 0:
+        return NoCache()
+    if maxsize is None:
+        policy = "unbounded" if policy != "none" else policy
+    return _cache_policies[policy](maxsize)
+
+
+class CachedFunction:
+    """
+    Callable that memoizes `func` in the given cache.
+
+    Provides `cache_info()` and `cache_clear()` like `functools.lru_cache`.
+    """
+
+    def __init__(self, func: Callable, cache: Cache):
+        self.cache = cache
+        self._func = func
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        key = (args, frozenset(kwargs.items())) if kwargs else args
+        result = self.cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = self._func(*args, **kwargs)
+            self.cache.put(key, result)
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        return self.cache.info()
+
+    def cache_clear(self) -> None:
+        self.cache.clear()
+
+    def bind_weakly(self) -> None:
+        """
+        Call the wrapped method through a weak proxy of its instance
+
+        Breaks the reference cycle of a cached method stored on its own
+        instance, so the instance is freed by reference counting.
+        """
+        instance = getattr(self._func, "__self__", None)
+        if instance is None or isinstance(instance, weakref.ProxyTypes):
+            return
+        self._func = types.MethodType(self._func.__func__, weakref.proxy(instance))
+        self.__wrapped__ = self._func
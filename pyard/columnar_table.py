@@ -0,0 +1,316 @@
+"""
+Pure Python `simple_table.Table` backend.
+
+Each column is a Python list and the operations work on the lists with
+dicts and sets, without compiling SQL or copying rows in and out of
+SQLite. Only `where` and `query`, which take SQL, copy the table to an
+in-memory SQLite database. Values are stored as text, like in the
+SQLite tables, and rows are returned in the same order.
+
+Select it with `simple_table.set_backend("columnar")`.
+"""
+
+import csv
+import itertools
+import sqlite3
+from collections import Counter, defaultdict
+from typing import List
+
+from .simple_table import Column, PrintableTable, Table
+
+_TEXT_TYPES = {str, bytes, type(None)}
+
+
+def _to_text(value):
+    # Like the TEXT columns of SQLite
+    if value is None or isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+
+def _text_values(values) -> list:
+    values = list(values)
+    if not set(map(type, values)) <= _TEXT_TYPES:
+        values = list(map(_to_text, values))
+    return values
+
+
+def _sort_key(value):
+    # SQLite sorts NULLs first
+    return value is not None, value
+
+
+def _sorted(values) -> list:
+    try:
+        return sorted(values)
+    except TypeError:
+        # Values and NULLs
+        return sorted(values, key=_sort_key)
+
+
+class ColumnarTable(Table):
+    def __init__(self, data, columns: list, table_name: str = "data"):
+        self._name = table_name
+        self._columns = list(columns)
+        if isinstance(data, csv.DictReader):
+            rows = ([row[col] for col in columns] for row in data)
+        else:
+            rows = data
+        columns_values = list(zip(*rows))
+        if not columns_values:
+            # Like SQLite tables, which aren't created without rows
+            self._columns = []
+        self._data = {
+            column: _text_values(values)
+            for column, values in zip(columns, columns_values)
+        }
+
+    @classmethod
+    def _from_columns(cls, data: dict, table_name: str):
+        table = cls.__new__(cls)
+        table._name = table_name
+        table._columns = list(data)
+        table._data = data
+        return table
+
+    def _rows(self):
+        return zip(*self._data.values())
+
+    def _take(self, indexes, columns: list, table_name: str):
+        """Table of the rows at indexes"""
+        data = {}
+        for column in columns:
+            values = self._data[column]
+            data[column] = [values[i] for i in indexes]
+        return ColumnarTable._from_columns(data, table_name)
+
+    def _check_columns(self, columns):
+        for col in columns:
+            if col not in self._data:
+                raise ValueError(f"Column '{col}' not found in table")
+
+    def _to_sqlite(self) -> sqlite3.Connection:
+        """In-memory SQLite database with a copy of the table"""
+        conn = sqlite3.connect(":memory:")
+        if len(self):
+            column_defs = ", ".join(f"`{col}` TEXT" for col in self._columns)
+            conn.execute(f"CREATE TABLE {self._name} ({column_defs})")
+            placeholders = ", ".join("?" * len(self._columns))
+            conn.executemany(
+                f"INSERT INTO {self._name} VALUES ({placeholders})", self._rows()
+            )
+        return conn
+
+    def query(self, sql: str):
+        conn = self._to_sqlite()
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def head(self, n: int = 5):
+        return PrintableTable(self.columns, list(self._rows())[:n])
+
+    def tail(self, n: int = 5):
+        rows = list(self._rows())
+        return PrintableTable(self.columns, rows[::-1][:n])
+
+    def group_by(self, group_by_column: str, return_columns: List[str] = None):
+        if group_by_column not in self._data:
+            raise ValueError(f"Column '{group_by_column}' not found in table")
+        if return_columns is None:
+            return_columns = self._columns
+        columns = self.columns
+        col_index = columns.index(group_by_column)
+        rows = list(zip(*[self._data[col] for col in return_columns]))
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row[col_index]].append(
+                {col: row[i] for i, col in enumerate(columns)}
+            )
+        return {key: grouped[key] for key in _sorted(grouped)}
+
+    def unique(self, columns):
+        if isinstance(columns, str):
+            return Column(columns, list(dict.fromkeys(self._data[columns])))
+        rows = dict.fromkeys(zip(*[self._data[col] for col in columns]))
+        return ColumnarTable(rows, columns, f"{self._name}_unique")
+
+    def where(self, where_clause: str):
+        # Let SQLite evaluate the SQL expression
+        conn = self._to_sqlite()
+        try:
+            cursor = conn.execute(
+                f"SELECT rowid - 1 FROM {self._name} WHERE {where_clause}"
+            )
+            indexes = [row[0] for row in cursor]
+        except Exception as e:
+            raise ValueError(f"Invalid WHERE clause: {where_clause}") from e
+        finally:
+            conn.close()
+        return self._take(indexes, self._columns, f"{self._name}_filtered")
+
+    def where_not_null(self, null_column):
+        if isinstance(null_column, list):
+            null_columns = null_column
+            table_suffix = "_".join(null_column)
+        else:
+            null_columns = [null_column]
+            table_suffix = null_column
+
+        table_name = f"{self._name}_not_null_{table_suffix}"
+        not_null = zip(*[self._data[col] for col in null_columns])
+        indexes = [
+            i
+            for i, values in enumerate(not_null)
+            if all(value is not None for value in values)
+        ]
+        return self._take(indexes, self._columns, table_name)
+
+    def where_in(self, column_name: str, values: set, columns: list):
+        # NULL is never IN the values
+        values = set(values)
+        values.discard(None)
+        indexes = [
+            i for i, value in enumerate(self._data[column_name]) if value in values
+        ]
+        return self._take(indexes, columns, f"{self._name}_filtered")
+
+    def to_dict(self, key_column: str = None, value_column: str = None):
+        if not key_column and not value_column:
+            key_column, value_column = self.columns
+        elif key_column not in self._data or value_column not in self._data:
+            raise ValueError(
+                f"Columns {key_column} and {value_column} must be in the table"
+            )
+        if key_column == value_column:
+            raise ValueError(
+                f"Columns {key_column} and {value_column} must be different"
+            )
+        return dict(zip(self._data[key_column], self._data[value_column]))
+
+    def value_counts(self, column: str):
+        if column not in self._data:
+            raise ValueError(f"Column '{column}' not found in table")
+        counts = Counter(self._data[column])
+        values = _sorted(counts)
+        values.sort(key=counts.get, reverse=True)
+        return ColumnarTable(
+            [(value, counts[value]) for value in values],
+            [column, "count"],
+            f"{self._name}_counts",
+        )
+
+    def agg(self, group_column: str, agg_column: str, func):
+        builtin_funcs = {list, set}
+        # Distinct values of each group, sorted like GROUP BY group, agg
+        groups = defaultdict(dict)
+        for k, v in zip(self._data[group_column], self._data[agg_column]):
+            groups[k][v] = None
+        d = defaultdict(list)
+        for k in _sorted(groups):
+            d[k] = func(_sorted(groups[k]))
+        if func in builtin_funcs:
+            return d
+        return ColumnarTable(
+            list(d.items()), [group_column, "agg"], f"{self._name}_agg"
+        )
+
+    def __setitem__(self, column: str, values):
+        # The i-th value goes to the i-th row, an existing column is
+        # replaced and moved to the end
+        n_rows = len(self)
+        values = _text_values(itertools.islice(values, n_rows))
+        values.extend([None] * (n_rows - len(values)))
+        if column in self._data:
+            del self._data[column]
+            self._columns.remove(column)
+        self._data[column] = values
+        self._columns.append(column)
+
+    def __getitem__(self, column):
+        if isinstance(column, list):
+            self._check_columns(column)
+            return ColumnarTable._from_columns(
+                {col: list(self._data[col]) for col in column}, f"{self._name}_subset"
+            )
+        else:
+            if column not in self._data:
+                raise ValueError(f"Column '{column}' not found in table")
+            return Column(column, list(self._data[column]))
+
+    def rename(self, column_mapping: dict):
+        for old_name, new_name in column_mapping.items():
+            if old_name not in self._data:
+                raise ValueError(f"Column '{old_name}' not found in table")
+            self._data = {
+                new_name if col == old_name else col: values
+                for col, values in self._data.items()
+            }
+            self._columns = list(self._data)
+        return self
+
+    def union(self, other_table):
+        if self.columns != other_table.columns:
+            raise ValueError("Tables must have the same columns for union")
+
+        if isinstance(other_table, ColumnarTable):
+            data = {
+                col: self._data[col] + other_table._data[col] for col in self._columns
+            }
+            return ColumnarTable._from_columns(data, f"{self._name}_union")
+        other_rows = other_table.query(f"SELECT * FROM {other_table._name}")
+        return ColumnarTable(
+            list(self._rows()) + other_rows, self.columns, f"{self._name}_union"
+        )
+
+    def remove(self, column_name: str, values):
+        # NULL is never IN the values
+        values = set(values)
+        values.discard(None)
+        indexes = [
+            i for i, value in enumerate(self._data[column_name]) if value not in values
+        ]
+        self._data = self._take(indexes, self._columns, self._name)._data
+        return self
+
+    def concat_columns(self, columns: list):
+        self._check_columns(columns)
+        values = [
+            None if None in row else "".join(row)
+            for row in zip(*[self._data[col] for col in columns])
+        ]
+        concat_name = "_".join(columns)
+        return Column(concat_name, values)
+
+    def explode(self, column: str, delimiter: str):
+        if column not in self._data:
+            raise ValueError(f"Column '{column}' not found in table")
+        col_index = self._columns.index(column)
+
+        exploded_data = []
+        for row in self._rows():
+            if row[col_index]:
+                split_values = row[col_index].split(delimiter)
+                for value in split_values:
+                    new_row = list(row)
+                    new_row[col_index] = value.strip()
+                    exploded_data.append(tuple(new_row))
+            else:
+                exploded_data.append(row)
+
+        return ColumnarTable(exploded_data, self.columns, f"{self._name}_exploded")
+
+    def __len__(self):
+        if not self._data:
+            return 0
+        return len(next(iter(self._data.values())))
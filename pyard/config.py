@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
 from dataclasses import dataclass
 from typing import Tuple
 
@@ -20,6 +22,8 @@ class ARDConfig:
     ARS_as_lg: bool = False
     strict: bool = True
     ignore_allele_with_suffixes: Tuple[str, ...] = ()
+    # Loci to load the reference data of, e.g. ("A", "B", "DRB1"). All if empty.
+    loci: Tuple[str, ...] = ()
 
     @classmethod
     def from_dict(cls, config_dict: dict) -> "ARDConfig":
@@ -48,8 +52,21 @@ class ARDConfig:
             "ARS_as_lg": self.ARS_as_lg,
             "strict": self.strict,
             "ignore_allele_with_suffixes": self.ignore_allele_with_suffixes,
+            "loci": self.loci,
         }
 
+    def config_hash(self) -> str:
+        """Hash of the settings that change reduction results"""
+        settings = self.to_dict()
+        # Logging doesn't change the reduction results
+        settings.pop("verbose_log")
+        settings["ignore_allele_with_suffixes"] = list(
+            settings["ignore_allele_with_suffixes"]
+        )
+        settings["loci"] = sorted(settings["loci"])
+        serialized = json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
     @property
     def serology_enabled(self) -> bool:
         return self.reduce_serology
@@ -23,6 +23,9 @@ import re
 import typing
 
 DEFAULT_CACHE_SIZE = 1_000
+# Cache eviction policies. `none` disables caching.
+VALID_CACHE_POLICIES = ("lru", "lfu", "unbounded", "none")
+DEFAULT_CACHE_POLICY = "lru"
 
 HLA_regex = re.compile("^HLA-")
 
@@ -21,7 +21,6 @@
 #    > http://www.opensource.org/licenses/lgpl-license.php
 #
 import copy
-import functools
 import sqlite3
 
 import pyard.loader
@@ -29,7 +28,8 @@ import pyard.loader.cwd
 import pyard.loader.mac_codes
 import pyard.loader.serology
 from . import db
-from .constants import expression_chars
+from .constants import expression_chars, VALID_REDUCTION_MODES
+from .exceptions import PyArdError
 from .loader.allele_list import load_allele_list
 from .loader.g_group import load_g_group
 from .loader.p_group import load_p_group
@@ -50,8 +50,8 @@ from .misc import (
     get_1field_allele,
 )
 from .serology import broad_splits_dna_mapping, SerologyMapping
-from .simple_table import Table
-from .smart_sort import smart_sort_comparator
+from .simple_table import Table, lazy_tables
+from .smart_sort import smart_sorted
 
 
 def expression_reduce(exp_alleles_table):
@@ -101,9 +101,10 @@ def expression_reduce(exp_alleles_table):
 
 
 def join_allele_list(alleles: list):
-    return "/".join(sorted(alleles, key=functools.cmp_to_key(smart_sort_comparator)))
+    return "/".join(smart_sorted(alleles))
 
 
+@lazy_tables()
 def generate_ard_mapping(db_connection: sqlite3.Connection, imgt_version) -> ARSMapping:
     if db.tables_exist(db_connection, ars_mapping_tables):
         return db.load_ars_mappings(db_connection)
@@ -174,8 +175,7 @@ def generate_ard_mapping(db_connection: sqlite3.Connection, imgt_version) -> ARS
     # DPA1*02:02/DPA1*02:07 ==> DPA1*02:02
     #
     lowest_numbered_dup_lgx = {
-        k: sorted(v.split("/"), key=functools.cmp_to_key(smart_sort_comparator))[0]
-        for k, v in dup_lgx.items()
+        k: smart_sorted(v.split("/"))[0] for k, v in dup_lgx.items()
     }
     # Update the lgx_group with the allele with the lowest number
     lgx_group.update(lowest_numbered_dup_lgx)
@@ -197,6 +197,7 @@ def generate_ard_mapping(db_connection: sqlite3.Connection, imgt_version) -> ARS
     return ars_mapping
 
 
+@lazy_tables()
 def generate_alleles_and_xx_codes_and_who(
     db_connection: sqlite3.Connection, imgt_version, ars_mappings
 ):
@@ -244,10 +245,7 @@ def generate_alleles_and_xx_codes_and_who(
                 xx_codes[broad] = copy.deepcopy(xx_codes[split])
 
     # Save this version of xx codes
-    flat_xx_codes = {
-        k: "/".join(sorted(v, key=functools.cmp_to_key(smart_sort_comparator)))
-        for k, v in xx_codes.items()
-    }
+    flat_xx_codes = {k: "/".join(smart_sorted(v)) for k, v in xx_codes.items()}
 
     # W H O
     who_alleles = allele_df["Allele"].to_list()
@@ -269,10 +267,7 @@ def generate_alleles_and_xx_codes_and_who(
     who_group = unique_who_codes.agg("nd", "Allele", list)
     # dictionary
     # flat_who_group = who_group.to_dict()
-    flat_who_group = {
-        k: "/".join(sorted(v, key=functools.cmp_to_key(smart_sort_comparator)))
-        for k, v in who_group.items()
-    }
+    flat_who_group = {k: "/".join(smart_sorted(v)) for k, v in who_group.items()}
 
     db.save_code_mappings(
         db_connection,
@@ -321,10 +316,7 @@ def generate_short_nulls(db_connection, who_group):
             for a_shortnull in expression_alleles:
                 # e.g. DRB4*01:03N
                 shortnulls[a_shortnull] = "/".join(
-                    sorted(
-                        expression_alleles[a_shortnull],
-                        key=functools.cmp_to_key(smart_sort_comparator),
-                    )
+                    smart_sorted(expression_alleles[a_shortnull])
                 )
 
     db.save_shortnulls(db_connection, shortnulls)
@@ -333,6 +325,7 @@ def generate_short_nulls(db_connection, who_group):
     return shortnulls
 
 
+@lazy_tables()
 def generate_mac_codes(
     db_connection: sqlite3.Connection, refresh_mac: bool = False, load_mac: bool = True
 ):
@@ -396,6 +389,7 @@ def _generate_antigen_specifities(db_connection, serology_mapping_df):
     db.save_antigen_specifities(db_connection, hats_final.to_dict())
 
 
+@lazy_tables()
 def generate_serology_mapping(
     db_connection: sqlite3.Connection,
     imgt_version: str,
@@ -467,18 +461,8 @@ def generate_serology_mapping(
         for sero in sero_mapping:
             xx = serology_mapping.map_serology_to_xx(serology=sero)
             sero_mapping[sero] = (
-                "/".join(
-                    sorted(
-                        sero_mapping[sero][0],
-                        key=functools.cmp_to_key(smart_sort_comparator),
-                    )
-                ),
-                "/".join(
-                    sorted(
-                        sero_mapping[sero][1],
-                        key=functools.cmp_to_key(smart_sort_comparator),
-                    ),
-                ),
+                "/".join(smart_sorted(sero_mapping[sero][0])),
+                "/".join(smart_sorted(sero_mapping[sero][1])),
                 xx,
             )
         for sero in serology_xx_mapping:
@@ -486,6 +470,44 @@ def generate_serology_mapping(
                 sero_mapping[sero] = (None, None, serology_xx_mapping[sero])
 
         db.save_serology_mappings(db_connection, sero_mapping)
+        generate_allele_serology_index(db_connection, redux_function)
+    elif not db.table_exists(db_connection, "allele_serology"):
+        generate_allele_serology_index(db_connection, redux_function)
+
+
+def generate_allele_serology_index(db_connection: sqlite3.Connection, redux_function):
+    """
+    Index the serology allele lists by allele, so the serology of an allele
+    is a single lookup instead of a scan of all the allele lists.
+
+    Alleles are indexed under the list they're in: "allele_list" or
+    "lgx_allele_list". The LGX reductions of the lgx_allele_list alleles that
+    aren't already in the lgx_allele_list are indexed under
+    "lgx_allele_list_redux".
+
+    :param db_connection: Active SQLite Connection
+    :param redux_function: allele reduction function
+    """
+    rows = []
+    for serology, allele_list, lgx_allele_list in db.load_serology_allele_lists(
+        db_connection
+    ):
+        if allele_list:
+            for allele in allele_list.split("/"):
+                rows.append(("allele_list", allele, serology))
+        if lgx_allele_list:
+            lgx_alleles = lgx_allele_list.split("/")
+            for allele in lgx_alleles:
+                rows.append(("lgx_allele_list", allele, serology))
+            lgx_redux_alleles = set()
+            for allele in lgx_alleles:
+                try:
+                    lgx_redux_alleles.update(redux_function(allele, "lgx").split("/"))
+                except PyArdError:
+                    continue
+            for allele in lgx_redux_alleles.difference(lgx_alleles):
+                rows.append(("lgx_allele_list_redux", allele, serology))
+    db.save_allele_serology_index(db_connection, rows)
 
 
 def generate_v2_to_v3_mapping(db_connection: sqlite3.Connection, imgt_version):
@@ -520,6 +542,7 @@ def get_db_version(db_connection: sqlite3.Connection):
     return db.get_user_version(db_connection)
 
 
+@lazy_tables()
 def generate_broad_splits_mapping(db_connection: sqlite3.Connection, imgt_version):
     if not db.tables_exist(
         db_connection, ["serology_broad_split_mapping", "serology_associated_mappings"]
@@ -544,3 +567,44 @@ def generate_cwd_mapping(db_connection: sqlite3.Connection):
     if not db.table_exists(db_connection, "cwd2"):
         cwd2_map = pyard.loader.cwd.load_cwd2()
         db.save_cwd2(db_connection, cwd2_map)
+    return db.load_cwd_by_locus(db_connection)
+
+
+def generate_allele_redux_mapping(
+    db_connection: sqlite3.Connection,
+    alleles,
+    config_hash: str,
+    redux_function,
+):
+    """
+    Precompute the reduction of every allele in every reduction mode.
+
+    The reductions depend on the ARD configuration and on the py-ard
+    version, so they are saved to the db keyed by both.
+
+    :param db_connection: Active SQLite connection
+    :param alleles: valid alleles to reduce
+    :param config_hash: hash of the ARDConfig `redux_function` reduces with
+    :param redux_function: function to reduce an allele with a redux_type
+    :return: mapping of redux_type to a dict of allele to reduction
+    """
+    from . import __version__
+
+    allele_redux = db.load_allele_redux(db_connection, config_hash, __version__)
+    if allele_redux:
+        return allele_redux
+
+    for redux_type in VALID_REDUCTION_MODES:
+        redux_mapping = {}
+        for allele in alleles:
+            try:
+                redux_mapping[allele] = redux_function(allele, redux_type)
+            except (PyArdError, sqlite3.Error):
+                # Not reducible in this mode with this db,
+                # leave it to be reduced at runtime.
+                continue
+        allele_redux[redux_type] = redux_mapping
+
+    db.save_allele_redux(db_connection, config_hash, allele_redux, __version__)
+
+    return allele_redux
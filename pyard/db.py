@@ -20,17 +20,147 @@
 #    > http://www.fsf.org/licensing/licenses/lgpl.html
 #    > http://www.opensource.org/licenses/lgpl-license.php
 #
+import contextlib
+import functools
 import os
 import pathlib
 import sqlite3
 import sys
-from typing import Tuple, Dict, Set, List
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Tuple, Dict, FrozenSet, Set, List, Iterable, Iterator
 
 from .mappings import ARSMapping, CodeMappings, AlleleGroups
 from .misc import get_imgt_db_versions, get_default_db_directory
 
 
-def create_db_connection(data_dir, imgt_version, ro=False):
+class BulkBuildConnection(sqlite3.Connection):
+    """
+    Connection that builds a new reference database in bulk.
+
+    The database is built in a unique temporary file in a single transaction with
+    journaling and syncing turned off: `commit()` does nothing until
+    `finish_build()`. Tables saved with `save_dict` and `save_set` get their
+    primary key index after their rows are inserted. The temporary file
+    replaces the database file when the connection is closed after
+    `finish_build()`, so an interrupted build never leaves a partial database.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db_filename = None
+        self.build_filename = None
+        self.building = True
+        # Table name -> index to create after the bulk inserts
+        self.deferred_indexes: Dict[str, str] = {}
+        # Table name or build step -> seconds spent
+        self.timings: Dict[str, float] = {}
+
+    def begin_build(self, db_filename: str, build_filename: str):
+        self.db_filename = db_filename
+        self.build_filename = build_filename
+        self.execute("PRAGMA journal_mode=OFF")
+        self.execute("PRAGMA synchronous=OFF")
+        # 256MB page cache
+        self.execute("PRAGMA cache_size=-262144")
+        self.execute("PRAGMA temp_store=MEMORY")
+        self.execute("BEGIN")
+
+    def commit(self):
+        if not self.building:
+            super().commit()
+
+    def finish_build(self) -> Dict[str, float]:
+        """
+        Create the deferred indexes, analyze, commit and vacuum the database
+
+        :return: seconds spent on each table and build step
+        """
+        with timed(self, "indexes"):
+            for create_index_sql in self.deferred_indexes.values():
+                self.execute(create_index_sql)
+        with timed(self, "analyze"):
+            self.execute("ANALYZE")
+        with timed(self, "commit"):
+            self.building = False
+            self.commit()
+        with timed(self, "vacuum"):
+            self.execute("VACUUM")
+        return self.timings
+
+    def close(self):
+        super().close()
+        if self.building:
+            # Build didn't finish, discard it
+            pathlib.Path(self.build_filename).unlink(missing_ok=True)
+        else:
+            os.replace(self.build_filename, self.db_filename)
+
+
+# Number of queries run by each lookup function, e.g. for the service metrics
+query_counts: Dict[str, int] = defaultdict(int)
+# Lookups run in the threads of the service
+_query_counts_lock = threading.Lock()
+
+
+def counted(func):
+    """Count the calls of a lookup function in query_counts"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _query_counts_lock:
+            query_counts[name] += 1
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def get_query_counts() -> Dict[str, int]:
+    """
+    Copy of query_counts that other threads can't change while it's read
+
+    :return: lookup function name -> number of calls
+    """
+    with _query_counts_lock:
+        return dict(query_counts)
+
+
+@contextlib.contextmanager
+def timed(connection: sqlite3.Connection, name: str):
+    """
+    Record the time spent in the block in the timings of a BulkBuildConnection
+
+    :param connection: db connection of type sqlite.Connection
+    :param name: table name or build step
+    """
+    if not isinstance(connection, BulkBuildConnection):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        connection.timings[name] = connection.timings.get(name, 0) + elapsed
+
+
+def _primary_key(connection: sqlite3.Connection, table_name: str, column: str) -> str:
+    """
+    Primary key clause of column in the CREATE TABLE statement.
+    A BulkBuildConnection creates the index after the rows are inserted.
+    """
+    if isinstance(connection, BulkBuildConnection):
+        connection.deferred_indexes[table_name] = (
+            f"CREATE UNIQUE INDEX {table_name}_{column} ON {table_name} ({column})"
+        )
+        return ""
+    return " PRIMARY KEY"
+
+
+def create_db_connection(data_dir, imgt_version, ro=False, bulk_build=False):
     """
     Create a  connection to a sqlite database in read-only mode
     or read-write mode (default)
@@ -38,6 +168,8 @@ def create_db_connection(data_dir, imgt_version, ro=False):
     :param data_dir: The directory where the db is/will be created
     :param imgt_version: IPD/IMGT-HLA db version
     :param ro: Read-only mode ?
+    :param bulk_build: Build a new database with a BulkBuildConnection ?
+        Only used when the database doesn't exist.
     :return: db connection of type sqlite.Connection
     """
     # Set data directory where all the downloaded files will go
@@ -89,6 +221,19 @@ def create_db_connection(data_dir, imgt_version, ro=False):
             )
             sys.exit(1)
 
+    # Build a new database in bulk
+    if bulk_build and not pathlib.Path(db_filename).exists():
+        # A unique file per build, so concurrent builds don't clobber each other
+        fd, build_filename = tempfile.mkstemp(
+            dir=data_dir, prefix=f"{pathlib.Path(db_filename).name}.", suffix=".build"
+        )
+        os.close(fd)
+        # mkstemp creates the file readable only by its owner
+        os.chmod(build_filename, 0o644)
+        connection = sqlite3.connect(build_filename, factory=BulkBuildConnection)
+        connection.begin_build(db_filename, build_filename)
+        return connection, db_filename
+
     # Open the database for read/write
     file_uri = f"file:{db_filename}"
     return sqlite3.connect(file_uri, uri=True), db_filename
@@ -135,6 +280,7 @@ def count_rows(connection: sqlite3.Connection, table_name: str) -> int:
     return result[0]
 
 
+@counted
 def mac_code_to_alleles(connection: sqlite3.Connection, code: str) -> List[str]:
     """
     Look up the MAC code in the database and return corresponding list
@@ -154,6 +300,20 @@ def mac_code_to_alleles(connection: sqlite3.Connection, code: str) -> List[str]:
     return alleles
 
 
+def load_mac_codes(connection: sqlite3.Connection) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Iterate over all the MAC codes and their list of alleles.
+
+    :param connection: db connection of type sqlite.Connection
+    :return: iterator of MAC code and list of alleles pairs
+    """
+    cursor = connection.execute("SELECT code, alleles FROM mac_codes")
+    for code, alleles in cursor:
+        yield code, alleles.split("/")
+    cursor.close()
+
+
+@counted
 def alleles_to_mac_code(
     connection: sqlite3.Connection, code_expansion: str
 ) -> List[str]:
@@ -172,6 +332,7 @@ def alleles_to_mac_code(
     return None
 
 
+@counted
 def serology_to_alleles(connection: sqlite3.Connection, serology: str) -> List[str]:
     """
     Look up Serology in the database and return corresponding list of alleles.
@@ -191,6 +352,7 @@ def serology_to_alleles(connection: sqlite3.Connection, serology: str) -> List[s
     return alleles
 
 
+@counted
 def is_valid_serology(connection: sqlite3.Connection, serology: str) -> bool:
     """
     Check db if the serology exists
@@ -208,6 +370,7 @@ def is_valid_serology(connection: sqlite3.Connection, serology: str) -> bool:
     return False
 
 
+@counted
 def v2_to_v3_allele(connection: sqlite3.Connection, v2_allele: str) -> str:
     """
     Look up V3 version of the allele in the database.
@@ -240,26 +403,30 @@ def save_dict(
     :param columns: column names in the table
     :return: success status
     """
-    cursor = connection.cursor()
+    with timed(connection, table_name):
+        cursor = connection.cursor()
 
-    # Drop the table first
-    drop_table_sql = f"DROP TABLE IF EXISTS {table_name}"
-    cursor.execute(drop_table_sql)
+        # Drop the table first
+        drop_table_sql = f"DROP TABLE IF EXISTS {table_name}"
+        cursor.execute(drop_table_sql)
 
-    # Create table
-    create_table_sql = f"""CREATE TABLE {table_name} (
-                            {columns[0]} TEXT PRIMARY KEY,
-                            {columns[1]} TEXT NOT NULL
-                    )"""
-    cursor.execute(create_table_sql)
+        # Create table
+        primary_key = _primary_key(connection, table_name, columns[0])
+        create_table_sql = f"""CREATE TABLE {table_name} (
+                                {columns[0]} TEXT{primary_key},
+                                {columns[1]} TEXT NOT NULL
+                        )"""
+        cursor.execute(create_table_sql)
 
-    # insert
-    cursor.executemany(f"INSERT INTO {table_name} VALUES (?, ?)", dictionary.items())
+        # insert
+        cursor.executemany(
+            f"INSERT INTO {table_name} VALUES (?, ?)", dictionary.items()
+        )
 
-    # commit transaction - writes to the db
-    connection.commit()
-    # close the cursor
-    cursor.close()
+        # commit transaction - writes to the db
+        connection.commit()
+        # close the cursor
+        cursor.close()
 
     return True
 
@@ -276,30 +443,32 @@ def save_set(
     :param column: name of the column in the table
     :return: success status
     """
-    cursor = connection.cursor()
+    with timed(connection, table_name):
+        cursor = connection.cursor()
+
+        # Drop the table first
+        drop_table_sql = f"DROP TABLE IF EXISTS {table_name}"
+        cursor.execute(drop_table_sql)
+
+        # Create table
+        primary_key = _primary_key(connection, table_name, column)
+        create_table_sql = f"""CREATE TABLE {table_name} (
+                                {column} TEXT{primary_key}
+                        )"""
+        cursor.execute(create_table_sql)
+
+        # insert
+        cursor.executemany(
+            f"INSERT INTO {table_name} VALUES (?)",
+            zip(
+                rows,
+            ),
+        )
 
-    # Drop the table first
-    drop_table_sql = f"DROP TABLE IF EXISTS {table_name}"
-    cursor.execute(drop_table_sql)
-
-    # Create table
-    create_table_sql = f"""CREATE TABLE {table_name} (
-                            {column} TEXT PRIMARY KEY
-                    )"""
-    cursor.execute(create_table_sql)
-
-    # insert
-    cursor.executemany(
-        f"INSERT INTO {table_name} VALUES (?)",
-        zip(
-            rows,
-        ),
-    )
-
-    # commit transaction - writes to the db
-    connection.commit()
-    # close the cursor
-    cursor.close()
+        # commit transaction - writes to the db
+        connection.commit()
+        # close the cursor
+        cursor.close()
 
     return True
 
@@ -321,6 +490,7 @@ def load_set(connection: sqlite3.Connection, table_name: str, column: str) -> Se
     return table_as_set
 
 
+@counted
 def load_cwd(connection: sqlite3.Connection, locus: str) -> Set:
     """
     Retrieve the CWD Version 2 alleles for a locus as a set
@@ -329,14 +499,27 @@ def load_cwd(connection: sqlite3.Connection, locus: str) -> Set:
     :param locus: name of the column in the table to query
     :return: CWD allele set
     """
-    cursor = connection.cursor()
-    select_all_query = f"SELECT allele FROM cwd2 where locus='{locus}'"
-    cursor.execute(select_all_query)
+    cursor = connection.execute("SELECT allele FROM cwd2 WHERE locus = ?", (locus,))
     table_as_set = set(map(lambda t: t[0], cursor.fetchall()))
     cursor.close()
     return table_as_set
 
 
+def load_cwd_by_locus(connection: sqlite3.Connection) -> Dict[str, FrozenSet[str]]:
+    """
+    Retrieve the CWD Version 2 alleles of all the loci
+
+    :param connection: db connection of type sqlite.Connection
+    :return: dict of locus to its frozen CWD allele set
+    """
+    cwd_by_locus = defaultdict(set)
+    cursor = connection.execute("SELECT locus, allele FROM cwd2")
+    for locus, allele in cursor:
+        cwd_by_locus[locus].add(allele)
+    cursor.close()
+    return {locus: frozenset(alleles) for locus, alleles in cwd_by_locus.items()}
+
+
 def load_dict(
     connection: sqlite3.Connection, table_name: str, columns: Tuple[str, str]
 ) -> Dict[str, str]:
@@ -356,62 +539,27 @@ def load_dict(
     return table_as_dict
 
 
-def similar_alleles(connection: sqlite3.Connection, allele_prefix: str) -> Set[str]:
-    """
-    Find similar alleles starting with the provided prefix.
-
-    :param connection: db connection of type sqlite.Connection
-    :param allele_prefix: Allele name to use as a prefix to find similar alleles
-    :return: list of similar alleles
-    """
-    query = "SELECT allele FROM alleles WHERE allele LIKE ?"
-    cursor = connection.execute(query, (f"{allele_prefix}%",))
-    result = cursor.fetchall()
-    # fetchall() returns a list of tuples of results
-    # e.g. [('C*04:09N',)]
-    # Get out the first value of the tuple from the result list
-    alleles = set(map(lambda t: t[0], result))
-    return alleles
-
-
-def similar_mac(connection: sqlite3.Connection, mac_prefix: str) -> Set[str]:
+@counted
+def find_serologies_in_index(
+    connection: sqlite3.Connection, allele_name: str, allele_list: str = "allele_list"
+) -> Set[str]:
     """
-    Find similar MAC codes starting with the provided prefix.
+    Find the serologies of an allele in the allele to serology index.
 
     :param connection: db connection of type sqlite.Connection
-    :param mac_prefix: MAC fragment to use as a prefix to find similar MACs
-    :return: list of similar MAC codes
-    """
-    query = "SELECT code FROM mac_codes WHERE code LIKE ?"
-    cursor = connection.execute(query, (f"{mac_prefix}%",))
-    result = cursor.fetchall()
-    # fetchall() returns a list of tuples of results
-    # e.g. [('DJZUP',)]
-    # Get out the first value of the tuple from the result list
-    codes = set(map(lambda t: t[0], result))
-    return codes
-
-
-def find_serology_for_allele(
-    connection: sqlite3.Connection, allele_name: str, column: str = "allele_list"
-) -> Dict[str, str]:
-    """
-    Find similar alleles starting with the provided allele_name.
-
-    :param connection: db connection of type sqlite.Connection
-    :param allele_name: Allele name to use as a prefix to find similar alleles
-    :param column: Column to look for allele, "allele_list" or "lgx_allele_list"
-    :return: list of similar alleles
-    """
-    query = f"SELECT serology, {column} FROM serology_mapping WHERE {column} LIKE ?"
-    cursor = connection.execute(query, (f"%{allele_name}%",))
-    results = cursor.fetchall()
-    # fetchall() returns a list of tuples of results
-    # e.g. [('A1', ''A*01:01:01:01/A*01:01:01:03')]
-    serology_mapping = {serology: allele_list for serology, allele_list in results}
-    return serology_mapping
+    :param allele_name: Allele name to look up
+    :param allele_list: Serology allele list the allele is in, "allele_list",
+        "lgx_allele_list" or "lgx_allele_list_redux"
+    :return: set of serologies
+    """
+    query = "SELECT serology FROM allele_serology WHERE allele_list = ? AND allele = ?"
+    cursor = connection.execute(query, (allele_list, allele_name))
+    serologies = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return serologies
 
 
+@counted
 def find_xx_for_serology(connection: sqlite3.Connection, serology: str) -> str:
     """
     Find the corresponding XX allele for the given serology
@@ -428,6 +576,7 @@ def find_xx_for_serology(connection: sqlite3.Connection, serology: str) -> str:
     return None
 
 
+@counted
 def find_hats(connection: sqlite3.Connection, allele: str) -> str:
     """
     Find the corresponding HATS (HLA Antigen Typing Specificity) for the given allele.
@@ -445,6 +594,7 @@ def find_hats(connection: sqlite3.Connection, allele: str) -> str:
     return None
 
 
+@counted
 def find_common_hats_alleles(
     connection: sqlite3.Connection, alleles: List[str]
 ) -> List[str]:
@@ -469,6 +619,7 @@ def find_common_hats_alleles(
     return results
 
 
+@counted
 def get_user_version(connection: sqlite3.Connection) -> int:
     """
     Retrieve user_version from db
@@ -628,27 +779,153 @@ def save_antigen_specifities(db_connection, hats_dict):
 
 def save_serology_mappings(db_connection, sero_mapping):
     # Save the serology mapping to db
-    cursor = db_connection.cursor()
-    # Drop the table first
-    cursor.execute("DROP TABLE IF EXISTS serology_mapping")
-    # Create table
-    create_table_sql = """CREATE TABLE serology_mapping (
-                            serology TEXT PRIMARY KEY,
-                            allele_list TEXT,
-                            lgx_allele_list TEXT,
-                            xx TEXT NOT NULL
-                    )"""
-    cursor.execute(create_table_sql)
-
-    rows = ((k, v[0], v[1], v[2]) for k, v in sero_mapping.items())
-
-    # insert
-    cursor.executemany("INSERT INTO serology_mapping VALUES (?, ?, ?, ?)", rows)
+    with timed(db_connection, "serology_mapping"):
+        cursor = db_connection.cursor()
+        # Drop the table first
+        cursor.execute("DROP TABLE IF EXISTS serology_mapping")
+        # Create table
+        create_table_sql = """CREATE TABLE serology_mapping (
+                                serology TEXT PRIMARY KEY,
+                                allele_list TEXT,
+                                lgx_allele_list TEXT,
+                                xx TEXT NOT NULL
+                        )"""
+        cursor.execute(create_table_sql)
 
-    # commit transaction - writes to the db
-    db_connection.commit()
-    # close the cursor
+        rows = ((k, v[0], v[1], v[2]) for k, v in sero_mapping.items())
+
+        # insert
+        cursor.executemany("INSERT INTO serology_mapping VALUES (?, ?, ?, ?)", rows)
+
+        # commit transaction - writes to the db
+        db_connection.commit()
+        # close the cursor
+        cursor.close()
+
+
+def load_serology_allele_lists(db_connection) -> List[Tuple[str, str, str]]:
+    """
+    Load the allele lists of each serology.
+
+    :param db_connection: db connection of type sqlite.Connection
+    :return: list of serology, allele_list, lgx_allele_list tuples
+    """
+    cursor = db_connection.execute(
+        "SELECT serology, allele_list, lgx_allele_list FROM serology_mapping"
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def save_allele_serology_index(
+    db_connection: sqlite3.Connection, rows: Iterable[Tuple[str, str, str]]
+):
+    """
+    Save the allele to serology index.
+
+    :param db_connection: db connection of type sqlite.Connection
+    :param rows: allele_list name, allele and serology tuples
+    """
+    with timed(db_connection, "allele_serology"):
+        cursor = db_connection.cursor()
+        cursor.execute("DROP TABLE IF EXISTS allele_serology")
+        cursor.execute("""CREATE TABLE allele_serology (
+                allele_list TEXT NOT NULL,
+                allele TEXT NOT NULL,
+                serology TEXT NOT NULL,
+                PRIMARY KEY (allele_list, allele, serology)
+            ) WITHOUT ROWID""")
+        cursor.executemany(
+            "INSERT OR IGNORE INTO allele_serology VALUES (?, ?, ?)", rows
+        )
+        db_connection.commit()
+        cursor.close()
+
+
+def _allele_redux_columns(db_connection: sqlite3.Connection) -> List[str]:
+    cursor = db_connection.execute("PRAGMA table_info(allele_redux)")
+    columns = [row[1] for row in cursor.fetchall()]
+    cursor.close()
+    return columns
+
+
+def save_allele_redux(
+    db_connection: sqlite3.Connection,
+    config_hash: str,
+    allele_redux: Dict[str, Dict[str, str]],
+    pyard_version: str,
+):
+    """
+    Save precomputed reductions of alleles for a configuration.
+
+    Reductions saved by other versions of py-ard are removed.
+
+    :param db_connection: db connection of type sqlite.Connection
+    :param config_hash: hash of the ARDConfig the reductions were made with
+    :param allele_redux: mapping of redux_type to a dict of allele to reduction
+    :param pyard_version: version of py-ard that made the reductions
+    """
+    with timed(db_connection, "allele_redux"):
+        cursor = db_connection.cursor()
+        if "pyard_version" not in _allele_redux_columns(db_connection):
+            # Saved by a version of py-ard without the pyard_version column
+            cursor.execute("DROP TABLE IF EXISTS allele_redux")
+        create_table_sql = """CREATE TABLE IF NOT EXISTS allele_redux (
+                                pyard_version TEXT NOT NULL,
+                                config_hash TEXT NOT NULL,
+                                redux_type TEXT NOT NULL,
+                                allele TEXT NOT NULL,
+                                redux TEXT NOT NULL,
+                                PRIMARY KEY (pyard_version, config_hash, redux_type, allele)
+                        )"""
+        cursor.execute(create_table_sql)
+        # Replace any previous reductions for this configuration, and the
+        # reductions of other versions
+        cursor.execute(
+            "DELETE FROM allele_redux WHERE pyard_version != ? OR config_hash = ?",
+            (pyard_version, config_hash),
+        )
+
+        rows = (
+            (pyard_version, config_hash, redux_type, allele, redux)
+            for redux_type, mapping in allele_redux.items()
+            for allele, redux in mapping.items()
+        )
+        cursor.executemany("INSERT INTO allele_redux VALUES (?, ?, ?, ?, ?)", rows)
+
+        # commit transaction - writes to the db
+        db_connection.commit()
+        # close the cursor
+        cursor.close()
+
+
+def load_allele_redux(
+    db_connection: sqlite3.Connection, config_hash: str, pyard_version: str
+) -> Dict[str, Dict[str, str]]:
+    """
+    Load precomputed reductions of alleles for a configuration.
+
+    :param db_connection: db connection of type sqlite.Connection
+    :param config_hash: hash of the ARDConfig the reductions were made with
+    :param pyard_version: version of py-ard that made the reductions
+    :return: mapping of redux_type to a dict of allele to reduction.
+             Empty if no reductions were saved for the configuration by the
+             version.
+    """
+    allele_redux = {}
+    if "pyard_version" not in _allele_redux_columns(db_connection):
+        return allele_redux
+
+    query = (
+        "SELECT redux_type, allele, redux FROM allele_redux"
+        " WHERE pyard_version = ? AND config_hash = ?"
+    )
+    cursor = db_connection.execute(query, (pyard_version, config_hash))
+    for redux_type, allele, redux in cursor.fetchall():
+        allele_redux.setdefault(redux_type, {})[allele] = redux
     cursor.close()
+    return allele_redux
 
 
 def load_v2_v3_mappings(db_connection):
@@ -36,6 +36,14 @@ class InvalidAlleleError(PyArdError):
         return f"Invalid Allele: {self.message}"
 
 
+class LocusNotLoadedError(InvalidAlleleError):
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+
+    def __str__(self) -> str:
+        return f"Locus Not Loaded: {self.message}"
+
+
 class InvalidMACError(PyArdError):
     def __init__(self, message: str) -> None:
         super().__init__(message)
@@ -49,5 +57,9 @@ class InvalidTypingError(PyArdError):
         super().__init__(message)
         self.cause = cause
 
+    def __reduce__(self):
+        # Keep the cause when sent from a worker process
+        return type(self), (self.message, self.cause)
+
     def __str__(self) -> str:
         return f"Invalid HLA Typing: {self.message}"
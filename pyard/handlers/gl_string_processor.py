@@ -1,14 +1,69 @@
 # -*- coding: utf-8 -*-
 
 import functools
-from typing import List, TYPE_CHECKING
+from typing import Iterator, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
 
-from ..constants import VALID_REDUCTION_TYPE
+from ..constants import VALID_REDUCTION_TYPE, DEFAULT_CACHE_SIZE
+from ..exceptions import InvalidAlleleError
 from ..misc import validate_reduction_type
 
 if TYPE_CHECKING:
     from ..ard import ARD
 
+# GL string delimiters in order of precedence
+GL_DELIMITERS = ("^", "|", "+", "~", "/")
+
+
+class GLString(NamedTuple):
+    """Parsed GL string
+
+    A node splits `text` on `delimiter` into `parts`. A leaf node is a
+    single allele/code and has no delimiter and no parts.
+    """
+
+    text: str
+    delimiter: Optional[str] = None
+    parts: Tuple["GLString", ...] = ()
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.delimiter is None
+
+    def leaves(self) -> Iterator[str]:
+        """Alleles/codes of the GL string from left to right"""
+        if self.is_leaf:
+            yield self.text
+        else:
+            for part in self.parts:
+                yield from part.leaves()
+
+
+def _parse_gl_string(glstring: str, level: int) -> GLString:
+    for index in range(level, len(GL_DELIMITERS)):
+        delimiter = GL_DELIMITERS[index]
+        if delimiter in glstring:
+            parts = tuple(
+                _parse_gl_string(part, index + 1) for part in glstring.split(delimiter)
+            )
+            return GLString(glstring, delimiter, parts)
+    return GLString(glstring)
+
+
+@functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def parse_gl_string(glstring: str) -> GLString:
+    """Parse a GL string into a tree of its delimiters and alleles
+
+    The tree is cached by the GL string so that validating and reducing
+    it in several reduction types tokenizes it only once.
+
+    Args:
+        glstring: GL string to parse (e.g., "A*01:01+A*02:01^B*07:02")
+
+    Returns:
+        Root node of the parsed GL string
+    """
+    return _parse_gl_string(glstring, 0)
+
 
 class GLStringHandler:
     """Handles GL string parsing, validation and processing
@@ -49,43 +104,39 @@ class GLStringHandler:
         """
         validate_reduction_type(redux_type)
 
+        gl = parse_gl_string(glstring)
         # Validate GL string structure if strict mode is enabled
         if self.ard.config.strict_enabled:
-            self.validate_gl_string(glstring)
+            self.validate_gl(gl)
 
-        # Handle GL string delimiters in order of precedence
-        # Unphased genotype list (highest precedence)
-        if "^" in glstring:
-            return self._sorted_unique_gl(
-                [self.ard.redux(a, redux_type) for a in glstring.split("^")], "^"
-            )
+        # Single allele - return as-is for further processing
+        if gl.is_leaf:
+            return glstring
 
-        # Phased genotype list
-        if "|" in glstring:
-            return self._sorted_unique_gl(
-                [self.ard.redux(a, redux_type) for a in glstring.split("|")], "|"
-            )
+        return self._sorted_unique_gl(
+            [self.ard.redux(part.text, redux_type) for part in gl.parts],
+            gl.delimiter,
+        )
 
-        # Allele list (multiple alleles at same locus)
-        if "+" in glstring:
-            return self._sorted_unique_gl(
-                [self.ard.redux(a, redux_type) for a in glstring.split("+")], "+"
-            )
+    def reduce_gl(self, gl: GLString, redux_type: VALID_REDUCTION_TYPE) -> str:
+        """Reduce a parsed GL string
 
-        # Possible allele list
-        if "~" in glstring:
-            return self._sorted_unique_gl(
-                [self.ard.redux(a, redux_type) for a in glstring.split("~")], "~"
-            )
+        Walks the parsed tree instead of re-splitting the GL string at
+        every level. The GL string is expected to be already validated.
 
-        # Ambiguous allele list (lowest precedence)
-        if "/" in glstring:
-            return self._sorted_unique_gl(
-                [self.ard.redux(a, redux_type) for a in glstring.split("/")], "/"
-            )
+        Args:
+            gl: Parsed GL string
+            redux_type: Type of reduction to apply to each allele
 
-        # Single allele - return as-is for further processing
-        return glstring
+        Returns:
+            Reduced GL string
+        """
+        if gl.is_leaf:
+            return self.ard._redux_single_typing(gl.text, redux_type)
+
+        return self._sorted_unique_gl(
+            [self.reduce_gl(part, redux_type) for part in gl.parts], gl.delimiter
+        )
 
     def _sorted_unique_gl(self, gls: List[str], delim: str) -> str:
         """Make a list of sorted unique GL Strings separated by delim
@@ -111,13 +162,8 @@ class GLStringHandler:
         if delim == "+":
             non_empty_gls = filter(lambda s: s != "", gls)
             return delim.join(
-                sorted(
-                    non_empty_gls,
-                    key=functools.cmp_to_key(
-                        lambda a, b: self.ard.smart_sort_comparator(
-                            a, b, self.ard.config.ignore_allele_with_suffixes
-                        )
-                    ),
+                self.ard.smart_sorted(
+                    non_empty_gls, self.ard.config.ignore_allele_with_suffixes
                 )
             )
 
@@ -127,20 +173,15 @@ class GLStringHandler:
             all_gls += gl.split(delim)
         unique_gls = filter(lambda s: s != "", set(all_gls))
         return delim.join(
-            sorted(
-                unique_gls,
-                key=functools.cmp_to_key(
-                    lambda a, b: self.ard.smart_sort_comparator(
-                        a, b, self.ard.config.ignore_allele_with_suffixes
-                    )
-                ),
+            self.ard.smart_sorted(
+                unique_gls, self.ard.config.ignore_allele_with_suffixes
             )
         )
 
     def validate_gl_string(self, glstring: str) -> bool:
         """Validate GL string structure and components
 
-        Recursively validates GL string by parsing delimiters and checking
+        Parses the GL string into its delimiters and checks
         that all leaf components (individual alleles) are valid according
         to the ARD database.
 
@@ -153,22 +194,22 @@ class GLStringHandler:
         Raises:
             InvalidAlleleError: If any component allele is invalid
         """
-        # Recursively validate components separated by each delimiter type
-        if "^" in glstring:
-            return all(map(self.validate_gl_string, glstring.split("^")))
-        if "|" in glstring:
-            return all(map(self.validate_gl_string, glstring.split("|")))
-        if "+" in glstring:
-            return all(map(self.validate_gl_string, glstring.split("+")))
-        if "~" in glstring:
-            return all(map(self.validate_gl_string, glstring.split("~")))
-        if "/" in glstring:
-            return all(map(self.validate_gl_string, glstring.split("/")))
-
-        # Base case: validate individual allele against database
-        is_valid_allele = self.ard._is_valid(glstring)
-        if not is_valid_allele:
-            from ..exceptions import InvalidAlleleError
-
-            raise InvalidAlleleError(f"{glstring} is not a valid Allele")
-        return is_valid_allele
+        return self.validate_gl(parse_gl_string(glstring))
+
+    def validate_gl(self, gl: GLString) -> bool:
+        """Validate all the alleles of a parsed GL string
+
+        Args:
+            gl: Parsed GL string
+
+        Returns:
+            True if all components are valid
+
+        Raises:
+            InvalidAlleleError: If any component allele is invalid
+        """
+        for allele in gl.leaves():
+            self.ard._check_locus(allele)
+            if not self.ard._is_valid(allele):
+                raise InvalidAlleleError(f"{allele} is not a valid Allele")
+        return True
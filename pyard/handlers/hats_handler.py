@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import functools
 from typing import TYPE_CHECKING
 
 
@@ -24,9 +23,4 @@ class HATSHandler:
         hats_alleles_same_locus = filter(
             lambda a: a.split("*")[0] == locus, hats_alleles_2fields
         )
-        return "/".join(
-            sorted(
-                hats_alleles_same_locus,
-                key=functools.cmp_to_key(self.ard.smart_sort_comparator),
-            )
-        )
+        return "/".join(self.ard.smart_sorted(hats_alleles_same_locus))
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 
-import functools
 import sqlite3
+import sys
 from collections import Counter
-from typing import Iterable, TYPE_CHECKING
+from typing import Dict, Iterable, Optional, TYPE_CHECKING
 
 from .. import db
-from ..constants import HLA_regex, DEFAULT_CACHE_SIZE
+from ..cache import CachedFunction, create_cache
+from ..constants import HLA_regex, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_POLICY
 from ..exceptions import InvalidMACError
+from ..mappings import MACExpansion
 
 if TYPE_CHECKING:
     from ..ard import ARD
@@ -30,8 +32,46 @@ class MACHandler:
             ard_instance: The main ARD object for database access
         """
         self.ard = ard_instance
+        # MAC code -> MACExpansion when loaded in memory with load_mac_codes()
+        self.mac_codes: Optional[Dict[str, MACExpansion]] = None
+        # Per-instance cache of MAC lookups. ARD replaces the caches with its own.
+        self.is_mac = CachedFunction(
+            self.is_mac, create_cache(DEFAULT_CACHE_POLICY, DEFAULT_CACHE_SIZE)
+        )
+        self.get_alleles = CachedFunction(
+            self.get_alleles, create_cache(DEFAULT_CACHE_POLICY, DEFAULT_CACHE_SIZE)
+        )
+
+    def load_mac_codes(self) -> None:
+        """Load all the MAC codes in memory
+
+        MAC lookups then use the in-memory MAC codes instead of querying
+        the database. Allele names are interned as they are shared by
+        many MAC codes.
+        """
+        mac_codes = {}
+        if db.table_exists(self.ard.db_connection, "mac_codes"):
+            for code, alleles in db.load_mac_codes(self.ard.db_connection):
+                mac_codes[code] = create_mac_expansion(map(sys.intern, alleles))
+        self.mac_codes = mac_codes
+        self.is_mac.cache_clear()
+        self.get_alleles.cache_clear()
+
+    def get_mac_expansion(self, code: str) -> Optional[MACExpansion]:
+        """Get the alleles of a MAC code
+
+        Args:
+            code: MAC code suffix (e.g., 'AB')
+
+        Returns:
+            MACExpansion of the code or None if the code doesn't exist
+        """
+        if self.mac_codes is not None:
+            return self.mac_codes.get(code)
+        return create_mac_expansion(
+            db.mac_code_to_alleles(self.ard.db_connection, code)
+        )
 
-    @functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
     def is_mac(self, allele: str) -> bool:
         """Check if allele is a valid MAC code
 
@@ -53,17 +93,14 @@ class MACHandler:
                 # MAC codes have alphabetic suffixes (not numeric)
                 if code.isalpha():
                     try:
-                        # Query database for alleles associated with this MAC code
-                        alleles = db.mac_code_to_alleles(self.ard.db_connection, code)
-                        if alleles:
-                            # Check if MAC expands to full allele names (contains ':')
-                            if any(map(lambda a: ":" in a, alleles)):
+                        # Look up alleles associated with this MAC code
+                        expansion = self.get_mac_expansion(code)
+                        if expansion:
+                            # MAC expands to full allele names (contains ':')
+                            if expansion.antigen_group is not None:
                                 # Validate that the antigen group matches
-                                antigen_groups = map(lambda a: a.split(":")[0], alleles)
-                                antigen_counts = Counter(antigen_groups)
-                                valid_antigen = antigen_counts.most_common(1).pop()[0]
                                 provided_antigen = locus_antigen.split("*").pop()
-                                return provided_antigen == valid_antigen
+                                return provided_antigen == expansion.antigen_group
                             return True
                     except sqlite3.OperationalError as e:
                         print("Error: ", e)
@@ -136,11 +173,7 @@ class MACHandler:
             return f"{locus}*{antigen_groups[0]}:{mac_code}"
 
         # Strategy 2: Try alleles in sorted order
-        mac_expansion = "/".join(
-            sorted(
-                allele_fields, key=functools.cmp_to_key(self.ard.smart_sort_comparator)
-            )
-        )
+        mac_expansion = "/".join(self.ard.smart_sorted(allele_fields))
         mac_code = db.alleles_to_mac_code(self.ard.db_connection, mac_expansion)
         if mac_code:
             locus = allelelist_gl.split("*")[0]
@@ -151,8 +184,9 @@ class MACHandler:
     def get_alleles(self, code, locus_antigen) -> Iterable[str]:
         """Get alleles for MAC code
 
-        Retrieves the list of alleles that a MAC code represents from the database.
+        Retrieves the list of alleles that a MAC code represents.
         Handles two formats: full allele expansions and field suffix expansions.
+        Results are cached per code and locus_antigen.
 
         Args:
             code: MAC code suffix (e.g., 'AB', 'XX')
@@ -162,18 +196,40 @@ class MACHandler:
             List of alleles that the MAC code represents, filtered to only
             include alleles present in the current database
         """
-        # Query database for alleles associated with this MAC code
-        alleles = db.mac_code_to_alleles(self.ard.db_connection, code)
+        # Look up alleles associated with this MAC code
+        expansion = self.get_mac_expansion(code)
+        if not expansion:
+            return []
 
         # Check if MAC expands to full allele names (contains ':')
-        is_allelic_expansion = any([":" in allele for allele in alleles])
-        if is_allelic_expansion:
+        if expansion.antigen_group is not None:
             # Full allele format: prepend locus only
             locus = locus_antigen.split("*")[0]
-            alleles = [f"{locus}*{a}" for a in alleles]
+            alleles = [f"{locus}*{a}" for a in expansion.alleles]
         else:
             # Field suffix format: append to locus_antigen
-            alleles = [f"{locus_antigen}:{a}" for a in alleles]
+            alleles = [f"{locus_antigen}:{a}" for a in expansion.alleles]
 
         # Filter to only include alleles that exist in current database
         return list(filter(self.ard._is_allele_in_db, alleles))
+
+
+def create_mac_expansion(alleles: Iterable[str]) -> Optional[MACExpansion]:
+    """Create the MACExpansion of a list of alleles of a MAC code
+
+    Args:
+        alleles: alleles (e.g., ['01:01', '02:01']) or field suffixes
+                 (e.g., ['01', '02']) of a MAC code
+
+    Returns:
+        MACExpansion with the most common antigen group of full allele names,
+        or None if there are no alleles
+    """
+    alleles = tuple(alleles)
+    if not alleles:
+        return None
+    antigen_group = None
+    if any(":" in allele for allele in alleles):
+        antigen_counts = Counter(allele.split(":")[0] for allele in alleles)
+        antigen_group = antigen_counts.most_common(1).pop()[0]
+    return MACExpansion(alleles, antigen_group)
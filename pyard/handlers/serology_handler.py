@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import functools
 from typing import Iterable, TYPE_CHECKING
 
 from .. import db
@@ -26,7 +25,6 @@ class SerologyHandler:
         """
         self.ard = ard_instance
 
-    @functools.lru_cache(maxsize=1_000)
     def is_serology(self, allele: str) -> bool:
         """Check if allele is valid serology
 
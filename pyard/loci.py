@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Reference data of some loci only.
+
+With the `loci` configuration, ARD keeps the entries of the mappings whose
+names are of the configured loci, e.g. `A*01:01` or the serology `A1` for
+`A`. Names without a locus are kept.
+"""
+
+from typing import Dict, Iterable, Optional
+
+from .constants import HLA_regex
+from .serology import SerologyMapping, sero_antigen_regex, serology_locus_mapping
+
+# Locus of each recognized serology
+_serology_loci = {
+    serology: locus
+    for locus, serologies in SerologyMapping.valid_serology_map.items()
+    for serology in serologies
+}
+
+
+def locus_of(name: str) -> Optional[str]:
+    """
+    Locus of an allele, group, XX code, MAC or serology
+
+    :param name: e.g. A*01:01, HLA-B*07:AB or DR4
+    :return: locus e.g. A, B or DRB1. None if the name has no locus.
+    """
+    if HLA_regex.search(name):
+        name = name[4:]
+    if "*" in name:
+        return name.split("*")[0]
+    if name in _serology_loci:
+        return _serology_loci[name]
+    match = sero_antigen_regex.fullmatch(name)
+    if match:
+        antigen_locus = match.group(1)
+        return serology_locus_mapping.get(antigen_locus, antigen_locus)
+    return None
+
+
+def _in_loci(name: str, loci: frozenset) -> bool:
+    locus = locus_of(name)
+    return locus is None or locus in loci
+
+
+def scope_names(names, loci: frozenset):
+    """
+    Names of the loci
+
+    :param names: set, list or dict with names as keys
+    :param loci: loci to keep
+    :return: same type of container with the names of the loci
+    """
+    if isinstance(names, dict):
+        return {k: v for k, v in names.items() if _in_loci(k, loci)}
+    return type(names)(name for name in names if _in_loci(name, loci))
+
+
+def scope_mappings(mappings: Dict[str, object], loci: Iterable[str]) -> dict:
+    """
+    Mappings of ARD with the entries of the loci
+
+    :param mappings: ARD mappings by attribute name, see
+        `ARD._SNAPSHOT_ATTRIBUTES`
+    :param loci: loci to keep
+    :return: new mappings by attribute name
+    :raises ValueError: if a locus has no alleles in the mappings
+    """
+    loci = frozenset(loci)
+    alleles = mappings["allele_group"].alleles
+    unknown_loci = loci - {locus_of(allele) for allele in alleles}
+    if unknown_loci:
+        raise ValueError(
+            f"No alleles for the loci {', '.join(sorted(unknown_loci))} "
+            "in the reference database"
+        )
+
+    scoped = dict(mappings)
+    for name in ("ars_mappings", "code_mappings", "allele_group"):
+        namedtuple_mappings = mappings[name]
+        scoped[name] = type(namedtuple_mappings)(
+            *(scope_names(mapping, loci) for mapping in namedtuple_mappings)
+        )
+    scoped["shortnulls"] = scope_names(mappings["shortnulls"], loci)
+    scoped["sort_ranks"] = scope_names(mappings["sort_ranks"], loci)
+    scoped["cwd_alleles"] = {
+        locus: alleles
+        for locus, alleles in mappings["cwd_alleles"].items()
+        if locus in loci
+    }
+    serology_mapping = mappings["serology_mapping"]
+    scoped["serology_mapping"] = SerologyMapping(
+        scope_names(serology_mapping.broad_splits_map, loci),
+        scope_names(serology_mapping.serology_associated_map, loci),
+    )
+    return scoped
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Read-only mapping tables in a memory-mapped file.
+
+Dicts and sets of names are stored in `pyard-3440.mapped` next to the
+reference database and used in place without being loaded. The pages of
+the file are shared by all the processes that map it, and unlike Python
+objects they are never written to, so forked workers don't end up with
+private copies of the reference data.
+
+The file starts with a header and a JSON table of contents:
+
+    MAGIC | format version | key length | contents length | key | contents
+
+followed by arrays of native uint32 values and the strings:
+
+* string table: every name once, in sorted order, as UTF-8 bytes with an
+  offset array. A name is found by its id with an open addressing hash
+  table of CRC-32 hashes, so a lookup doesn't search the names.
+* set: sorted string ids of the members.
+* dict: sorted string ids of the keys with the string id of each value.
+  List values are stored joined with `/`, like in the database. The
+  sorted ids of the distinct values make `value in d.values()` a binary
+  search.
+
+The file is made for the machine that writes it.
+"""
+
+import array
+import bisect
+import json
+import mmap
+import os
+import pathlib
+import struct
+import zlib
+from collections.abc import Mapping, Set, ValuesView
+from typing import Dict, Iterable, Optional, Union
+
+MAGIC = b"PYARDMAP"
+# Change when the layout of the file changes
+MAPPED_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIII")
+_UINT32 = "I"
+_ALIGNMENT = 8
+
+
+def mapped_tables_filename(db_filename: str, loci: Iterable[str] = ()) -> str:
+    """
+    Name of the mapped tables next to the reference database
+
+    :param db_filename: reference database file e.g. pyard-3440.sqlite3
+    :param loci: loci of the tables, all if empty
+    :return: mapped tables file e.g. pyard-3440.mapped or
+        pyard-3440-A-B.mapped for the loci A and B
+    """
+    path = pathlib.Path(db_filename)
+    stem = "-".join([path.stem, *loci])
+    return str(path.with_name(stem).with_suffix(".mapped"))
+
+
+def _uint32_array(values: Iterable[int]) -> array.array:
+    uint32_array = array.array(_UINT32, values)
+    assert uint32_array.itemsize == 4
+    return uint32_array
+
+
+def _hash_slots(strings: list) -> array.array:
+    n_slots = 1
+    while n_slots < 2 * len(strings):
+        n_slots *= 2
+    mask = n_slots - 1
+    # 0 is an empty slot, otherwise the string id + 1
+    slots = _uint32_array([0]) * n_slots
+    for string_id, string in enumerate(strings):
+        slot = zlib.crc32(string) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = string_id + 1
+    return slots
+
+
+def save_mapped_tables(
+    filename: str, key: str, tables: Dict[str, Union[Mapping, Set]]
+) -> bool:
+    """
+    Save the tables to a file that can be memory-mapped
+
+    The file is written to a temporary file that replaces the previous
+    file, so processes never map a partial file.
+
+    :param filename: mapped tables file
+    :param key: key of the reference database the tables were loaded from
+    :param tables: name -> set of names, dict of names to a name or dict
+        of names to a list of names
+    :return: True if the file was saved
+    """
+    list_tables = {
+        name
+        for name, table in tables.items()
+        if isinstance(table, Mapping)
+        and not all(isinstance(value, str) for value in table.values())
+    }
+    tables = dict(tables)
+    for name in list_tables:
+        tables[name] = {k: "/".join(v) for k, v in tables[name].items()}
+
+    strings = set()
+    for table in tables.values():
+        strings.update(table)
+        if isinstance(table, Mapping):
+            strings.update(table.values())
+    strings = sorted(strings)
+    string_ids = {string: string_id for string_id, string in enumerate(strings)}
+    encoded_strings = [string.encode() for string in strings]
+
+    sections = []
+
+    def add_section(data: bytes) -> int:
+        # Offset from the end of the contents
+        offset = sum(len(section) for section in sections)
+        sections.append(data)
+        padding = -len(data) % _ALIGNMENT
+        if padding:
+            sections.append(b"\0" * padding)
+        return offset
+
+    string_offsets = [0]
+    for encoded_string in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(encoded_string))
+    slots = _hash_slots(encoded_strings)
+    contents = {
+        "strings": {
+            "count": len(strings),
+            "offsets": add_section(_uint32_array(string_offsets).tobytes()),
+            "data": add_section(b"".join(encoded_strings)),
+            "slots": add_section(slots.tobytes()),
+            "n_slots": len(slots),
+        },
+        "tables": {},
+    }
+
+    for name, table in tables.items():
+        keys = sorted(table)
+        table_contents = {
+            "count": len(keys),
+            "keys": add_section(_uint32_array(string_ids[k] for k in keys).tobytes()),
+        }
+        if isinstance(table, Mapping):
+            table_contents["kind"] = "list_dict" if name in list_tables else "dict"
+            values = _uint32_array(string_ids[table[k]] for k in keys)
+            distinct_values = _uint32_array(sorted(set(values)))
+            table_contents["values"] = add_section(values.tobytes())
+            table_contents["distinct_values"] = add_section(distinct_values.tobytes())
+            table_contents["n_distinct_values"] = len(distinct_values)
+        else:
+            table_contents["kind"] = "set"
+        contents["tables"][name] = table_contents
+
+    encoded_key = key.encode()
+    encoded_contents = json.dumps(contents).encode()
+    header = _HEADER.pack(
+        MAGIC, MAPPED_FORMAT_VERSION, len(encoded_key), len(encoded_contents)
+    )
+    start = header + encoded_key + encoded_contents
+    start += b"\0" * (-len(start) % _ALIGNMENT)
+
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_filename, "wb") as mapped_file:
+            mapped_file.write(start)
+            for section in sections:
+                mapped_file.write(section)
+        os.replace(tmp_filename, filename)
+    except OSError:
+        # e.g. the data directory is read-only
+        pathlib.Path(tmp_filename).unlink(missing_ok=True)
+        return False
+    return True
+
+
+def load_mapped_tables(filename: str, key: str) -> Optional["MappedTables"]:
+    """
+    Memory-map the tables of a file
+
+    :param filename: mapped tables file
+    :param key: key of the current reference database
+    :return: the mapped tables or None if there's no valid file for the key
+    """
+    try:
+        return MappedTables(filename, key)
+    except (OSError, ValueError):
+        return None
+
+
+class MappedTables:
+    """
+    Tables of a memory-mapped file by name.
+
+    The tables are `MappedSet` and `MappedDict` objects.
+    """
+
+    def __init__(self, filename: str, key: str):
+        """
+        :param filename: mapped tables file
+        :param key: key of the reference database the tables must be
+            loaded from
+        :raises ValueError: if the file isn't a valid mapped tables file for
+            the key
+        """
+        self.filename = filename
+        self.key = key
+        with open(filename, "rb") as mapped_file:
+            self._mmap = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{filename} is not a mapped tables file")
+        magic, format_version, key_length, contents_length = _HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != MAGIC or format_version != MAPPED_FORMAT_VERSION:
+            raise ValueError(f"{filename} is not a mapped tables file")
+        key_end = _HEADER.size + key_length
+        if self._mmap[_HEADER.size : key_end] != key.encode():
+            raise ValueError(f"{filename} is for another reference database")
+        contents_end = key_end + contents_length
+        contents = json.loads(self._mmap[key_end:contents_end])
+        self._start = contents_end + (-contents_end % _ALIGNMENT)
+        self._memoryview = memoryview(self._mmap)
+
+        strings = contents["strings"]
+        self._string_offsets = self._uint32_array(
+            strings["offsets"], strings["count"] + 1
+        )
+        self._string_data = self._start + strings["data"]
+        if self._string_data + self._string_offsets[-1] > len(self._mmap):
+            raise ValueError(f"{filename} is truncated")
+        self._slots = self._uint32_array(strings["slots"], strings["n_slots"])
+        self._mask = strings["n_slots"] - 1
+
+        self.tables = {}
+        for name, table_contents in contents["tables"].items():
+            if table_contents["kind"] == "set":
+                self.tables[name] = MappedSet(self, name, table_contents)
+            else:
+                self.tables[name] = MappedDict(self, name, table_contents)
+
+    def _uint32_array(self, offset: int, count: int) -> memoryview:
+        start = self._start + offset
+        end = start + 4 * count
+        if end > len(self._mmap):
+            raise ValueError(f"{self.filename} is truncated")
+        return self._memoryview[start:end].cast(_UINT32)
+
+    def __getitem__(self, name: str):
+        return self.tables[name]
+
+    def __reduce__(self):
+        # Map the file again instead of copying the tables
+        return MappedTables, (self.filename, self.key)
+
+    def string(self, string_id: int) -> str:
+        """Name with the string id"""
+        offsets = self._string_offsets
+        start = self._string_data + offsets[string_id]
+        end = self._string_data + offsets[string_id + 1]
+        return self._mmap[start:end].decode()
+
+    def string_id(self, string: str) -> int:
+        """String id of a name or -1 if the name isn't in the file"""
+        try:
+            encoded_string = string.encode()
+        except AttributeError:
+            return -1
+        offsets = self._string_offsets
+        slots = self._slots
+        mask = self._mask
+        slot = zlib.crc32(encoded_string) & mask
+        while True:
+            string_id = slots[slot] - 1
+            if string_id < 0:
+                return -1
+            start = self._string_data + offsets[string_id]
+            end = self._string_data + offsets[string_id + 1]
+            if self._mmap[start:end] == encoded_string:
+                return string_id
+            slot = (slot + 1) & mask
+
+
+def _find(sorted_ids: memoryview, string_id: int) -> int:
+    """Position of a string id in the sorted ids or -1"""
+    if string_id < 0:
+        return -1
+    position = bisect.bisect_left(sorted_ids, string_id)
+    if position < len(sorted_ids) and sorted_ids[position] == string_id:
+        return position
+    return -1
+
+
+def _mapped_table(tables: MappedTables, name: str):
+    return tables[name]
+
+
+class _MappedTable:
+    def __init__(self, tables: MappedTables, name: str, table_contents: dict):
+        self._tables = tables
+        self._name = name
+        self._table_contents = table_contents
+        self._keys = tables._uint32_array(
+            table_contents["keys"], table_contents["count"]
+        )
+
+    def _position(self, key) -> int:
+        return _find(self._keys, self._tables.string_id(key))
+
+    def __contains__(self, key):
+        return self._position(key) >= 0
+
+    def __iter__(self):
+        string = self._tables.string
+        for string_id in self._keys:
+            yield string(string_id)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __reduce__(self):
+        return _mapped_table, (self._tables, self._name)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self._name} of {len(self)} names>"
+
+
+class MappedSet(_MappedTable, Set):
+    """Read-only set of names in a `MappedTables` file"""
+
+
+class _MappedValues(ValuesView):
+    def __contains__(self, value):
+        return self._mapping._has_value(value)
+
+
+class MappedDict(_MappedTable, Mapping):
+    """
+    Read-only dict of names in a `MappedTables` file.
+
+    Values are names or lists of names. A new list is returned on each
+    lookup of a list value.
+    """
+
+    def __init__(self, tables: MappedTables, name: str, table_contents: dict):
+        super().__init__(tables, name, table_contents)
+        self._has_lists = table_contents["kind"] == "list_dict"
+        self._values = tables._uint32_array(
+            table_contents["values"], table_contents["count"]
+        )
+        self._distinct_values = tables._uint32_array(
+            table_contents["distinct_values"], table_contents["n_distinct_values"]
+        )
+
+    def _value(self, position: int):
+        value = self._tables.string(self._values[position])
+        if self._has_lists:
+            return value.split("/")
+        return value
+
+    def __getitem__(self, key):
+        position = self._position(key)
+        if position < 0:
+            raise KeyError(key)
+        return self._value(position)
+
+    def get(self, key, default=None):
+        position = self._position(key)
+        if position < 0:
+            return default
+        return self._value(position)
+
+    def values(self):
+        return _MappedValues(self)
+
+    def _has_value(self, value) -> bool:
+        if self._has_lists:
+            if not isinstance(value, list):
+                return False
+            value = "/".join(value)
+        return _find(self._distinct_values, self._tables.string_id(value)) >= 0
@@ -51,3 +51,7 @@ misc_tables = ["cwd2", "shortnulls", "v2_mapping", "mac_codes"]
 ARSMapping = namedtuple("ARSMapping", ars_mapping_tables)
 CodeMappings = namedtuple("CodeMappings", code_mapping_tables)
 AlleleGroups = namedtuple("AlleleGroups", allele_tables)
+
+# Alleles of a MAC code with the most common antigen group when the
+# alleles are 2 field names, e.g. ('01:01', '02:01') and '01'
+MACExpansion = namedtuple("MACExpansion", ["alleles", "antigen_group"])
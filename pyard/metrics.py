@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Metrics in the Prometheus text exposition format.
+
+`Counter` and `Histogram` keep their samples per tuple of label values in
+dicts, so recording a value is a dict lookup and an addition under a lock.
+`ard_metrics` exposes the counters `ARD` already keeps: the cache
+statistics of `ARD.cache_stats()` of each loaded IPD-IMGT/HLA version and
+the lookup queries of `db`.
+"""
+
+import bisect
+import math
+import threading
+from typing import TYPE_CHECKING, Iterable, Iterator, Mapping, Sequence, Tuple
+
+from . import db
+
+if TYPE_CHECKING:
+    from .ard import ARD
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from cached lookups to large GL Strings
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def format_sample(name: str, labels: Iterable[Tuple[str, str]], value) -> str:
+    """
+    A sample line of the text exposition format
+
+    :param name: metric name
+    :param labels: label name and value pairs
+    :param value: sample value
+    :return: line e.g. `pyard_requests_total{endpoint="redux"} 3`
+    """
+    label_text = ",".join(
+        f'{label_name}="{_escape(str(label_value))}"'
+        for label_name, label_value in labels
+    )
+    if label_text:
+        return f"{name}{{{label_text}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def format_header(name: str, help_text: str, metric_type: str) -> Iterator[str]:
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {metric_type}"
+
+
+class Counter:
+    """Counter with a value per tuple of label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        """
+        :param name: metric name, e.g. pyard_requests_total
+        :param help_text: description of the metric
+        :param label_names: names of the labels
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, label_values: Tuple[str, ...] = ()) -> float:
+        return self._values.get(label_values, 0)
+
+    def expose(self) -> Iterator[str]:
+        yield from format_header(self.name, self.help_text, "counter")
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield format_sample(self.name, zip(self.label_names, label_values), value)
+
+
+class Histogram:
+    """Histogram with bucket counts per tuple of label values"""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        :param name: metric name, e.g. pyard_request_duration_seconds
+        :param help_text: description of the metric
+        :param label_names: names of the labels
+        :param buckets: upper bounds of the buckets in increasing order
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count of each bucket and +Inf, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[bucket] += 1
+            series[-1] += value
+
+    def count(self, label_values: Tuple[str, ...] = ()) -> int:
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def expose(self) -> Iterator[str]:
+        yield from format_header(self.name, self.help_text, "histogram")
+        with self._lock:
+            all_series = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in all_series:
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for upper_bound, bucket_count in zip(
+                self.buckets + (math.inf,), series[:-1]
+            ):
+                cumulative += bucket_count
+                yield format_sample(
+                    f"{self.name}_bucket",
+                    labels + [("le", _format_value(float(upper_bound)))],
+                    cumulative,
+                )
+            yield format_sample(f"{self.name}_sum", labels, series[-1])
+            yield format_sample(f"{self.name}_count", labels, cumulative)
+
+
+def ard_metrics(ards: Mapping[str, "ARD"]) -> Iterator[str]:
+    """
+    Cache statistics of ARD instances and the lookup queries of `db`
+
+    :param ards: ARD instances by IPD-IMGT/HLA version
+    :return: lines of the text exposition format
+    """
+    cache_stats = sorted(
+        (str(version), cache_name, cache_info)
+        for version, ard in ards.items()
+        for cache_name, cache_info in ard.cache_stats().items()
+    )
+    for name, field, metric_type, help_text in (
+        ("pyard_cache_hits_total", "hits", "counter", "Cache hits of the method"),
+        ("pyard_cache_misses_total", "misses", "counter", "Cache misses of the method"),
+        (
+            "pyard_cache_evictions_total",
+            "evictions",
+            "counter",
+            "Cache evictions of the method",
+        ),
+        ("pyard_cache_size", "currsize", "gauge", "Entries in the cache of the method"),
+    ):
+        yield from format_header(name, help_text, metric_type)
+        for version, cache_name, cache_info in cache_stats:
+            yield format_sample(
+                name,
+                [("ipd_version", version), ("cache", cache_name)],
+                getattr(cache_info, field),
+            )
+
+    name = "pyard_db_queries_total"
+    yield from format_header(name, "SQLite queries run by the db function", "counter")
+    for function_name, count in sorted(db.get_query_counts().items()):
+        yield format_sample(name, [("function", function_name)], count)
+
+
+def expose(metrics: Iterable, ards: Mapping[str, "ARD"] = None) -> str:
+    """
+    Text exposition of the metrics
+
+    :param metrics: Counter and Histogram metrics
+    :param ards: ARD instances by IPD-IMGT/HLA version to include the
+        metrics of
+    :return: text in the exposition format
+    """
+    lines = [line for metric in metrics for line in metric.expose()]
+    if ards is not None:
+        lines.extend(ard_metrics(ards))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Parallel reduction of large batches.
+
+Workers are forked from the current process, so they inherit the loaded
+(and `gc.freeze()`-ed) reference data of the ARD instance instead of
+initializing their own. Each worker opens its own database connections.
+"""
+
+import itertools
+import math
+import multiprocessing
+import os
+from typing import TYPE_CHECKING, Iterable, List, Union
+
+from .constants import VALID_REDUCTION_TYPE
+from .exceptions import PyArdError
+from .misc import validate_reduction_type
+
+if TYPE_CHECKING:
+    from .ard import ARD
+
+# Number of chunks per worker, so that slow chunks don't leave workers idle
+CHUNKS_PER_WORKER = 4
+
+# ARD instance inherited by the forked workers
+_worker_ard = None
+
+
+def _init_worker():
+    # sqlite connections can't be shared across processes
+    _worker_ard._reconnect()
+
+
+def _redux_chunk(chunk: List[str], redux_type) -> List:
+    results = _worker_ard.redux_many(chunk, redux_type, return_errors=True)
+    if _worker_ard.persistent_cache is not None:
+        _worker_ard.persistent_cache.flush()
+    return results
+
+
+def _raise_first_error(results: List):
+    for result in results:
+        reduced = result.values() if isinstance(result, dict) else (result,)
+        for a_reduced in reduced:
+            if isinstance(a_reduced, PyArdError):
+                # Raise what redux_many raises, e.g. the ValueError of a
+                # malformed typing returned as an InvalidTypingError
+                if getattr(a_reduced, "cause", None) is not None:
+                    raise a_reduced.cause
+                raise a_reduced
+
+
+def can_fork() -> bool:
+    """Is the fork start method available on this platform?"""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def redux_parallel(
+    ard: "ARD",
+    glstrings: Iterable[str],
+    redux_type: Union[VALID_REDUCTION_TYPE, Iterable[VALID_REDUCTION_TYPE]] = "lgx",
+    workers: int = None,
+    chunk_size: int = None,
+    return_errors: bool = False,
+) -> List:
+    """Reduce a batch of GL Strings with a pool of forked processes
+
+    Distinct GL Strings are split into chunks that are reduced with
+    `ARD.redux_many` in the workers. Results are returned in input order.
+    Falls back to `ARD.redux_many` in the current process when there's
+    a single worker or the platform doesn't support fork.
+
+    Args:
+        ard: ARD instance with the loaded reference data
+        glstrings: GL Strings/alleles to reduce
+        redux_type: A reduction type, or an iterable of reduction types
+        workers: Number of worker processes. Defaults to the number of CPUs
+        chunk_size: Number of distinct GL Strings sent to a worker at a time
+        return_errors: When True, a `PyArdError` raised while reducing an
+            item is returned in place of its result instead of being raised
+
+    Returns:
+        Results in input order, as returned by `ARD.redux_many`
+    """
+    if isinstance(redux_type, str):
+        redux_types = (redux_type,)
+    else:
+        redux_type = redux_types = tuple(redux_type)
+    for a_redux_type in redux_types:
+        validate_reduction_type(a_redux_type)
+
+    glstrings = list(glstrings)
+    unique_glstrings = list(dict.fromkeys(glstrings))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(unique_glstrings) <= 1 or not can_fork():
+        return ard.redux_many(glstrings, redux_type, return_errors)
+
+    if chunk_size is None:
+        chunk_size = math.ceil(len(unique_glstrings) / (workers * CHUNKS_PER_WORKER))
+    chunks = [
+        unique_glstrings[i : i + chunk_size]
+        for i in range(0, len(unique_glstrings), chunk_size)
+    ]
+
+    # Let the workers find the results reduced so far
+    if ard.persistent_cache is not None:
+        ard.persistent_cache.flush()
+
+    global _worker_ard
+    _worker_ard = ard
+    try:
+        context = multiprocessing.get_context("fork")
+        pool = context.Pool(min(workers, len(chunks)), initializer=_init_worker)
+        with pool:
+            chunk_results = pool.starmap(
+                _redux_chunk, [(chunk, redux_type) for chunk in chunks]
+            )
+    finally:
+        _worker_ard = None
+
+    reduced = dict(zip(unique_glstrings, itertools.chain.from_iterable(chunk_results)))
+    results = [reduced[glstring] for glstring in glstrings]
+    if not return_errors:
+        _raise_first_error(results)
+    return results
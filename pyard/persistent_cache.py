@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Persistent reduction cache shared across processes and restarts.
+
+Reductions are stored in a SQLite database of the py-ard version next to
+the reference database, e.g. `pyard-3440-cache-2.3.1.sqlite3` next to
+`pyard-3440.sqlite3`, so results of older versions aren't used after an
+upgrade. Results are keyed by the IPD/IMGT-HLA version, the ARDConfig hash,
+the redux type and the GL String. The database uses write-ahead logging, so many processes can
+read it while one of them writes.
+"""
+
+import pathlib
+import sqlite3
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+# Number of new results kept in memory before writing them to the database
+DEFAULT_FLUSH_SIZE = 1_000
+# Seconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 30
+
+
+def persistent_cache_filename(db_filename: str, pyard_version: str = None) -> str:
+    """
+    Name of the persistent cache next to the reference database
+
+    :param db_filename: reference database file e.g. pyard-3440.sqlite3
+    :param pyard_version: version of py-ard storing the results, the
+        running one if None
+    :return: cache database file e.g. pyard-3440-cache-2.3.1.sqlite3
+    """
+    if pyard_version is None:
+        from . import __version__ as pyard_version
+
+    db_path = pathlib.Path(db_filename)
+    return str(
+        db_path.with_name(f"{db_path.stem}-cache-{pyard_version}{db_path.suffix}")
+    )
+
+
+class PersistentCache:
+    """
+    Reduction results stored on disk.
+
+    New results are buffered and written in batches of `flush_size`.
+    Pending results are written when the cache is flushed, closed or
+    garbage collected, and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        imgt_version: str,
+        config_hash: str,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+    ):
+        self.filename = filename
+        self.imgt_version = str(imgt_version)
+        self.config_hash = config_hash
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._connection = _connect(filename)
+        self._finalizer = weakref.finalize(
+            self,
+            _flush_and_close,
+            self._connection,
+            self._lock,
+            self._pending,
+            self.imgt_version,
+            self.config_hash,
+        )
+
+    def get(self, glstring: str, redux_type: str) -> Optional[str]:
+        """
+        Find the stored reduction of a GL String
+
+        :param glstring: GL String that was reduced
+        :param redux_type: reduction type
+        :return: the reduced GL String or None if not found
+        """
+        with self._lock:
+            redux = self._pending.get((redux_type, glstring))
+            if redux is not None:
+                return redux
+            cursor = self._connection.execute(
+                "SELECT redux FROM redux_cache "
+                "WHERE imgt_version = ? AND config_hash = ? "
+                "AND redux_type = ? AND glstring = ?",
+                (self.imgt_version, self.config_hash, redux_type, glstring),
+            )
+            row = cursor.fetchone()
+            cursor.close()
+        return row[0] if row else None
+
+    def put(self, glstring: str, redux_type: str, redux: str) -> None:
+        """
+        Store the reduction of a GL String
+
+        :param glstring: GL String that was reduced
+        :param redux_type: reduction type
+        :param redux: the reduced GL String
+        """
+        with self._lock:
+            self._pending[(redux_type, glstring)] = redux
+            if len(self._pending) >= self.flush_size:
+                _flush(
+                    self._connection,
+                    self._pending,
+                    self.imgt_version,
+                    self.config_hash,
+                )
+
+    def flush(self) -> None:
+        """Write pending results to the database"""
+        with self._lock:
+            _flush(self._connection, self._pending, self.imgt_version, self.config_hash)
+
+    def count(self) -> int:
+        """Number of stored results for this version and configuration"""
+        self.flush()
+        cursor = self._connection.execute(
+            "SELECT count(*) FROM redux_cache "
+            "WHERE imgt_version = ? AND config_hash = ?",
+            (self.imgt_version, self.config_hash),
+        )
+        (count,) = cursor.fetchone()
+        cursor.close()
+        return count
+
+    def clear(self) -> None:
+        """Remove the stored results for this version and configuration"""
+        with self._lock:
+            self._pending.clear()
+            with self._connection:
+                self._connection.execute(
+                    "DELETE FROM redux_cache "
+                    "WHERE imgt_version = ? AND config_hash = ?",
+                    (self.imgt_version, self.config_hash),
+                )
+
+    def close(self) -> None:
+        """Write pending results and close the database"""
+        self._finalizer()
+
+
+def _connect(filename: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        filename, timeout=BUSY_TIMEOUT, check_same_thread=False
+    )
+    # Readers don't block the writer and the writer doesn't block readers
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("""CREATE TABLE IF NOT EXISTS redux_cache (
+            imgt_version TEXT NOT NULL,
+            config_hash TEXT NOT NULL,
+            redux_type TEXT NOT NULL,
+            glstring TEXT NOT NULL,
+            redux TEXT NOT NULL,
+            PRIMARY KEY (imgt_version, config_hash, redux_type, glstring)
+        ) WITHOUT ROWID""")
+    connection.commit()
+    return connection
+
+
+def _flush(
+    connection: sqlite3.Connection,
+    pending: Dict[Tuple[str, str], str],
+    imgt_version: str,
+    config_hash: str,
+):
+    if not pending:
+        return
+    rows = [
+        (imgt_version, config_hash, redux_type, glstring, redux)
+        for (redux_type, glstring), redux in pending.items()
+    ]
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO redux_cache VALUES (?, ?, ?, ?, ?)", rows
+        )
+    pending.clear()
+
+
+def _flush_and_close(connection, lock, pending, imgt_version, config_hash):
+    with lock:
+        try:
+            _flush(connection, pending, imgt_version, config_hash)
+        finally:
+            connection.close()
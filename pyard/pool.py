@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+ARD instances of several IPD-IMGT/HLA versions.
+
+`ARDPool` loads the ARD instance of a version on first use and keeps at
+most `max_versions` of them, within an optional memory budget, evicting the
+least recently used one first. Each loaded instance shares the reference
+data it has in common with the instances already loaded: mappings equal to
+one of theirs are replaced by it and the names of the others are interned,
+see `share_mappings`.
+"""
+
+import collections
+import sys
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional
+
+from .misc import get_imgt_version
+from .serology import SerologyMapping
+
+if TYPE_CHECKING:
+    from .ard import ARD
+
+# Mappings of these types are shared and have their names interned
+_SHAREABLE_TYPES = (dict, list, set, frozenset)
+
+
+class VersionNotAvailableError(ValueError):
+    """The IPD-IMGT/HLA version isn't one of the versions of the pool"""
+
+
+class PoolEntry(NamedTuple):
+    """A loaded version of the pool"""
+
+    ard: "ARD"
+    # Version of the ARD's database, read once when loaded
+    db_version: int
+
+
+def _interned(value):
+    """Copy of the value with its strings interned"""
+    value_type = type(value)
+    if value_type is str:
+        return sys.intern(value)
+    if value_type is dict:
+        return {_interned(k): _interned(v) for k, v in value.items()}
+    if value_type in (list, set, frozenset, tuple):
+        return value_type(_interned(item) for item in value)
+    return value
+
+
+def _shared(value, others: Iterable[object]):
+    if type(value) not in _SHAREABLE_TYPES:
+        return value
+    for other in others:
+        if other is value or (type(other) is type(value) and other == value):
+            return other
+    return _interned(value)
+
+
+def share_mappings(
+    mappings: Dict[str, object], others: Iterable[Dict[str, object]]
+) -> Dict[str, object]:
+    """
+    Mappings sharing the data equal to the one of other mappings
+
+    Each mapping, or field of the namedtuple mappings, equal to the same
+    mapping of one of the others is replaced by it. The names of the other
+    mappings are interned, so the names in common with the others are
+    stored once. Mappings that aren't dicts, lists or sets, e.g. ID arrays or
+    memory-mapped tables, are kept as they are.
+
+    :param mappings: ARD mappings by attribute name, see
+        `ARD._SNAPSHOT_ATTRIBUTES`
+    :param others: mappings of other ARD instances
+    :return: new mappings by attribute name
+    """
+    others = list(others)
+    shared = {}
+    for name, mapping in mappings.items():
+        other_mappings = [other[name] for other in others if name in other]
+        if isinstance(mapping, tuple) and hasattr(mapping, "_fields"):
+            shared[name] = type(mapping)(
+                *(
+                    _shared(value, (getattr(other, field) for other in other_mappings))
+                    for field, value in zip(mapping._fields, mapping)
+                )
+            )
+        elif isinstance(mapping, SerologyMapping):
+            shared[name] = SerologyMapping(
+                _shared(
+                    mapping.broad_splits_map,
+                    (other.broad_splits_map for other in other_mappings),
+                ),
+                _shared(
+                    mapping.serology_associated_map,
+                    (other.serology_associated_map for other in other_mappings),
+                ),
+            )
+        else:
+            shared[name] = _shared(mapping, other_mappings)
+    return shared
+
+
+def deep_sizeof(obj, seen: set) -> int:
+    """
+    Estimated bytes of an object and the objects it references
+
+    Follows the items of containers and the attributes of objects. Memory
+    outside of Python objects, e.g. of memory-mapped files or SQLite, isn't
+    counted.
+
+    :param obj: object to size
+    :param seen: IDs of the objects already counted, updated with the ones
+        counted
+    :return: bytes of the objects not in seen
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            stack.append(vars(obj))
+    return size
+
+
+def reference_data_size(ard: "ARD", seen: set) -> int:
+    """
+    Estimated bytes of the reference data of an ARD instance
+
+    :param ard: ARD instance
+    :param seen: IDs of the objects already counted e.g. of other instances,
+        updated with the ones counted
+    :return: bytes of the reference data not in seen
+    """
+    return sum(
+        deep_sizeof(obj, seen)
+        for obj in (
+            *ard._get_mappings().values(),
+            ard.allele_redux,
+            ard.allele_ids,
+            ard.allele_prefix_index,
+            ard.mac_handler.mac_codes,
+            ard._mac_prefix_index,
+        )
+    )
+
+
+class ARDPool:
+    """
+    ARD instances by IPD-IMGT/HLA version, least recently used evicted first.
+
+    The default version is loaded on first use and never evicted. Other
+    versions are loaded when they're first requested and kept until more
+    than `max_versions` are loaded or their estimated reference data
+    exceeds `memory_budget`.
+    """
+
+    def __init__(
+        self,
+        default_version: str = "Latest",
+        versions: Iterable[str] = None,
+        max_versions: int = 4,
+        memory_budget: int = None,
+        **init_kwargs,
+    ):
+        """
+        :param default_version: version used when none is requested
+        :param versions: versions that can be requested besides the default
+            one, any version if None
+        :param max_versions: maximum number of loaded versions
+        :param memory_budget: maximum estimated bytes of the reference data
+            of the loaded versions. At least the default version and the
+            last requested one are kept loaded.
+        :param init_kwargs: arguments of `pyard.init` for each version
+        """
+        if max_versions < 1:
+            raise ValueError("max_versions needs to be at least 1")
+        self.default_version = self._version_key(default_version)
+        self.versions = (
+            None if versions is None else {self._version_key(v) for v in versions}
+        )
+        self.max_versions = max_versions
+        self.memory_budget = memory_budget
+        self.init_kwargs = init_kwargs
+        # version -> PoolEntry in least recently used first order
+        self._ards: Dict[str, PoolEntry] = collections.OrderedDict()
+        # version -> estimated bytes of the reference data not shared with the
+        # more recently used versions, when there's a memory budget
+        self._sizes: Dict[str, int] = {}
+        # Version of the default ARD once loaded e.g. 3580 for Latest
+        self._default_key = None
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _version_key(imgt_version) -> str:
+        if not imgt_version or imgt_version == "Latest":
+            return "Latest"
+        try:
+            return get_imgt_version(str(imgt_version))
+        except RuntimeError as e:
+            raise VersionNotAvailableError(str(e))
+
+    def get(self, imgt_version=None) -> "ARD":
+        """
+        ARD instance of a version, loaded if needed
+
+        :param imgt_version: e.g. 3580 or 3.58.0. None for the default
+            version.
+        :return: ARD instance
+        :raises VersionNotAvailableError: if the version isn't one of the
+            versions of the pool
+        """
+        return self.entry(imgt_version).ard
+
+    def entry(self, imgt_version=None) -> PoolEntry:
+        """
+        ARD instance of a version and the version of its database, loaded if
+        needed
+
+        :param imgt_version: e.g. 3580 or 3.58.0. None for the default
+            version.
+        :return: PoolEntry of the version
+        :raises VersionNotAvailableError: if the version isn't one of the
+            versions of the pool
+        """
+        if imgt_version is None:
+            imgt_version = self.default_version
+        version = self._version_key(imgt_version)
+        if version == self.default_version:
+            version = self._default_key or version
+        elif (
+            self.versions is not None
+            and version not in self.versions
+            and version != self._default_key
+        ):
+            raise VersionNotAvailableError(
+                f"IPD-IMGT/HLA version {version} is not available"
+            )
+
+        entry = self._lookup(version)
+        if entry is not None:
+            return entry
+        with self._lock:
+            load_lock = self._load_locks.setdefault(version, threading.Lock())
+        # Requests for the version wait for a single load
+        with load_lock:
+            entry = self._lookup(version)
+            if entry is None:
+                entry = self._load(version)
+            with self._lock:
+                self._load_locks.pop(version, None)
+        return entry
+
+    def _lookup(self, version: str) -> Optional[PoolEntry]:
+        with self._lock:
+            entry = self._ards.get(version)
+            if entry is not None:
+                self._ards.move_to_end(version)
+                self.hits += 1
+            return entry
+
+    def _load(self, version: str) -> PoolEntry:
+        from . import init
+
+        ard = init(version, **self.init_kwargs)
+        with self._lock:
+            others = [entry.ard for entry in self._ards.values()]
+        ard.share_reference_data(others)
+        # Don't keep the instances alive if they're evicted
+        del others
+        entry = PoolEntry(ard, ard.get_db_version())
+
+        with self._lock:
+            if version == self.default_version:
+                version = self._default_key = str(entry.db_version)
+            loaded = self._ards.get(version)
+            if loaded is None:
+                self._ards[version] = entry
+                self.loads += 1
+            else:
+                # Also loaded by the default version
+                self._ards.move_to_end(version)
+        if loaded is not None:
+            ard.close()
+            return loaded
+        # Sizing the versions takes a walk of their reference data
+        sizes = self._measure() if self.memory_budget is not None else {}
+        with self._lock:
+            self._sizes = sizes
+            evicted = self._evict(keep=version)
+        for evicted_ard in evicted:
+            # Requests may still use it, so it isn't closed. Its connections
+            # are closed when it's freed, once no request uses it.
+            evicted_ard._weaken_back_references()
+        return entry
+
+    def _measure(self) -> Dict[str, int]:
+        with self._lock:
+            entries = list(self._ards.items())
+        # Most recently used first, so each version is charged the data it
+        # doesn't share with more recently used ones
+        seen = set()
+        return {
+            version: reference_data_size(entry.ard, seen)
+            for version, entry in reversed(entries)
+        }
+
+    def _evict(self, keep: str) -> List["ARD"]:
+        """Evict versions until within the limits, return the evicted ARDs"""
+        evicted = []
+        total = sum(self._sizes.get(version, 0) for version in self._ards)
+        for version in list(self._ards):
+            over_budget = self.memory_budget is not None and total > self.memory_budget
+            if len(self._ards) <= self.max_versions and not over_budget:
+                break
+            if version in (keep, self._default_key):
+                continue
+            evicted.append(self._ards.pop(version).ard)
+            total -= self._sizes.pop(version, 0)
+        self.evictions += len(evicted)
+        return evicted
+
+    def preload(self, versions: Iterable[str]) -> None:
+        """
+        Load versions ahead of their requests e.g. before forking workers
+
+        :param versions: versions to load, the default version is always
+            loaded first
+        """
+        self.get()
+        for version in versions:
+            self.get(version)
+
+    def loaded_versions(self) -> List[str]:
+        """Loaded versions, least recently used first"""
+        with self._lock:
+            return list(self._ards)
+
+    def loaded_ards(self) -> Dict[str, "ARD"]:
+        """Loaded ARD instances by version, least recently used first"""
+        with self._lock:
+            return {version: entry.ard for version, entry in self._ards.items()}
+
+    def memory_size(self) -> int:
+        """Estimated bytes of the reference data of the loaded versions"""
+        return sum(self._measure().values())
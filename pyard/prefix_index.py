@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+In-memory prefix index for allele and MAC code autocomplete.
+
+Names are kept in a sorted list, so all the names starting with a prefix
+are a contiguous slice found with two binary searches.
+"""
+
+import bisect
+import itertools
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .smart_sort import smart_sorted
+
+# Sorts after any character that can follow a prefix
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class PrefixIndex:
+    """
+    Sorted names searchable by prefix.
+
+    Matches are returned in smart sort order when `sort_ranks` is given,
+    otherwise in lexicographic order.
+    """
+
+    def __init__(self, names: Iterable[str], sort_ranks: Dict[str, int] = None):
+        """
+        :param names: names to index
+        :param sort_ranks: rank table from `smart_sort.build_sort_ranks`
+        """
+        self._names = sorted(set(names))
+        self._sort_ranks = sort_ranks
+
+    def __len__(self):
+        return len(self._names)
+
+    def _matches(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._names, prefix)
+        end = bisect.bisect_left(self._names, prefix + _MAX_CHAR, start)
+        return self._names[start:end]
+
+    def search(
+        self,
+        prefix: str,
+        limit: Optional[int] = None,
+        predicate: Callable[[str], bool] = None,
+    ) -> List[str]:
+        """
+        Find the names starting with a prefix.
+
+        :param prefix: prefix of the names to find
+        :param limit: maximum number of names to return. `None` returns all.
+        :param predicate: only return the names for which it's true. It's
+            called in result order until `limit` names are found.
+        :return: matching names in sort order
+        """
+        matches = self._matches(prefix)
+        if self._sort_ranks is not None:
+            matches = smart_sorted(matches, sort_ranks=self._sort_ranks)
+        if predicate is not None:
+            matches = filter(predicate, matches)
+        return list(itertools.islice(matches, limit))
@@ -7,8 +7,6 @@ Serology reduction converts molecular HLA alleles back to their corresponding
 serological equivalents, which were historically used before DNA-based typing.
 """
 
-import functools
-
 from .base_reducer import Reducer
 from .. import db
 from ..misc import is_2_field_allele
@@ -25,7 +23,7 @@ class SReducer(Reducer):
 
     The reduction process:
     1. Determines if the allele is 2-field and reduces to LGX if needed
-    2. Queries the serology mapping database to find corresponding serologies
+    2. Looks up the allele to serology index to find corresponding serologies
     3. Handles both direct matches and LGX-reduced matches
     4. Returns sorted serology designations
 
@@ -47,8 +45,8 @@ class SReducer(Reducer):
         """
         Reduce an HLA allele to its serological equivalent(s).
 
-        This method performs serology reduction by querying the serology mapping
-        database to find which serological designations correspond to the given
+        This method performs serology reduction by looking up the allele to
+        serology index to find which serological designations correspond to the given
         molecular allele. It handles both 2-field and multi-field alleles with
         appropriate fallback strategies.
 
@@ -69,44 +67,28 @@ class SReducer(Reducer):
 
         Process:
             1. Check if allele is 2-field and reduce to LGX if necessary
-            2. Query serology mapping database
-            3. Find matching serologies by checking allele lists
-            4. If no matches and allele is 2-field, try LGX-reduced matching
-            5. Return sorted serology designations
+            2. Look up the serologies of the allele in the allele to serology index
+            3. If no matches and allele is 2-field, try LGX-reduced matching
+            4. Return sorted serology designations
         """
         # Step 1: Handle 2-field alleles by reducing to LGX first
         if is_2_field_allele(allele):
             allele = self.ard._redux_allele(allele, "lgx")
-            # Query serology mapping using LGX-specific allele lists
-            serology_mapping = db.find_serology_for_allele(
+            # Look up the allele in the LGX-specific allele lists
+            serology_set = db.find_serologies_in_index(
                 self.ard.db_connection, allele, "lgx_allele_list"
             )
         else:
-            # Query serology mapping for multi-field alleles
-            serology_mapping = db.find_serology_for_allele(
-                self.ard.db_connection, allele
-            )
+            # Look up multi-field alleles in the allele lists
+            serology_set = db.find_serologies_in_index(self.ard.db_connection, allele)
 
-        # Step 2: Find serologies that contain this allele in their allele lists
-        serology_set = set()
-        for serology, allele_list in serology_mapping.items():
-            # Check if our allele is in the slash-separated allele list
-            if allele in allele_list.split("/"):
-                serology_set.add(serology)
-
-        # Step 3: Fallback strategy for 2-field alleles with no direct matches
+        # Step 2: Fallback strategy for 2-field alleles with no direct matches
         if not serology_set and is_2_field_allele(allele):
             # Try matching against LGX-reduced versions of the allele lists
-            for serology, allele_list in serology_mapping.items():
-                # Reduce the entire allele list to LGX and check for matches
-                allele_list_lgx = self.ard.redux(allele_list, "lgx")
-                if allele in allele_list_lgx.split("/"):
-                    serology_set.add(serology)
-
-        # Step 4: Return sorted serology designations
-        # Use smart sort comparator to ensure proper HLA ordering
-        return "/".join(
-            sorted(
-                serology_set, key=functools.cmp_to_key(self.ard.smart_sort_comparator)
+            serology_set = db.find_serologies_in_index(
+                self.ard.db_connection, allele, "lgx_allele_list_redux"
             )
-        )
+
+        # Step 3: Return sorted serology designations
+        # Use smart sort to ensure proper HLA ordering
+        return "/".join(self.ard.smart_sorted(serology_set))
@@ -1,14 +1,100 @@
+import contextlib
+import contextvars
 import csv
 import itertools
+import re
 import sqlite3
 from collections import defaultdict
 from typing import List
 
+# Implementations of Table
+TABLE_BACKENDS = ("sqlite", "columnar")
+_backend = "sqlite"
+
+# Connection shared by the tables created in a lazy_tables() block. A context
+# variable, so builds running in other threads use their own connection.
+_lazy_connection = contextvars.ContextVar("lazy_connection", default=None)
+_relation_ids = itertools.count(1)
+
+
+def set_backend(backend: str):
+    """Select the implementation of the tables created from now on
+
+    :param backend: "sqlite" for tables in in-memory SQLite databases or
+        "columnar" for tables of Python lists (`columnar_table.ColumnarTable`)
+    """
+    global _backend
+    if backend not in TABLE_BACKENDS:
+        raise ValueError(
+            f"{backend} is not a valid table backend. Use one of {TABLE_BACKENDS}"
+        )
+    _backend = backend
+
+
+def get_backend() -> str:
+    """The implementation of the tables created now"""
+    return _backend
+
+
+@contextlib.contextmanager
+def lazy_tables():
+    """Create lazy tables in the block
+
+    Tables created in the block share a single in-memory connection. The
+    operations that derive a table from another (`where`, `where_in`,
+    `unique`, `[]`, `rename`, `union`, ...) compose SQL views on that
+    connection instead of copying the rows into a new database, so rows
+    are only read when a result is needed, e.g. by `to_dict`, `agg` or
+    a `Column`. Lazy tables remain usable after the block. Each thread has
+    its own lazy connection.
+    """
+    token = _lazy_connection.set(sqlite3.connect(":memory:"))
+    try:
+        yield
+    finally:
+        _lazy_connection.reset(token)
+
+
+def _relation_name(table_name: str) -> str:
+    return re.sub(r"\W", "_", f"{table_name}_{next(_relation_ids)}")
+
+
+class _Relation:
+    """Table or view of a lazy table, dropped once no table uses it"""
+
+    def __init__(self, conn, name: str, kind: str = "TABLE", depends=()):
+        self.conn = conn
+        self.name = name
+        self.kind = kind
+        # Relations a view reads from
+        self.depends = tuple(depends)
+
+    def __del__(self):
+        try:
+            self.conn.execute(f"DROP {self.kind} IF EXISTS {self.name}")
+        except Exception:
+            # The connection is closed
+            pass
+
 
 class Table:
+    def __new__(cls, *args, **kwargs):
+        if cls is Table and _backend == "columnar":
+            from .columnar_table import ColumnarTable
+
+            cls = ColumnarTable
+        return super().__new__(cls)
+
     def __init__(self, data, columns: list, table_name: str = "data"):
-        self._conn = sqlite3.connect(":memory:")
-        self._name = table_name
+        lazy_connection = _lazy_connection.get()
+        self._lazy = lazy_connection is not None
+        if self._lazy:
+            self._conn = lazy_connection
+            self._set_relation(_Relation(self._conn, _relation_name(table_name)))
+        else:
+            self._conn = sqlite3.connect(":memory:")
+            self._name = table_name
+            self._relation = None
         self._columns = columns
         if isinstance(data, csv.DictReader):
             self._create_table_from_reader(data, columns)
@@ -16,42 +102,92 @@ class Table:
             self._create_table_from_tuples(data, columns)
 
     def _create_table_from_reader(self, reader: csv.DictReader, columns: list):
-        rows = list(reader)
-        if not rows:
+        first_row = next(reader, None)
+        if first_row is None:
             return
 
-        column_defs = ", ".join(f"`{col}` TEXT" for col in columns)
-
-        self._conn.execute(f"CREATE TABLE {self._name} ({column_defs})")
-
-        placeholders = ", ".join("?" * len(columns))
-        for row in rows:
-            values = [row[col] for col in columns]
-            self._conn.execute(
-                f"INSERT INTO {self._name} VALUES ({placeholders})", values
-            )
-
-        self._conn.commit()
+        rows = itertools.chain([first_row], reader)
+        self._create_table_from_tuples(
+            ([row[col] for col in columns] for row in rows), columns
+        )
 
-    def _create_table_from_tuples(self, data: list, columns: list):
-        if not data:
-            return
+    def _create_table_from_tuples(self, data, columns: list):
+        if isinstance(data, (list, tuple)):
+            if not data:
+                return
+        else:
+            data = iter(data)
+            first_row = next(data, None)
+            if first_row is None:
+                return
+            data = itertools.chain([first_row], data)
 
         column_defs = ", ".join(f"`{col}` TEXT" for col in columns)
 
         self._conn.execute(f"CREATE TABLE {self._name} ({column_defs})")
 
         placeholders = ", ".join("?" * len(columns))
-        for row in data:
-            self._conn.execute(f"INSERT INTO {self._name} VALUES ({placeholders})", row)
+        self._conn.executemany(
+            f"INSERT INTO {self._name} VALUES ({placeholders})", data
+        )
 
         self._conn.commit()
 
+    @classmethod
+    def _from_relation(cls, relation: _Relation, columns: list):
+        table = object.__new__(cls)
+        table._lazy = True
+        table._conn = relation.conn
+        table._set_relation(relation)
+        table._columns = columns
+        return table
+
+    def _set_relation(self, relation: _Relation):
+        self._relation = relation
+        self._name = relation.name
+
+    def _new_table(self, data, columns: list, table_name: str):
+        """Table of data, on the same connection when this table is lazy"""
+        if not self._lazy:
+            return Table(data, columns, table_name)
+        table = Table._from_relation(
+            _Relation(self._conn, _relation_name(table_name)), columns
+        )
+        table._create_table_from_tuples(data, columns)
+        return table
+
+    def _select(self, sql: str, columns: list, table_name: str, depends=()):
+        """Table of the rows of a SELECT from this table
+
+        A lazy table returns a view of the SELECT instead of a copy of the rows.
+        """
+        if not self._lazy:
+            return Table(self._conn.execute(sql).fetchall(), columns, table_name)
+        name = _relation_name(table_name)
+        self._conn.execute(f"CREATE VIEW {name} AS {sql}")
+        relation = _Relation(self._conn, name, "VIEW", (self._relation, *depends))
+        # Report invalid SQL now instead of when the view is read
+        self._conn.execute(f"SELECT * FROM {name} LIMIT 0")
+        return Table._from_relation(relation, columns)
+
+    def _create_values_table(self, values) -> _Relation:
+        """Table of the distinct values to filter on with IN (SELECT value ...)"""
+        name = _relation_name("values")
+        self._conn.execute(f"CREATE TABLE {name} (value PRIMARY KEY)")
+        relation = _Relation(self._conn, name)
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO {name} VALUES (?)", ((value,) for value in values)
+        )
+        return relation
+
     def query(self, sql: str):
         return self._conn.execute(sql).fetchall()
 
     def close(self):
-        if hasattr(self, "_conn") and self._conn:
+        if getattr(self, "_lazy", False):
+            # The connection is shared with the other lazy tables
+            self._relation = None
+        elif hasattr(self, "_conn") and self._conn:
             self._conn.close()
 
     @property
@@ -65,10 +201,17 @@ class Table:
         return PrintableTable(self.columns, rows)
 
     def tail(self, n: int = 5):
-        cursor = self._conn.execute(
-            f"SELECT * FROM {self._name} ORDER BY rowid DESC LIMIT {n}"
-        )
-        rows = cursor.fetchall()
+        if self._lazy:
+            # Views don't have a rowid
+            cursor = self._conn.execute(
+                f"SELECT * FROM {self._name} LIMIT {n} OFFSET {max(len(self) - n, 0)}"
+            )
+            rows = cursor.fetchall()[::-1]
+        else:
+            cursor = self._conn.execute(
+                f"SELECT * FROM {self._name} ORDER BY rowid DESC LIMIT {n}"
+            )
+            rows = cursor.fetchall()
         return PrintableTable(self.columns, rows)
 
     def group_by(self, group_by_column: str, return_columns: List[str] = None):
@@ -81,10 +224,11 @@ class Table:
             f"SELECT {column_names} FROM {self._name} ORDER BY `{group_by_column}`"
         )
         rows = cursor.fetchall()
-        col_index = self.columns.index(group_by_column)
+        columns = self.columns
+        col_index = columns.index(group_by_column)
         grouped = itertools.groupby(rows, key=lambda row: row[col_index])
         return {
-            key: [{col: row[i] for i, col in enumerate(self.columns)} for row in group]
+            key: [{col: row[i] for i, col in enumerate(columns)} for row in group]
             for key, group in grouped
         }
 
@@ -97,17 +241,19 @@ class Table:
             return Column(columns, values)
         else:
             column_names = ", ".join([f"`{col}`" for col in columns])
-            cursor = self._conn.execute(
-                f"SELECT DISTINCT {column_names} FROM {self._name}"
+            return self._select(
+                f"SELECT DISTINCT {column_names} FROM {self._name}",
+                columns,
+                f"{self._name}_unique",
             )
-            return Table(cursor.fetchall(), columns, f"{self._name}_unique")
 
     def where(self, where_clause: str):
         try:
-            cursor = self._conn.execute(
-                f"SELECT * FROM {self._name} WHERE {where_clause}"
+            return self._select(
+                f"SELECT * FROM {self._name} WHERE {where_clause}",
+                self.columns,
+                f"{self._name}_filtered",
             )
-            return Table(cursor.fetchall(), self.columns, f"{self._name}_filtered")
         except Exception as e:
             raise ValueError(f"Invalid WHERE clause: {where_clause}") from e
 
@@ -120,17 +266,22 @@ class Table:
             table_suffix = null_column
 
         table_name = f"{self._name}_not_null_{table_suffix}"
-        cursor = self._conn.execute(f"SELECT * FROM {self._name} WHERE {conditions}")
-        return Table(cursor.fetchall(), table_name=table_name, columns=self.columns)
+        return self._select(
+            f"SELECT * FROM {self._name} WHERE {conditions}", self.columns, table_name
+        )
 
     def where_in(self, column_name: str, values: set, columns: list):
-        placeholders = ", ".join("?" * len(values))
+        # Filter with a table of the values instead of binding every value,
+        # which is also not limited by SQLITE_MAX_VARIABLE_NUMBER
+        values_table = self._create_values_table(values)
         column_names = ", ".join([f"`{col}`" for col in columns])
-        cursor = self._conn.execute(
-            f"SELECT {column_names} FROM {self._name} WHERE `{column_name}` IN ({placeholders})",
-            list(values),
+        return self._select(
+            f"SELECT {column_names} FROM {self._name} "
+            f"WHERE `{column_name}` IN (SELECT value FROM {values_table.name})",
+            columns,
+            f"{self._name}_filtered",
+            depends=(values_table,),
         )
-        return Table(cursor.fetchall(), columns, f"{self._name}_filtered")
 
     def to_dict(self, key_column: str = None, value_column: str = None):
         if not key_column and not value_column:
@@ -151,10 +302,13 @@ class Table:
     def value_counts(self, column: str):
         if column not in self.columns:
             raise ValueError(f"Column '{column}' not found in table")
-        cursor = self._conn.execute(
-            f"SELECT `{column}`, COUNT(*) FROM {self._name} GROUP BY `{column}` ORDER BY COUNT(*) DESC"
+        # Counts are TEXT like the columns of tables
+        return self._select(
+            f"SELECT `{column}`, CAST(COUNT(*) AS TEXT) AS `count` FROM {self._name} "
+            f"GROUP BY `{column}` ORDER BY COUNT(*) DESC",
+            [column, "count"],
+            f"{self._name}_counts",
         )
-        return Table(cursor.fetchall(), [column, "count"], f"{self._name}_counts")
 
     def agg(self, group_column: str, agg_column: str, func):
         builtin_funcs = {list, set}
@@ -167,17 +321,54 @@ class Table:
             d[k] = func(v)
         if func in builtin_funcs:
             return d
-        return Table(list(d.items()), [group_column, "agg"], f"{self._name}_agg")
+        return self._new_table(
+            list(d.items()), [group_column, "agg"], f"{self._name}_agg"
+        )
 
     def __setitem__(self, column: str, values):
-        if column in self.columns:
-            self._conn.execute(f"ALTER TABLE {self._name} DROP COLUMN `{column}`")
-        self._conn.execute(f"ALTER TABLE {self._name} ADD COLUMN `{column}` TEXT")
-        for i, value in enumerate(values):
+        # Rebuild the table with the new column in a single INSERT ... SELECT.
+        # The i-th value goes to the i-th row (the row with rowid i + 1 of
+        # a table that isn't lazy), an existing column is replaced and moved
+        # to the end.
+        other_columns = [col for col in self.columns if col != column]
+        new_columns = other_columns + [column]
+        column_defs = ", ".join(f"`{col}` TEXT" for col in new_columns)
+        column_names = ", ".join(f"`{col}`" for col in new_columns)
+        select_names = ", ".join([f"t.`{col}`" for col in other_columns] + ["v.value"])
+        if self._lazy:
+            # Views don't have a rowid, number the rows instead
+            new_relation = _Relation(self._conn, _relation_name(self._name))
+            new_name = new_relation.name
+            rows = f"(SELECT ROW_NUMBER() OVER () AS _row_id, * FROM {self._name})"
+            row_id = "_row_id"
+        else:
+            new_name = f"{self._name}_new"
+            rows = self._name
+            row_id = "rowid"
+            # Keep the rowids of the table
+            column_names = f"rowid, {column_names}"
+            select_names = f"t.rowid, {select_names}"
+
+        self._conn.execute(
+            "CREATE TEMP TABLE _column_values (id INTEGER PRIMARY KEY, value)"
+        )
+        try:
+            self._conn.executemany(
+                "INSERT INTO _column_values VALUES (?, ?)", enumerate(values, 1)
+            )
+            self._conn.execute(f"CREATE TABLE {new_name} ({column_defs})")
             self._conn.execute(
-                f"UPDATE {self._name} SET `{column}` = ? WHERE rowid = ?",
-                (value, i + 1),
+                f"INSERT INTO {new_name} ({column_names}) "
+                f"SELECT {select_names} FROM {rows} t "
+                f"LEFT JOIN _column_values v ON v.id = t.{row_id} ORDER BY t.{row_id}"
             )
+        finally:
+            self._conn.execute("DROP TABLE _column_values")
+        if self._lazy:
+            self._set_relation(new_relation)
+        else:
+            self._conn.execute(f"DROP TABLE {self._name}")
+            self._conn.execute(f"ALTER TABLE {new_name} RENAME TO {self._name}")
         self._conn.commit()
 
     def __getitem__(self, column):
@@ -186,10 +377,11 @@ class Table:
                 if col not in self.columns:
                     raise ValueError(f"Column '{col}' not found in table")
             column_names = ", ".join([f"`{col}`" for col in column])
-            result = self._conn.execute(
-                f"SELECT {column_names} FROM {self._name}"
-            ).fetchall()
-            return Table(result, column, f"{self._name}_subset")
+            return self._select(
+                f"SELECT {column_names} FROM {self._name}",
+                column,
+                f"{self._name}_subset",
+            )
         else:
             if column not in self.columns:
                 raise ValueError(f"Column '{column}' not found in table")
@@ -200,6 +392,8 @@ class Table:
             return Column(column, values)
 
     def rename(self, column_mapping: dict):
+        if self._lazy:
+            return self._rename_lazy(column_mapping)
         for old_name, new_name in column_mapping.items():
             if old_name not in self.columns:
                 raise ValueError(f"Column '{old_name}' not found in table")
@@ -209,19 +403,61 @@ class Table:
         self._conn.commit()
         return self
 
+    def _rename_lazy(self, column_mapping: dict):
+        # Replace the table with a view of the renamed columns
+        columns = self.columns
+        for old_name in column_mapping:
+            if old_name not in columns:
+                raise ValueError(f"Column '{old_name}' not found in table")
+        select_names = ", ".join(
+            f"`{col}` AS `{column_mapping.get(col, col)}`" for col in columns
+        )
+        renamed = self._select(
+            f"SELECT {select_names} FROM {self._name}",
+            [column_mapping.get(col, col) for col in columns],
+            f"{self._name}_renamed",
+        )
+        self._set_relation(renamed._relation)
+        return self
+
     def union(self, other_table):
         if self.columns != other_table.columns:
             raise ValueError("Tables must have the same columns for union")
 
-        self_data = self._conn.execute(f"SELECT * FROM {self._name}").fetchall()
-        other_data = other_table._conn.execute(
-            f"SELECT * FROM {other_table._name}"
-        ).fetchall()
+        if self._lazy:
+            if other_table._conn is not self._conn:
+                other_table = self._new_table(
+                    other_table._conn.execute(f"SELECT * FROM {other_table._name}"),
+                    self.columns,
+                    f"{self._name}_union",
+                )
+            return self._select(
+                f"SELECT * FROM {self._name} "
+                f"UNION ALL SELECT * FROM {other_table._name}",
+                self.columns,
+                f"{self._name}_union",
+                depends=(other_table._relation,),
+            )
 
-        union_data = self_data + other_data
-        return Table(union_data, self.columns, f"{self._name}_union")
+        self_rows = self._conn.execute(f"SELECT * FROM {self._name}")
+        other_rows = other_table._conn.execute(f"SELECT * FROM {other_table._name}")
+        return Table(
+            itertools.chain(self_rows, other_rows), self.columns, f"{self._name}_union"
+        )
 
     def remove(self, column_name: str, values):
+        if self._lazy:
+            # Replace the table with a view of the rows to keep
+            values_table = self._create_values_table(values)
+            kept = self._select(
+                f"SELECT * FROM {self._name} WHERE NOT coalesce("
+                f"`{column_name}` IN (SELECT value FROM {values_table.name}), 0)",
+                self.columns,
+                f"{self._name}_removed",
+                depends=(values_table,),
+            )
+            self._set_relation(kept._relation)
+            return self
         placeholders = ", ".join("?" * len(values))
         self._conn.execute(
             f"DELETE FROM {self._name} WHERE `{column_name}` IN ({placeholders})",
@@ -259,7 +495,7 @@ class Table:
             else:
                 exploded_data.append(row)
 
-        return Table(exploded_data, self.columns, f"{self._name}_exploded")
+        return self._new_table(exploded_data, self.columns, f"{self._name}_exploded")
 
     def __len__(self):
         cursor = self._conn.execute(f"SELECT COUNT(*) FROM {self._name}")
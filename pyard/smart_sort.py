@@ -23,6 +23,7 @@
 #
 import functools
 import re
+from typing import Dict, Iterable, List, Tuple
 
 from pyard import constants
 
@@ -37,153 +38,161 @@ serology_splitter = re.compile(
 
 
 @functools.lru_cache(maxsize=constants.DEFAULT_CACHE_SIZE)
+def smart_sort_key(allele: str, ignore_suffixes: Tuple[str, ...] = ()) -> Tuple:
+    """
+    Natural sort key of an allele or serology using HLA nomenclature rules.
+
+    Python's default lexicographic sorting doesn't work correctly for HLA alleles
+    because it treats field values as strings rather than numbers. The key is
+    computed once per name instead of once per pairwise comparison, so it can
+    be used directly with `sorted(key=...)`.
+
+    Key layout:
+    - molecular alleles: (0, field1, field2, field3, field4, locus)
+    - serology: (1, number, letters) e.g. (1, 27, 'B') for 'B27'
+    - numeric HATS: (2, number), after the alphanumeric ones
+    - alleles with ignored suffixes: (3,), after everything else
+
+    Expression characters (P, N, Q, L, S, G, g, ARS) are ignored, so
+    'A*01:01N' and 'A*01:01' have the same key. Missing or non-numeric
+    third and fourth fields are treated as 0.
+
+    :param allele: allele or serology to build the key for
+    :param ignore_suffixes: tuple of allele suffixes to sort last
+    :return: tuple sort key
+    """
+    # Handle ignored suffixes - push alleles with these suffixes to the end
+    if ignore_suffixes and "*" in allele:
+        _, fields = allele.split("*")
+        if fields in ignore_suffixes:
+            return (3,)
+
+    # Remove expression characters (P, N, Q, L, S, G, g, ARS) for comparison
+    if allele.endswith("ARS"):
+        allele = allele[:-3]
+    else:
+        allele = expr_regex.sub("", allele)
+
+    # Molecular alleles with or without the locus e.g. A*01:01 or 01:01
+    if "*" in allele or ":" in allele:
+        locus, _, fields = allele.rpartition("*")
+        fields = fields.split(":")
+        return (
+            0,
+            int(fields[0]),
+            _numeric_field(fields, 1),
+            _numeric_field(fields, 2),
+            _numeric_field(fields, 3),
+            locus,
+        )
+
+    # HATS are mostly numerical, sort numbers after alphanumeric ones
+    if allele.isdigit():
+        return 2, int(allele)
+
+    # Compare numeric parts of serology (e.g., '27' in 'B27')
+    serology_match = serology_splitter.match(allele)
+    return 1, int(serology_match.group(2)), serology_match.group(1)
+
+
+def _numeric_field(fields: List[str], index: int) -> int:
+    if len(fields) > index:
+        try:
+            return int(fields[index])
+        except ValueError:
+            pass
+    return 0
+
+
 def smart_sort_comparator(a1, a2, ignore_suffixes=()):
     """
     Natural sort 2 given alleles using HLA nomenclature rules.
 
-    Python's default lexicographic sorting doesn't work correctly for HLA alleles
-    because it treats field values as strings rather than numbers. This function
-    implements proper numerical sorting for each field in HLA nomenclature.
+    Compatibility wrapper around `smart_sort_key`. Prefer sorting with
+    `smart_sort_key` or `smart_sorted` over `functools.cmp_to_key`.
 
-    Sorting hierarchy:
-    1. Handle identical alleles
-    2. Handle GL string delimiters (lexicographic fallback)
-    3. Handle ignored suffixes (push to end)
-    4. Handle serological designations (numeric comparison)
-    5. Handle molecular alleles (field-by-field numeric comparison)
+    GL strings containing delimiters (/|+^~) are compared lexicographically.
 
     :param a1: first allele to compare
     :param a2: second allele to compare
     :param ignore_suffixes: tuple of allele suffixes to sort last
     :return: -1 if a1 < a2, 0 if equal, 1 if a1 > a2
     """
-
     # Quick equality check - identical alleles are equal
     if a1 == a2:
         return 0
 
-    # Handle GL string delimiters - fall back to lexicographic sorting
-    # GL strings with delimiters (/|+^~) are complex and sorted lexicographically
-    if re.search(glstring_chars, a1) or re.search(glstring_chars, a2):
-        if a1 > a2:
-            return 1
-        else:
-            return -1
+    # GL strings with delimiters are sorted lexicographically
+    if glstring_chars.search(a1) or glstring_chars.search(a2):
+        return 1 if a1 > a2 else -1
 
-    # Handle ignored suffixes - push alleles with these suffixes to the end
-    # This allows certain allele types to be sorted last (e.g., expression variants)
-    if ignore_suffixes and "*" in a1:
-        _, fields = a1.split("*")
-        if fields in ignore_suffixes:
-            return 1  # a1 comes after a2
+    key1 = smart_sort_key(a1, ignore_suffixes)
+    key2 = smart_sort_key(a2, ignore_suffixes)
+    return (key1 > key2) - (key1 < key2)
 
-    if ignore_suffixes and "*" in a2:
-        _, fields = a2.split("*")
-        if fields in ignore_suffixes:
-            return -1  # a2 comes after a1
 
-    # Handle suffix characters - remove them before comparison
-    # Remove expression characters (P, N, Q, L, S, G, g, ARS) for comparison
-    # This normalizes alleles like 'A*01:01N' to 'A*01:01' for sorting
-    if a1.endswith("ARS"):
-        a1 = a1[:-3]
-    else:
-        a1 = re.sub(expr_regex, "", a1)
-
-    if a2.endswith("ARS"):
-        a2 = a2[:-3]
-    else:
-        a2 = re.sub(expr_regex, "", a2)
+def build_sort_ranks(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Assign an integer rank to each name in smart sort order.
 
-    # Check equality again after removing expression characters
-    if a1 == a2:
-        return 0
+    Names that sort equal (e.g. 'A*01:01' and 'A*01:01N') share the same
+    rank, so sorting by rank gives the same order as sorting by
+    `smart_sort_key`. Names that cannot be smart sorted are left out.
 
-    # Handle Serology and HATS
-    if ":" not in a1:
-        # HATS are mostly numerical, so compare as integers
-        if a1.isdigit() and a2.isdigit():
-            return 1 if int(a1) > int(a2) else -1
-        # For HATS with mixed alphanumeric strings, sort lexicographically
-        # e.g. Cw0304, Cw0408
-        if a1.isdigit() or a2.isdigit():
-            return a1 < a2
-        # Handle serological designations (no colon separator)
-        # Compare numeric parts of serology (e.g., '27' in 'B27')
-        serology1_match = serology_splitter.match(a1)
-        serology1_num = int(serology1_match.group(2))  # Extract numeric part
-        serology2_match = serology_splitter.match(a2)
-        serology2_num = int(serology2_match.group(2))  # Extract numeric part
-        return 1 if serology1_num > serology2_num else -1
-
-    # Compare first field (allele group) numerically
-    # Extract numbers between '*' and first ':' (e.g., '01' from 'A*01:01')
-    a1_f1 = int(a1[a1.find("*") + 1 : a1.find(":")])
-    a2_f1 = int(a2[a2.find("*") + 1 : a2.find(":")])
-
-    if a1_f1 < a2_f1:
-        return -1
-    if a1_f1 > a2_f1:
-        return 1
-
-    # Split alleles into fields for detailed comparison
-    a1_fields = a1.split(":")
-    a2_fields = a2.split(":")
-
-    # Compare second field (protein variation) numerically
-    a1_f2 = int(a1_fields[1])
-    a2_f2 = int(a2_fields[1])
-
-    if a1_f2 < a2_f2:
-        return -1
-    if a1_f2 > a2_f2:
-        return 1
-
-    # Compare third field (synonymous DNA variation) numerically
-    # Handle missing fields or non-numeric values gracefully
-    if len(a1_fields) > 2:
+    :param names: alleles, XX codes and serology to rank
+    :return: dictionary of name to rank
+    """
+    name_keys = {}
+    for name in names:
         try:
-            a1_f3 = int(a1_fields[2])
-        except ValueError:
-            a1_f3 = 0  # Non-numeric third field treated as 0
-    else:
-        a1_f3 = 0  # Missing third field treated as 0
+            name_keys[name] = smart_sort_key.__wrapped__(name)
+        except (ValueError, AttributeError):
+            continue
+    key_ranks = {key: rank for rank, key in enumerate(sorted(set(name_keys.values())))}
+    return {name: key_ranks[key] for name, key in name_keys.items()}
+
+
+def smart_sorted(
+    alleles: Iterable[str],
+    ignore_suffixes: Tuple[str, ...] = (),
+    sort_ranks: Dict[str, int] = None,
+) -> List[str]:
+    """
+    Sort alleles using HLA nomenclature rules.
 
-    if len(a2_fields) > 2:
-        try:
-            a2_f3 = int(a2_fields[2])
-        except ValueError:
-            a2_f3 = 0  # Non-numeric third field treated as 0
-    else:
-        a2_f3 = 0  # Missing third field treated as 0
+    When every allele is in `sort_ranks` the sort is a plain integer sort,
+    otherwise it falls back to `smart_sort_key`. GL strings containing
+    delimiters (/|+^~) are sorted lexicographically.
 
-    if a1_f3 < a2_f3:
-        return -1
-    if a1_f3 > a2_f3:
-        return 1
+    :param alleles: alleles, serology or GL strings to sort
+    :param ignore_suffixes: tuple of allele suffixes to sort last
+    :param sort_ranks: rank table from `build_sort_ranks`
+    :return: sorted list
+    """
+    alleles = list(alleles)
+    if sort_ranks:
+        rank = sort_ranks.__getitem__
+        if ignore_suffixes:
+            last_rank = len(sort_ranks)
 
-    # Compare fourth field (non-coding variation) numerically
-    # Handle missing fields or non-numeric values gracefully
-    if len(a1_fields) > 3:
-        try:
-            a1_f4 = int(a1_fields[3])
-        except ValueError:
-            a1_f4 = 0  # Non-numeric fourth field treated as 0
-    else:
-        a1_f4 = 0  # Missing fourth field treated as 0
+            def rank(allele):
+                if _has_ignored_suffix(allele, ignore_suffixes):
+                    return last_rank
+                return sort_ranks[allele]
 
-    if len(a2_fields) > 3:
         try:
-            a2_f4 = int(a2_fields[3])
-        except ValueError:
-            a2_f4 = 0  # Non-numeric fourth field treated as 0
-    else:
-        a2_f4 = 0  # Missing fourth field treated as 0
+            return sorted(alleles, key=rank)
+        except KeyError:
+            pass
 
-    if a1_f4 < a2_f4:
-        return -1
-    if a1_f4 > a2_f4:
-        return 1
+    if any(map(glstring_chars.search, alleles)):
+        return sorted(alleles)
 
-    # All compared fields are equal - alleles are considered equivalent for sorting
-    return 0
+    return sorted(alleles, key=lambda a: smart_sort_key(a, ignore_suffixes))
+
+
+def _has_ignored_suffix(allele: str, ignore_suffixes: Tuple[str, ...]) -> bool:
+    if "*" in allele:
+        _, fields = allele.split("*")
+        return fields in ignore_suffixes
+    return False
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Snapshot of the reference data loaded from the reference database.
+
+Loading the mappings from `pyard-3440.sqlite3` builds every dict from the
+tables row by row. The snapshot `pyard-3440.snapshot` next to it stores
+the loaded objects pickled, so they are loaded with a single read.
+
+The snapshot starts with a header:
+
+    MAGIC | format version | key length | key | SHA-256 of the payload
+
+The key identifies the reference database file and the py-ard version it
+was created from. A snapshot with another key, a bad checksum or that
+can't be read is ignored, and the mappings are loaded from the database.
+"""
+
+import gc
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import struct
+from typing import Dict, Iterable, Optional
+
+MAGIC = b"PYARDSNP"
+# Change when the objects stored in the snapshot change
+SNAPSHOT_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def snapshot_filename(db_filename: str, loci: Iterable[str] = ()) -> str:
+    """
+    Name of the snapshot next to the reference database
+
+    :param db_filename: reference database file e.g. pyard-3440.sqlite3
+    :param loci: loci of the mappings, all if empty
+    :return: snapshot file e.g. pyard-3440.snapshot or
+        pyard-3440-A-B.snapshot for the loci A and B
+    """
+    path = pathlib.Path(db_filename)
+    stem = "-".join([path.stem, *loci])
+    return str(path.with_name(stem).with_suffix(".snapshot"))
+
+
+def snapshot_key(db_filename: str) -> Optional[str]:
+    """
+    Key of the current state of the reference database
+
+    The key changes whenever the database file is written to.
+
+    :param db_filename: reference database file
+    :return: key or None if the database doesn't exist
+    """
+    from . import __version__
+
+    try:
+        stat = os.stat(db_filename)
+    except OSError:
+        return None
+    return json.dumps(
+        {
+            "pyard": __version__,
+            "db_size": stat.st_size,
+            "db_mtime_ns": stat.st_mtime_ns,
+        },
+        sort_keys=True,
+    )
+
+
+def save_snapshot(filename: str, key: str, mappings: Dict[str, object]) -> bool:
+    """
+    Save a snapshot of the mappings
+
+    The snapshot is written to a temporary file that replaces the previous
+    snapshot, so processes never read a partial snapshot.
+
+    :param filename: snapshot file
+    :param key: key of the reference database the mappings were loaded from
+    :param mappings: name -> picklable mapping object
+    :return: True if the snapshot was saved
+    """
+    payload = pickle.dumps(mappings, protocol=pickle.HIGHEST_PROTOCOL)
+    encoded_key = key.encode()
+    header = _HEADER.pack(MAGIC, SNAPSHOT_FORMAT_VERSION, len(encoded_key))
+    digest = hashlib.sha256(payload).digest()
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_filename, "wb") as snapshot_file:
+            snapshot_file.write(header + encoded_key + digest)
+            snapshot_file.write(payload)
+        os.replace(tmp_filename, filename)
+    except OSError:
+        # e.g. the data directory is read-only
+        pathlib.Path(tmp_filename).unlink(missing_ok=True)
+        return False
+    return True
+
+
+def load_snapshot(filename: str, key: str) -> Optional[Dict[str, object]]:
+    """
+    Load the mappings of a snapshot
+
+    :param filename: snapshot file
+    :param key: key of the current reference database
+    :return: name -> mapping object or None if there's no valid snapshot
+        for the key
+    """
+    try:
+        with open(filename, "rb") as snapshot_file:
+            data = snapshot_file.read()
+    except OSError:
+        return None
+
+    if len(data) < _HEADER.size:
+        return None
+    magic, format_version, key_length = _HEADER.unpack_from(data)
+    if magic != MAGIC or format_version != SNAPSHOT_FORMAT_VERSION:
+        return None
+    key_end = _HEADER.size + key_length
+    if data[_HEADER.size : key_end] != key.encode():
+        return None
+    digest = data[key_end : key_end + _DIGEST_SIZE]
+    payload = memoryview(data)[key_end + _DIGEST_SIZE :]
+    if hashlib.sha256(payload).digest() != digest:
+        return None
+
+    # Unpickling creates millions of objects, don't let gc scan them
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(payload)
+    except Exception:
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
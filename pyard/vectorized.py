@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+#    py-ard
+#    Copyright (c) 2023 Be The Match operated by National Marrow Donor Program. All Rights Reserved.
+#
+#    This library is free software; you can redistribute it and/or modify it
+#    under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation; either version 3 of the License, or (at
+#    your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful, but WITHOUT
+#    ANY WARRANTY; with out even the implied warranty of MERCHANTABILITY or
+#    FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+#    License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this library;  if not, write to the Free Software Foundation,
+#    Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA.
+#
+#    > http://www.fsf.org/licensing/licenses/lgpl.html
+#    > http://www.opensource.org/licenses/lgpl-license.php
+#
+"""
+Reduction of columns of single alleles.
+
+A column is factorized into its distinct values and the codes of each row.
+The distinct values are looked up in a reduction table of the alleles
+precomputed with `precompute_redux=True`: with NumPy, a sorted array of
+the alleles searched with `numpy.searchsorted` and an array of their
+reductions to gather from. Values that aren't in the table (MACs, XX
+codes, serology, GL Strings, or everything without precomputed
+reductions) are reduced one at a time with `ARD.redux`. The results are
+then gathered back to the rows with the codes.
+
+NumPy and pandas are optional. Without them the same steps are done with
+dicts and lists.
+"""
+
+from typing import TYPE_CHECKING, List, Tuple
+
+from .constants import VALID_REDUCTION_TYPE
+from .exceptions import InvalidTypingError, PyArdError
+from .misc import validate_reduction_type
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+if TYPE_CHECKING:
+    from .ard import ARD
+
+# Code of the values that aren't reduced, e.g. None, NaN or ""
+MISSING = -1
+
+
+def _is_allele(value) -> bool:
+    return isinstance(value, str) and value != ""
+
+
+def _factorize(values) -> Tuple[List[int], list]:
+    """Codes of the values and the distinct alleles they refer to"""
+    if pd is not None:
+        if not isinstance(values, (pd.Series, np.ndarray)):
+            values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        # Non-string values and "" are left as they are
+        is_allele = [_is_allele(value) for value in uniques]
+        if not all(is_allele):
+            alleles = [value for value in uniques if _is_allele(value)]
+            new_codes = np.full(len(uniques), MISSING)
+            new_codes[np.flatnonzero(is_allele)] = np.arange(len(alleles))
+            codes = np.where(codes == MISSING, MISSING, new_codes[codes])
+            uniques = alleles
+        return codes, list(uniques)
+
+    uniques = {}
+    codes = [
+        uniques.setdefault(value, len(uniques)) if _is_allele(value) else MISSING
+        for value in values
+    ]
+    return codes, list(uniques)
+
+
+class ReduxTable:
+    """Precomputed reductions of the alleles for a reduction type"""
+
+    def __init__(self, allele_redux: dict):
+        """
+        :param allele_redux: allele -> reduction from `ARD.allele_redux`
+        """
+        if np is None:
+            self._allele_redux = allele_redux
+            return
+        alleles = sorted(allele_redux)
+        self._alleles = np.array(alleles, dtype=str)
+        self._reduced = np.array(
+            [allele_redux[allele] for allele in alleles], dtype=object
+        )
+
+    def lookup(self, alleles: list) -> Tuple[list, List[int]]:
+        """
+        Reductions of alleles
+
+        :param alleles: alleles to reduce
+        :return: reductions, None for the alleles not in the table, and the
+            positions of the alleles not in the table
+        """
+        if np is None:
+            reduced = [self._allele_redux.get(allele) for allele in alleles]
+            not_found = [i for i, redux in enumerate(reduced) if redux is None]
+            return reduced, not_found
+
+        reduced = np.full(len(alleles), None, dtype=object)
+        if not len(alleles) or not len(self._alleles):
+            return reduced, list(range(len(alleles)))
+        alleles = np.array(alleles, dtype=str)
+        positions = np.searchsorted(self._alleles, alleles)
+        positions = np.minimum(positions, len(self._alleles) - 1)
+        found = self._alleles[positions] == alleles
+        reduced[found] = self._reduced[positions[found]]
+        return reduced, np.flatnonzero(~found).tolist()
+
+
+def _gather(values, codes, reduced_uniques):
+    """Reductions of the rows from the reductions of the distinct values"""
+    if np is not None and isinstance(codes, np.ndarray):
+        reduced_uniques = np.asarray(reduced_uniques, dtype=object)
+        missing = codes == MISSING
+        reduced = np.empty(len(codes), dtype=object)
+        reduced[~missing] = reduced_uniques[codes[~missing]]
+        reduced[missing] = np.asarray(values, dtype=object)[missing]
+    else:
+        reduced = [
+            value if code == MISSING else reduced_uniques[code]
+            for value, code in zip(values, codes)
+        ]
+
+    if pd is not None and isinstance(values, pd.Series):
+        # object dtype keeps None and errors as they are
+        return pd.Series(reduced, index=values.index, name=values.name, dtype=object)
+    if np is not None and isinstance(values, np.ndarray):
+        return np.asarray(reduced, dtype=object)
+    return list(reduced)
+
+
+def redux_column(
+    ard: "ARD",
+    alleles,
+    redux_type: VALID_REDUCTION_TYPE = "lgx",
+    return_errors: bool = False,
+):
+    """
+    Reduce a column of single alleles
+
+    :param ard: ARD instance to reduce with
+    :param alleles: pandas Series, NumPy array or sequence of alleles
+    :param redux_type: reduction type
+    :param return_errors: return a `PyArdError` raised while reducing a value
+        in place of its result instead of raising it. Malformed values are
+        returned as `InvalidTypingError`.
+    :return: reductions in the same order, as a Series with the same index,
+        an object array or a list depending on the type of `alleles`.
+        Values that aren't strings, or are empty, are returned unchanged.
+    """
+    validate_reduction_type(redux_type)
+    is_series = pd is not None and isinstance(alleles, pd.Series)
+    is_array = np is not None and isinstance(alleles, np.ndarray)
+    if not (is_series or is_array):
+        alleles = list(alleles)
+
+    codes, uniques = _factorize(alleles)
+
+    allele_redux = ard.allele_redux.get(redux_type)
+    if allele_redux:
+        if redux_type not in ard._redux_tables:
+            ard._redux_tables[redux_type] = ReduxTable(allele_redux)
+        reduced_uniques, not_found = ard._redux_tables[redux_type].lookup(uniques)
+    else:
+        reduced_uniques = [None] * len(uniques)
+        not_found = range(len(uniques))
+
+    # Scalar reduction of MACs, XX codes, serology, GL Strings, etc.
+    for i in not_found:
+        try:
+            reduced_uniques[i] = ard.redux(uniques[i], redux_type)
+        except (PyArdError, ValueError) as e:
+            if not return_errors:
+                raise
+            if not isinstance(e, PyArdError):
+                # Malformed typings e.g. A*01*01 fail to parse
+                e = InvalidTypingError(f"{uniques[i]} is not a valid typing.", cause=e)
+            reduced_uniques[i] = e
+
+    return _gather(alleles, codes, reduced_uniques)
@@ -52,6 +52,7 @@ setup(
         "scripts/pyard-import",
         "scripts/pyard-status",
         "scripts/pyard-reduce-csv",
+        "scripts/pyard-warm-cache",
     ],
     install_requires=requirements,
     extras_require=script_extras,
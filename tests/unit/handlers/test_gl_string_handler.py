@@ -3,7 +3,11 @@
 import pytest
 from unittest.mock import Mock
 
-from pyard.handlers.gl_string_processor import GLStringHandler
+from pyard.handlers.gl_string_processor import (
+    GLString,
+    GLStringHandler,
+    parse_gl_string,
+)
 from pyard.exceptions import InvalidAlleleError
 
 
@@ -18,19 +22,15 @@ class TestGLStringHandler:
             # Mock the redux method to return the input string
             return x
 
-        def sort_comparator(a, b, ignore_suffixes=()):
-            # Simple lexicographic comparison for consistent sorting
-            if a < b:
-                return -1
-            elif a > b:
-                return 1
-            else:
-                return 0
+        def smart_sorted(alleles, ignore_suffixes=()):
+            # Simple lexicographic sorting for consistent order
+            return sorted(alleles)
 
         ard = Mock()
         ard._config = {"strict": False, "ignore_allele_with_suffixes": ()}
         ard.redux.side_effect = redux_side_effect
-        ard.smart_sort_comparator.side_effect = sort_comparator
+        ard._redux_single_typing.side_effect = redux_side_effect
+        ard.smart_sorted.side_effect = smart_sorted
         ard._is_valid.return_value = True
         return ard
 
@@ -148,3 +148,40 @@ class TestGLStringHandler:
         """Test processing with invalid reduction type"""
         with pytest.raises(ValueError):
             gl_handler.process_gl_string("A*01:01", "INVALID")
+
+    def test_parse_gl_string_single_allele(self):
+        """Test parsing a single allele into a leaf"""
+        gl = parse_gl_string("A*01:01")
+        assert gl == GLString("A*01:01")
+        assert gl.is_leaf
+
+    def test_parse_gl_string_precedence(self):
+        """Test that delimiters are parsed in order of precedence"""
+        gl = parse_gl_string("A*01:01/A*01:02+A*02:01^B*07:02")
+        assert gl.delimiter == "^"
+        assert [part.text for part in gl.parts] == [
+            "A*01:01/A*01:02+A*02:01",
+            "B*07:02",
+        ]
+        a_locus = gl.parts[0]
+        assert a_locus.delimiter == "+"
+        assert a_locus.parts[0].delimiter == "/"
+        assert list(gl.leaves()) == ["A*01:01", "A*01:02", "A*02:01", "B*07:02"]
+
+    def test_parse_gl_string_is_cached(self):
+        """Test that the same GL string is parsed only once"""
+        assert parse_gl_string("A*01:01+A*02:01") is parse_gl_string("A*01:01+A*02:01")
+
+    def test_reduce_gl(self, gl_handler, mock_ard):
+        """Test reducing a parsed GL string reduces each allele once"""
+        gl = parse_gl_string("A*02:01/A*01:01+A*03:01^B*07:02")
+        result = gl_handler.reduce_gl(gl, "G")
+        assert result == "A*01:01/A*02:01+A*03:01^B*07:02"
+        assert mock_ard._redux_single_typing.call_count == 4
+        mock_ard.redux.assert_not_called()
+
+    def test_validate_gl(self, gl_handler, mock_ard):
+        """Test validating a parsed GL string validates every allele"""
+        gl = parse_gl_string("A*01:01+A*02:01^B*07:02")
+        assert gl_handler.validate_gl(gl) is True
+        assert mock_ard._is_valid.call_count == 3
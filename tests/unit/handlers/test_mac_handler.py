@@ -6,6 +6,7 @@ import sqlite3
 
 from pyard.handlers.mac_handler import MACHandler
 from pyard.exceptions import InvalidMACError
+from pyard.mappings import MACExpansion
 
 
 class TestMACHandler:
@@ -16,7 +17,7 @@ class TestMACHandler:
         """Create mock ARD instance"""
         ard = Mock()
         ard.db_connection = Mock()
-        ard.smart_sort_comparator.return_value = 0
+        ard.smart_sorted.side_effect = sorted
         ard._is_allele_in_db.return_value = True
         return ard
 
@@ -122,8 +123,6 @@ class TestMACHandler:
     @patch("pyard.handlers.mac_handler.db.alleles_to_mac_code")
     def test_lookup_mac_sorted_order(self, mock_alleles_to_mac, mac_handler):
         """Test lookup_mac trying sorted order"""
-        # Mock the smart_sort_comparator to return consistent sorting
-        mac_handler.ard.smart_sort_comparator.return_value = -1  # First arg comes first
         # For different antigen groups, skip single antigen optimization
         mock_alleles_to_mac.side_effect = [None, "AB"]  # First fails, second succeeds
 
@@ -178,3 +177,38 @@ class TestMACHandler:
 
             # Should only call database once due to caching
             assert mock_mac_to_alleles.call_count == 1
+
+    @patch("pyard.handlers.mac_handler.db.mac_code_to_alleles")
+    def test_get_alleles_cache_behavior(self, mock_mac_to_alleles, mac_handler):
+        """Test that get_alleles is cached per code and locus_antigen"""
+        mock_mac_to_alleles.return_value = ["01", "02"]
+
+        assert mac_handler.get_alleles("AB", "A*01") == ["A*01:01", "A*01:02"]
+        assert mac_handler.get_alleles("AB", "A*01") == ["A*01:01", "A*01:02"]
+        assert mac_handler.get_alleles("AB", "B*01") == ["B*01:01", "B*01:02"]
+        assert mock_mac_to_alleles.call_count == 2
+
+    @patch("pyard.handlers.mac_handler.db.load_mac_codes")
+    @patch("pyard.handlers.mac_handler.db.table_exists", return_value=True)
+    @patch("pyard.handlers.mac_handler.db.mac_code_to_alleles")
+    def test_load_mac_codes(
+        self, mock_mac_to_alleles, mock_table_exists, mock_load_mac_codes, mac_handler
+    ):
+        """Test MAC lookups use the MAC codes loaded in memory"""
+        mock_load_mac_codes.return_value = iter(
+            [("AB", ["01", "02"]), ("ABC", ["01:01", "02:01", "02:02"])]
+        )
+        mac_handler.load_mac_codes()
+
+        assert mac_handler.mac_codes["AB"] == MACExpansion(("01", "02"), None)
+        assert mac_handler.mac_codes["ABC"].antigen_group == "02"
+        assert mac_handler.is_mac("A*01:AB")
+        assert mac_handler.is_mac("A*02:ABC")
+        assert not mac_handler.is_mac("A*01:ABC")
+        assert not mac_handler.is_mac("A*01:ZZ")
+        assert mac_handler.get_alleles("ABC", "A*02") == [
+            "A*01:01",
+            "A*02:01",
+            "A*02:02",
+        ]
+        mock_mac_to_alleles.assert_not_called()
@@ -38,7 +38,7 @@ def mock_ard():
     ard._redux_allele = Mock()
     ard.redux = Mock()
     ard.is_shortnull = Mock(return_value=False)
-    ard.smart_sort_comparator = Mock()
+    ard.smart_sorted = Mock(side_effect=sorted)
     return ard
 
 
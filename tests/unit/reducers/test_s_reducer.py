@@ -12,55 +12,65 @@ def mock_ard():
     ard.db_connection = Mock()
     ard._redux_allele = Mock()
     ard.redux = Mock()
-    ard.smart_sort_comparator = Mock()
+    ard.smart_sorted = Mock(side_effect=sorted)
     return ard
 
 
 def test_reduce_two_field_allele(mock_ard):
     """Test reduction of 2-field allele"""
     mock_ard._redux_allele.return_value = "A*01:01"
-    mock_ard.smart_sort_comparator.return_value = 0
-
-    serology_mapping = {"A1": "A*01:01/A*01:02"}
 
     with patch("pyard.reducers.s_reducer.is_2_field_allele", return_value=True), patch(
-        "pyard.reducers.s_reducer.db.find_serology_for_allele",
-        return_value=serology_mapping,
-    ), patch("functools.cmp_to_key"):
+        "pyard.reducers.s_reducer.db.find_serologies_in_index",
+        return_value={"A1"},
+    ) as mock_find:
         reducer = SReducer(mock_ard)
         result = reducer.reduce("A*01:01")
 
     assert result == "A1"
+    mock_find.assert_called_once_with(
+        mock_ard.db_connection, "A*01:01", "lgx_allele_list"
+    )
 
 
 def test_reduce_non_two_field_allele(mock_ard):
     """Test reduction of non-2-field allele"""
-    mock_ard.smart_sort_comparator.return_value = 0
-
-    serology_mapping = {"A1": "A*01:01:01/A*01:02:01"}
-
     with patch("pyard.reducers.s_reducer.is_2_field_allele", return_value=False), patch(
-        "pyard.reducers.s_reducer.db.find_serology_for_allele",
-        return_value=serology_mapping,
-    ), patch("functools.cmp_to_key"):
+        "pyard.reducers.s_reducer.db.find_serologies_in_index",
+        return_value={"A1"},
+    ) as mock_find:
         reducer = SReducer(mock_ard)
         result = reducer.reduce("A*01:01:01")
 
     assert result == "A1"
+    mock_find.assert_called_once_with(mock_ard.db_connection, "A*01:01:01")
 
 
 def test_reduce_multiple_serology_matches(mock_ard):
     """Test reduction with multiple serology matches"""
-    mock_ard.smart_sort_comparator.return_value = 0
-
-    serology_mapping = {"A1": "A*01:01/A*01:02", "A36": "A*01:01/A*36:01"}
-
     with patch("pyard.reducers.s_reducer.is_2_field_allele", return_value=False), patch(
-        "pyard.reducers.s_reducer.db.find_serology_for_allele",
-        return_value=serology_mapping,
-    ), patch("functools.cmp_to_key", side_effect=lambda x: x):
+        "pyard.reducers.s_reducer.db.find_serologies_in_index",
+        return_value={"A1", "A36"},
+    ):
         reducer = SReducer(mock_ard)
         result = reducer.reduce("A*01:01")
 
     # Should return sorted serology codes
     assert "A1" in result and "A36" in result
+
+
+def test_reduce_two_field_allele_lgx_redux_fallback(mock_ard):
+    """Test 2-field allele not in any lgx allele list uses their LGX reductions"""
+    mock_ard._redux_allele.return_value = "A*01:01"
+
+    with patch("pyard.reducers.s_reducer.is_2_field_allele", return_value=True), patch(
+        "pyard.reducers.s_reducer.db.find_serologies_in_index",
+        side_effect=[set(), {"A1"}],
+    ) as mock_find:
+        reducer = SReducer(mock_ard)
+        result = reducer.reduce("A*01:01")
+
+    assert result == "A1"
+    mock_find.assert_called_with(
+        mock_ard.db_connection, "A*01:01", "lgx_allele_list_redux"
+    )
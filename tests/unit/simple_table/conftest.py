@@ -0,0 +1,12 @@
+import pytest
+
+from pyard import simple_table
+
+
+@pytest.fixture(autouse=True, params=simple_table.TABLE_BACKENDS)
+def table_backend(request):
+    """Run the tests with each Table backend"""
+    backend = simple_table.get_backend()
+    simple_table.set_backend(request.param)
+    yield request.param
+    simple_table.set_backend(backend)
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+from pyard import simple_table
+from pyard.simple_table import Table, lazy_tables
+
+
+@pytest.fixture
+def table_backend():
+    """Lazy tables are SQLite tables"""
+    backend = simple_table.get_backend()
+    simple_table.set_backend("sqlite")
+    yield "sqlite"
+    simple_table.set_backend(backend)
+
+
+@pytest.fixture
+def lazy_table():
+    with lazy_tables():
+        table = Table(
+            [("John", "25", "NYC"), ("Jane", "30", "LA"), ("Bob", "30", None)],
+            ["name", "age", "city"],
+        )
+    yield table
+    table.close()
+
+
+def test_derived_tables_share_connection(lazy_table):
+    filtered = lazy_table.where("age = '30'")
+    subset = filtered[["name", "city"]]
+
+    assert subset._conn is lazy_table._conn
+    assert subset.columns == ["name", "city"]
+    assert subset.to_dict() == {"Jane": "LA", "Bob": None}
+
+
+def test_lazy_operations(lazy_table):
+    assert len(lazy_table.where_not_null("city")) == 2
+    assert len(lazy_table.where_in("name", {"John", "Bob", "Jim"}, ["name"])) == 2
+    assert len(lazy_table.unique(["age"])) == 2
+    counts = lazy_table.value_counts("age")
+    assert counts.where("count > 1")["age"].to_list() == ["30"]
+    assert lazy_table.agg("age", "name", set) == {
+        "25": {"John"},
+        "30": {"Jane", "Bob"},
+    }
+
+
+def test_invalid_where_clause(lazy_table):
+    with pytest.raises(ValueError):
+        lazy_table.where("no_such_column = 1")
+
+
+def test_rename_and_union(lazy_table):
+    ages = lazy_table[["name", "age"]].rename({"age": "value"})
+    cities = lazy_table[["name", "city"]].rename({"city": "value"})
+    other = Table([("Jim", "35")], ["name", "value"])
+
+    union = ages.union(cities).union(other)
+
+    assert union.columns == ["name", "value"]
+    assert len(union) == 7
+    assert union.where("name = 'Jim'")["value"].to_list() == ["35"]
+
+
+def test_setitem(lazy_table):
+    filtered = lazy_table.where("age = '30'")
+    filtered["age"] = [31, 32]
+
+    assert filtered.columns == ["name", "city", "age"]
+    assert filtered["age"].to_list() == ["31", "32"]
+    assert lazy_table["age"].to_list() == ["25", "30", "30"]
+
+
+def test_derived_tables_keep_their_rows(lazy_table):
+    filtered = lazy_table.where("age = '30'")
+    lazy_table["age"] = ["1", "2", "3"]
+    lazy_table.rename({"name": "first_name"})
+    lazy_table.remove("city", ["NYC"])
+
+    assert filtered.to_dict("name", "age") == {"Jane": "30", "Bob": "30"}
+    assert lazy_table.columns == ["first_name", "city", "age"]
+    assert lazy_table.to_dict("first_name", "age") == {"Jane": "2", "Bob": "3"}
+
+
+def test_explode_and_tail():
+    with lazy_tables():
+        table = Table([("A", "1/2"), ("B", "3")], ["locus", "serology"])
+    exploded = table.explode("serology", "/")
+
+    assert exploded._conn is table._conn
+    assert exploded["serology"].to_list() == ["1", "2", "3"]
+    assert exploded.tail(2).rows == [("B", "3"), ("A", "2")]
+
+
+def test_lazy_tables_of_concurrent_threads():
+    entered = threading.Event()
+    done = threading.Event()
+    results = []
+
+    def build():
+        with lazy_tables():
+            table = Table([("B", "1")], ["name", "value"])
+            entered.set()
+            done.wait(5)
+            results.append(table.to_dict("name", "value"))
+
+    thread = threading.Thread(target=build)
+    with lazy_tables():
+        thread.start()
+        entered.wait(5)
+        # Created while the thread is in its own lazy_tables() block
+        table = Table([("A", "1"), ("A", "2")], ["name", "value"])
+        assert table.where("value = '2'").to_dict("name", "value") == {"A": "2"}
+    done.set()
+    thread.join()
+    assert results == [{"B": "1"}]
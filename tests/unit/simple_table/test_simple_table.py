@@ -94,6 +94,19 @@ def test_create_new_column_with_subscript_operator():
     assert double_ages[1] == "60"
 
 
+def test_replace_column_with_subscript_operator():
+    data = [("John", "25", "NYC"), ("Jane", "30", "LA")]
+    table = Table(data, ["name", "age", "city"])
+    table["age"] = [26, 31]
+
+    assert table.columns == ["name", "city", "age"]
+    assert table.query("SELECT * FROM data") == [
+        ("John", "NYC", "26"),
+        ("Jane", "LA", "31"),
+    ]
+    table.close()
+
+
 def test_table_from_tuples():
     data = [("John", "25"), ("Jane", "30")]
     columns = ["name", "age"]
@@ -104,6 +117,17 @@ def test_table_from_tuples():
     table.close()
 
 
+def test_table_from_generator():
+    columns = ["name", "age"]
+    table = Table(((name, "25") for name in ["John", "Jane"]), columns)
+    assert table.query("SELECT * FROM data") == [("John", "25"), ("Jane", "25")]
+    table.close()
+
+    empty_table = Table((row for row in []), columns)
+    assert empty_table.columns == []
+    empty_table.close()
+
+
 def test_columns_property():
     csv_data = "name,age\nJohn,25"
     reader = csv.DictReader(io.StringIO(csv_data))
@@ -197,6 +221,17 @@ def test_where_in():
     table.close()
 
 
+def test_where_in_many_values():
+    data = [(str(i), str(i * 2)) for i in range(50000)]
+    table = Table(data, ["id", "value"])
+    values = {str(i) for i in range(0, 100000, 2)}
+    filtered = table.where_in("id", values, ["value"])
+    assert len(filtered) == 25000
+    assert filtered.columns == ["value"]
+    filtered.close()
+    table.close()
+
+
 def test_to_dict():
     csv_data = "name,age\nJohn,25\nJane,30"
     reader = csv.DictReader(io.StringIO(csv_data))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from pyard.allele_ids import (
+    NO_ID,
+    AlleleIds,
+    IdDict,
+    IdListDict,
+    IdSet,
+    encode_mappings,
+)
+from pyard.mappings import AlleleGroups, ARSMapping, CodeMappings
+
+ARS_MAPPINGS = ARSMapping(
+    dup_g={},
+    g_group={"A*01:01:01": "A*01:01:01G", "A*01:01:02": "A*01:01:01G"},
+    p_group={"A*01:01:01": "A*01:01P"},
+    lgx_group={"A*01:01:01": "A*01:01", "A*01:01:02": "A*01:01"},
+    exon_group={},
+    p_not_g={},
+)
+CODE_MAPPINGS = CodeMappings(
+    xx_codes={"A*01": ["A*01:01", "A*01:02"]},
+    who_group={"A*01:01": ["A*01:01:01", "A*01:01:02"]},
+)
+ALLELE_GROUP = AlleleGroups(
+    alleles={"A*01:01", "A*01:01:01", "A*01:01:02", "A*01:02"},
+    exp_alleles={},
+    who_alleles={"A*01:01:01", "A*01:01:02"},
+)
+
+
+@pytest.fixture
+def encoded():
+    return encode_mappings(ARS_MAPPINGS, CODE_MAPPINGS, ALLELE_GROUP)
+
+
+def test_allele_ids():
+    allele_ids = AlleleIds(["B*07:02", "A*01:01", "B*07:02"])
+    assert allele_ids.names == ["A*01:01", "B*07:02"]
+    assert allele_ids.get_id("B*07:02") == 1
+    assert allele_ids.get_id("C*01:02") == NO_ID
+    assert list(allele_ids.encode(["B*07:02", "C*01:02"])) == [1, NO_ID]
+    assert allele_ids.decode([0, NO_ID]) == ["A*01:01", None]
+
+
+def test_encode_mappings(encoded):
+    allele_ids, ars_mappings, code_mappings, allele_group = encoded
+    assert ars_mappings == ARS_MAPPINGS
+    assert code_mappings == CODE_MAPPINGS
+    assert allele_group == ALLELE_GROUP
+    assert isinstance(ars_mappings.g_group, IdDict)
+    assert isinstance(code_mappings.who_group, IdListDict)
+    assert isinstance(allele_group.alleles, IdSet)
+    # Every name is stored once
+    assert len(allele_ids) == 7
+
+
+def test_id_dict(encoded):
+    allele_ids, ars_mappings, _, _ = encoded
+    g_group = ars_mappings.g_group
+    assert g_group["A*01:01:02"] == "A*01:01:01G"
+    assert g_group.get("A*01:01") is None
+    assert "A*01:01:01G" not in g_group
+    assert ["A*01:01:01"] not in g_group
+    with pytest.raises(KeyError):
+        g_group["A*99:99"]
+    assert "A*01:01:01G" in g_group.values()
+    assert "A*01:01:01" not in g_group.values()
+    # Vectorized lookup with the ID arrays
+    ids = allele_ids.encode(["A*01:01:01", "A*01:01:02"])
+    value_ids = [g_group.value_ids[i] for i in ids]
+    assert allele_ids.decode(value_ids) == ["A*01:01:01G", "A*01:01:01G"]
+
+
+def test_id_list_dict(encoded):
+    _, _, code_mappings, _ = encoded
+    xx_codes = code_mappings.xx_codes
+    assert xx_codes["A*01"] == ["A*01:01", "A*01:02"]
+    assert list(xx_codes) == ["A*01"]
+    assert "A*01:01" not in xx_codes
+    assert xx_codes.get("A*02", []) == []
+
+
+def test_id_set(encoded):
+    _, _, _, allele_group = encoded
+    who_alleles = allele_group.who_alleles
+    assert len(who_alleles) == 2
+    assert "A*01:01:01" in who_alleles
+    assert "A*01:01" not in who_alleles
+    assert list(who_alleles) == ["A*01:01:01", "A*01:01:02"]
+
+
+def test_pickle(encoded):
+    allele_ids, *mappings = pickle.loads(pickle.dumps(encoded))
+    assert allele_ids.names == encoded[0].names
+    assert mappings == list(encoded[1:])
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+from pyard import db
+
+ALLELE_REDUX = {"lgx": {"A*01:01:01": "A*01:01"}, "G": {"A*01:01:01": "A*01:01:01G"}}
+
+
+def test_allele_redux_keyed_by_pyard_version():
+    connection = sqlite3.connect(":memory:")
+    db.save_allele_redux(connection, "config", ALLELE_REDUX, "1.0.0")
+    assert db.load_allele_redux(connection, "config", "1.0.0") == ALLELE_REDUX
+    assert db.load_allele_redux(connection, "other", "1.0.0") == {}
+    assert db.load_allele_redux(connection, "config", "1.0.1") == {}
+
+    # Reductions of other versions are dropped
+    db.save_allele_redux(connection, "config", {"lgx": {}}, "1.0.1")
+    (count,) = connection.execute("SELECT COUNT(*) FROM allele_redux").fetchone()
+    assert count == 0
+
+
+def test_allele_redux_of_a_version_without_pyard_version():
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE allele_redux (config_hash, redux_type, allele, redux)"
+    )
+    connection.execute(
+        "INSERT INTO allele_redux VALUES ('config', 'lgx', 'A*01:01:01', 'A*01')"
+    )
+    assert db.load_allele_redux(connection, "config", "1.0.0") == {}
+
+    db.save_allele_redux(connection, "config", ALLELE_REDUX, "1.0.0")
+    assert db.load_allele_redux(connection, "config", "1.0.0") == ALLELE_REDUX
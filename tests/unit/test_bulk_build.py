@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import pathlib
+import sqlite3
+
+from pyard import db
+
+
+def test_bulk_build(tmp_path):
+    connection, db_filename = db.create_db_connection(
+        str(tmp_path), "Latest", bulk_build=True
+    )
+    assert isinstance(connection, db.BulkBuildConnection)
+    db.save_dict(connection, "xx_codes", {"A*01": "A*01:01/A*01:02"}, ("a", "b"))
+    db.save_set(connection, "alleles", {"A*01:01", "A*01:02"}, "allele")
+    db.set_user_version(connection, 3440)
+    # Built in a temporary file until the build finishes
+    assert not pathlib.Path(db_filename).exists()
+
+    timings = connection.finish_build()
+    assert {"xx_codes", "alleles", "indexes", "analyze", "vacuum"} <= set(timings)
+    connection.close()
+
+    connection = sqlite3.connect(db_filename)
+    assert db.load_set(connection, "alleles", "allele") == {"A*01:01", "A*01:02"}
+    assert db.get_user_version(connection) == 3440
+    indexes = db.load_set(connection, "sqlite_master", "name")
+    assert {"xx_codes_a", "alleles_allele"} <= indexes
+    connection.close()
+    assert list(tmp_path.iterdir()) == [pathlib.Path(db_filename)]
+
+
+def test_unfinished_bulk_build_is_discarded(tmp_path):
+    connection, db_filename = db.create_db_connection(
+        str(tmp_path), "Latest", bulk_build=True
+    )
+    db.save_set(connection, "alleles", {"A*01:01"}, "allele")
+    connection.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bulk_build_only_for_new_database(tmp_path):
+    connection, _ = db.create_db_connection(str(tmp_path), "Latest")
+    db.save_set(connection, "alleles", {"A*01:01"}, "allele")
+    connection.close()
+
+    connection, _ = db.create_db_connection(str(tmp_path), "Latest", bulk_build=True)
+    assert not isinstance(connection, db.BulkBuildConnection)
+    connection.close()
+
+
+def test_concurrent_bulk_builds(tmp_path):
+    first, db_filename = db.create_db_connection(
+        str(tmp_path), "Latest", bulk_build=True
+    )
+    second, _ = db.create_db_connection(str(tmp_path), "Latest", bulk_build=True)
+    assert first.build_filename != second.build_filename
+    db.save_set(first, "alleles", {"A*01:01"}, "allele")
+    db.save_set(second, "alleles", {"A*01:01"}, "allele")
+
+    # The second build doesn't remove the first one
+    second.close()
+    assert pathlib.Path(first.build_filename).exists()
+    first.finish_build()
+    first.close()
+    assert list(tmp_path.iterdir()) == [pathlib.Path(db_filename)]
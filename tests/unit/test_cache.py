@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import threading
+import weakref
+
+import pytest
+
+from pyard.cache import (
+    Cache,
+    CachedFunction,
+    LFUCache,
+    LRUCache,
+    NoCache,
+    UnboundedCache,
+    create_cache,
+)
+
+
+def test_create_cache_policies():
+    assert isinstance(create_cache("lru", 10), LRUCache)
+    assert isinstance(create_cache("lfu", 10), LFUCache)
+    assert isinstance(create_cache("unbounded", 10), UnboundedCache)
+    assert isinstance(create_cache("none", 10), NoCache)
+    # 0 disables caching and None is unbounded like functools.lru_cache
+    assert isinstance(create_cache("lru", 0), NoCache)
+    assert isinstance(create_cache("lru", None), UnboundedCache)
+
+
+def test_create_cache_invalid_policy():
+    with pytest.raises(ValueError):
+        create_cache("fifo", 10)
+
+
+def test_cache_is_abstract():
+    with pytest.raises(TypeError):
+        Cache()
+
+
+def test_unbounded_cache_counts_concurrent_lookups():
+    cache = UnboundedCache()
+    cache.put("a", 1)
+
+    def lookup():
+        for _ in range(10000):
+            cache.get("a")
+            cache.get("b")
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.info() == (40000, 40000, None, 1, 0)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.info() == (2, 1, 2, 2, 1)
+
+
+def test_lfu_evicts_least_frequently_used():
+    cache = LFUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.info().evictions == 1
+
+
+def test_no_cache():
+    cache = NoCache()
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.info() == (0, 1, 0, 0, 0)
+
+
+def test_cached_function():
+    calls = []
+
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    cached_square = CachedFunction(square, create_cache("lru", 10))
+    assert cached_square(3) == 9
+    assert cached_square(3) == 9
+    assert calls == [3]
+    assert cached_square.__name__ == "square"
+
+    info = cached_square.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    cached_square.cache_clear()
+    assert cached_square.cache_info() == (0, 0, 10, 0, 0)
+
+
+def test_cached_function_does_not_cache_errors():
+    def fail(x):
+        raise ValueError(x)
+
+    cached_fail = CachedFunction(fail, create_cache("lru", 10))
+    with pytest.raises(ValueError):
+        cached_fail(1)
+    assert cached_fail.cache_info().currsize == 0
+
+
+def test_cached_method_bound_weakly():
+    class Squares:
+        def __init__(self):
+            self.square = CachedFunction(self.square, create_cache("lru", 10))
+
+        def square(self, x):
+            return x * x
+
+    squares = Squares()
+    squares.square.bind_weakly()
+    assert squares.square(3) == 9
+    instance = weakref.ref(squares)
+    gc.disable()
+    try:
+        # Freed without a garbage collection of the reference cycle
+        del squares
+        assert instance() is None
+    finally:
+        gc.enable()
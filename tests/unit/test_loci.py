@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyard.loci import locus_of, scope_mappings, scope_names
+from pyard.mappings import AlleleGroups, ARSMapping, CodeMappings
+from pyard.serology import SerologyMapping
+
+MAPPINGS = {
+    "ars_mappings": ARSMapping(
+        dup_g={},
+        g_group={"A*01:01:01": "A*01:01:01G", "B*07:02:01": "B*07:02:01G"},
+        p_group={},
+        lgx_group={"A*01:01:01": "A*01:01", "B*07:02:01": "B*07:02"},
+        exon_group={},
+        p_not_g={},
+    ),
+    "code_mappings": CodeMappings(
+        xx_codes={"A*01": ["A*01:01"], "B*07": ["B*07:02"]},
+        who_group={"A*01:01": ["A*01:01:01"], "B*07:02": ["B*07:02:01"]},
+    ),
+    "allele_group": AlleleGroups(
+        alleles={"A*01:01:01", "B*07:02:01"},
+        exp_alleles={},
+        who_alleles={"A*01:01:01", "B*07:02:01"},
+    ),
+    "shortnulls": {"B*07:02N": ["B*07:02:01N"]},
+    "serology_mapping": SerologyMapping(
+        {"A9": ("A23", "A24"), "B5": ("B51", "B52")}, {"A203": "A2"}
+    ),
+    "cwd_alleles": {"A": {"A*01:01"}, "B": {"B*07:02"}},
+    "sort_ranks": {"A*01:01:01": 0, "A1": 1, "B*07:02:01": 2, "B7": 3},
+}
+
+
+@pytest.mark.parametrize(
+    "name,locus",
+    [
+        ("A*01:01:01", "A"),
+        ("HLA-DRB1*04:AB", "DRB1"),
+        ("DR4", "DRB1"),
+        ("Cw10", "C"),
+        ("B7", "B"),
+        ("A*01:01:01G", "A"),
+        ("XYZ", None),
+    ],
+)
+def test_locus_of(name, locus):
+    assert locus_of(name) == locus
+
+
+def test_scope_names():
+    loci = frozenset(["A"])
+    assert scope_names({"A*01:01", "B*07:02", "XYZ"}, loci) == {"A*01:01", "XYZ"}
+    assert scope_names(["B7", "A1"], loci) == ["A1"]
+    assert scope_names({"A9": 1, "B5": 2}, loci) == {"A9": 1}
+
+
+def test_scope_mappings():
+    scoped = scope_mappings(MAPPINGS, ["A"])
+
+    assert scoped["ars_mappings"].lgx_group == {"A*01:01:01": "A*01:01"}
+    assert isinstance(scoped["ars_mappings"], ARSMapping)
+    assert scoped["code_mappings"].xx_codes == {"A*01": ["A*01:01"]}
+    assert scoped["allele_group"].alleles == {"A*01:01:01"}
+    assert scoped["shortnulls"] == {}
+    assert scoped["serology_mapping"].broad_splits_map == {"A9": ("A23", "A24")}
+    assert scoped["serology_mapping"].serology_associated_map == {"A203": "A2"}
+    assert scoped["cwd_alleles"] == {"A": {"A*01:01"}}
+    assert scoped["sort_ranks"] == {"A*01:01:01": 0, "A1": 1}
+    # The mappings themselves are unchanged
+    assert len(MAPPINGS["allele_group"].alleles) == 2
+
+
+def test_scope_mappings_unknown_locus():
+    with pytest.raises(ValueError, match="DRB1"):
+        scope_mappings(MAPPINGS, ["A", "DRB1"])
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from pyard.mapped_tables import (
+    MappedDict,
+    MappedSet,
+    load_mapped_tables,
+    mapped_tables_filename,
+    save_mapped_tables,
+)
+
+TABLES = {
+    "g_group": {
+        "A*01:01:01": "A*01:01:01G",
+        "A*01:01:02": "A*01:01:01G",
+        "Cw*01:02": "C*01:02:01G",
+    },
+    "who_group": {
+        "A*01:01": ["A*01:01:01", "A*01:01:02"],
+        "A*01:02": ["A*01:02"],
+    },
+    "alleles": {"A*01:01", "A*01:01:01", "A*01:02", "B*07:02"},
+}
+
+
+@pytest.fixture
+def tables(tmp_path):
+    filename = str(tmp_path / "pyard-3440.mapped")
+    assert save_mapped_tables(filename, "key", TABLES)
+    return load_mapped_tables(filename, "key")
+
+
+def test_mapped_tables_filename():
+    assert (
+        mapped_tables_filename("/tmp/py-ard/pyard-3440.sqlite3")
+        == "/tmp/py-ard/pyard-3440.mapped"
+    )
+    assert (
+        mapped_tables_filename("/tmp/py-ard/pyard-3440.sqlite3", ["A", "B"])
+        == "/tmp/py-ard/pyard-3440-A-B.mapped"
+    )
+
+
+def test_mapped_dict(tables):
+    g_group = tables["g_group"]
+    assert isinstance(g_group, MappedDict)
+    assert g_group == TABLES["g_group"]
+    assert len(g_group) == 3
+    assert "A*01:01:01" in g_group
+    assert "A*01:01:01G" not in g_group
+    assert None not in g_group
+    assert g_group["Cw*01:02"] == "C*01:02:01G"
+    assert g_group.get("A*99:99") is None
+    with pytest.raises(KeyError):
+        g_group["A*99:99"]
+    assert "A*01:01:01G" in g_group.values()
+    assert "A*01:01:01" not in g_group.values()
+
+
+def test_mapped_dict_of_lists(tables):
+    who_group = tables["who_group"]
+    assert who_group == TABLES["who_group"]
+    assert who_group["A*01:01"] == ["A*01:01:01", "A*01:01:02"]
+    assert ["A*01:02"] in who_group.values()
+
+
+def test_mapped_set(tables):
+    alleles = tables["alleles"]
+    assert isinstance(alleles, MappedSet)
+    assert alleles == TABLES["alleles"]
+    assert list(alleles) == sorted(TABLES["alleles"])
+    assert "B*07:02" in alleles
+    # Names of other tables aren't in the set
+    assert "A*01:01:01G" not in alleles
+
+
+def test_pickle(tables):
+    g_group = pickle.loads(pickle.dumps(tables["g_group"]))
+    assert g_group == TABLES["g_group"]
+
+
+def test_invalid_file(tmp_path):
+    filename = tmp_path / "pyard-3440.mapped"
+    assert load_mapped_tables(str(filename), "key") is None
+
+    save_mapped_tables(str(filename), "key", TABLES)
+    assert load_mapped_tables(str(filename), "other key") is None
+
+    filename.write_bytes(filename.read_bytes()[:100])
+    assert load_mapped_tables(str(filename), "key") is None
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import threading
+from unittest.mock import Mock
+
+from pyard import db, metrics
+from pyard.cache import CacheInfo
+
+
+def test_counter_values_per_labels():
+    counter = metrics.Counter("pyard_requests_total", "Requests", ("endpoint",))
+    counter.inc(("redux",))
+    counter.inc(("redux",))
+    counter.inc(("ard",), 3)
+    assert counter.value(("redux",)) == 2
+    assert counter.value(("mac",)) == 0
+    assert list(counter.expose()) == [
+        "# HELP pyard_requests_total Requests",
+        "# TYPE pyard_requests_total counter",
+        'pyard_requests_total{endpoint="ard"} 3',
+        'pyard_requests_total{endpoint="redux"} 2',
+    ]
+
+
+def test_label_values_are_escaped():
+    line = metrics.format_sample("m", [("type", 'a"b\\c\nd')], 1)
+    assert line == 'm{type="a\\"b\\\\c\\nd"} 1'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("latency", "Latency", ("endpoint",), (0.1, 1.0))
+    histogram.observe(("redux",), 0.05)
+    histogram.observe(("redux",), 0.1)
+    histogram.observe(("redux",), 0.5)
+    histogram.observe(("redux",), 2.0)
+    assert histogram.count(("redux",)) == 4
+    assert list(histogram.expose())[2:] == [
+        'latency_bucket{endpoint="redux",le="0.1"} 2',
+        'latency_bucket{endpoint="redux",le="1.0"} 3',
+        'latency_bucket{endpoint="redux",le="+Inf"} 4',
+        'latency_sum{endpoint="redux"} 2.65',
+        'latency_count{endpoint="redux"} 4',
+    ]
+
+
+def test_ard_metrics():
+    ard = Mock()
+    ard.cache_stats.return_value = {
+        "redux": CacheInfo(hits=5, misses=2, maxsize=10, currsize=2, evictions=1)
+    }
+    other_ard = Mock()
+    other_ard.cache_stats.return_value = {
+        "redux": CacheInfo(hits=1, misses=0, maxsize=10, currsize=0, evictions=0)
+    }
+    text = metrics.expose([], {"3580": ard, "3560": other_ard})
+    assert 'pyard_cache_hits_total{ipd_version="3580",cache="redux"} 5\n' in text
+    assert 'pyard_cache_misses_total{ipd_version="3580",cache="redux"} 2\n' in text
+    assert 'pyard_cache_evictions_total{ipd_version="3580",cache="redux"} 1\n' in text
+    assert 'pyard_cache_size{ipd_version="3580",cache="redux"} 2\n' in text
+    assert 'pyard_cache_hits_total{ipd_version="3560",cache="redux"} 1\n' in text
+    assert "# TYPE pyard_db_queries_total counter\n" in text
+
+
+def test_db_query_counts():
+    connection = sqlite3.connect(":memory:")
+    before = db.query_counts["get_user_version"]
+    db.get_user_version(connection)
+    db.get_user_version(connection)
+    assert db.query_counts["get_user_version"] == before + 2
+    text = "".join(metrics.ard_metrics({"3580": Mock(cache_stats=dict)}))
+    assert f'pyard_db_queries_total{{function="get_user_version"}} {before + 2}' in text
+
+
+def test_db_query_counts_concurrent_lookups():
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    before = db.get_query_counts().get("get_user_version", 0)
+
+    def lookups():
+        for _ in range(1000):
+            db.get_user_version(connection)
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db.get_query_counts()["get_user_version"] == before + 4000
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pyard
+from pyard.persistent_cache import PersistentCache, persistent_cache_filename
+
+
+def test_persistent_cache_filename():
+    assert (
+        persistent_cache_filename("/tmp/py-ard/pyard-3440.sqlite3", "2.3.1")
+        == "/tmp/py-ard/pyard-3440-cache-2.3.1.sqlite3"
+    )
+    assert persistent_cache_filename("/tmp/py-ard/pyard-3440.sqlite3").endswith(
+        f"-cache-{pyard.__version__}.sqlite3"
+    )
+
+
+def test_get_put(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite3"), "3440", "abc")
+    assert cache.get("A*01:01:01", "lgx") is None
+    cache.put("A*01:01:01", "lgx", "A*01:01")
+    # Pending results are readable before they are written
+    assert cache.get("A*01:01:01", "lgx") == "A*01:01"
+    assert cache.get("A*01:01:01", "G") is None
+    assert cache.count() == 1
+    cache.close()
+
+
+def test_shared_across_instances(tmp_path):
+    filename = str(tmp_path / "cache.sqlite3")
+    writer = PersistentCache(filename, "3440", "abc", flush_size=2)
+    writer.put("A*01:01:01", "lgx", "A*01:01")
+    writer.put("A*02:01:01", "lgx", "A*02:01")
+    # Flushed after flush_size results
+    reader = PersistentCache(filename, "3440", "abc")
+    assert reader.get("A*02:01:01", "lgx") == "A*02:01"
+    writer.put("A*03:01:01", "lgx", "A*03:01")
+    writer.close()
+    assert reader.get("A*03:01:01", "lgx") == "A*03:01"
+    reader.close()
+
+
+def test_keyed_by_config(tmp_path):
+    filename = str(tmp_path / "cache.sqlite3")
+    cache = PersistentCache(filename, "3440", "abc")
+    cache.put("A*01:01:01", "lgx", "A*01:01")
+    cache.close()
+
+    other_config = PersistentCache(filename, "3440", "def")
+    assert other_config.get("A*01:01:01", "lgx") is None
+    other_config.close()
+
+
+def test_keyed_by_imgt_version(tmp_path):
+    filename = str(tmp_path / "cache.sqlite3")
+    cache = PersistentCache(filename, "3440", "abc")
+    cache.put("A*01:01:01", "lgx", "A*01:01")
+    cache.close()
+
+    new_version = PersistentCache(filename, "3450", "abc")
+    assert new_version.get("A*01:01:01", "lgx") is None
+    new_version.close()
+
+    old_version = PersistentCache(filename, "3440", "abc")
+    assert old_version.get("A*01:01:01", "lgx") == "A*01:01"
+    old_version.close()
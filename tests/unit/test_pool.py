@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import threading
+import time
+import weakref
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import pyard
+from pyard.pool import ARDPool, VersionNotAvailableError, deep_sizeof, share_mappings
+from pyard.serology import SerologyMapping
+
+Groups = namedtuple("Groups", ["g_group", "p_group"])
+
+
+def allele(*fields):
+    # A new string object each time, like the ones loaded from a snapshot
+    return "A*" + ":".join(fields)
+
+
+def mappings(p_allele="01"):
+    return {
+        "groups": Groups(
+            {allele("01", "01", "01"): allele("01", "01", "01G")},
+            {allele("01", "01", "01"): allele("01", p_allele, "P")},
+        ),
+        "serology_mapping": SerologyMapping({"A9": ["A23", "A24"]}, {}),
+        "shortnulls": {allele("01", "01N"): [allele("01", "01", "01N")]},
+    }
+
+
+def test_share_mappings_reuses_equal_mappings():
+    other = mappings()
+    shared = share_mappings(mappings(), [other])
+    assert shared["groups"].g_group is other["groups"].g_group
+    assert shared["groups"].p_group is other["groups"].p_group
+    assert shared["shortnulls"] is other["shortnulls"]
+    assert (
+        shared["serology_mapping"].broad_splits_map
+        is other["serology_mapping"].broad_splits_map
+    )
+    assert isinstance(shared["groups"], Groups)
+
+
+def test_share_mappings_interns_the_names_of_other_mappings():
+    other = mappings()
+    shared = share_mappings(mappings(p_allele="02"), [other])
+    assert shared["groups"].g_group is other["groups"].g_group
+    assert shared["groups"].p_group is not other["groups"].p_group
+    assert shared["groups"].p_group == {"A*01:01:01": "A*01:02:P"}
+    shared_key = next(iter(shared["groups"].p_group))
+    assert shared_key is next(iter(share_mappings(mappings(), [])["groups"].p_group))
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    mapping = {allele("01", str(i)): [allele("01", str(i), "01")] for i in range(10)}
+    seen = set()
+    size = deep_sizeof(mapping, seen)
+    assert size > 0
+    assert deep_sizeof({"copy": mapping}, seen) < size
+    assert deep_sizeof(mapping, seen) == 0
+
+
+class FakeARD:
+    def __init__(self, imgt_version, **kwargs):
+        self.imgt_version = "3580" if imgt_version == "Latest" else imgt_version
+        self.kwargs = kwargs
+        self.g_group = {allele("01", str(i)): allele("01", "01G") for i in range(10)}
+        self.allele_redux = {}
+        self.allele_ids = None
+        self.allele_prefix_index = None
+        self.mac_handler = SimpleNamespace(mac_codes=None)
+        self._mac_prefix_index = None
+        self.shared_with = None
+        self.weakened = False
+
+    def get_db_version(self):
+        return int(self.imgt_version)
+
+    def _get_mappings(self):
+        return {"g_group": self.g_group}
+
+    def share_reference_data(self, others):
+        self.shared_with = list(others)
+
+    def _weaken_back_references(self):
+        self.weakened = True
+
+    def close(self):
+        self._weaken_back_references()
+
+
+@pytest.fixture
+def fake_init():
+    with patch("pyard.init", side_effect=FakeARD) as init:
+        yield init
+
+
+def test_pool_loads_versions_on_first_use(fake_init):
+    pool = ARDPool(data_dir="/tmp/pyard")
+    default = pool.get()
+    assert pool.get(3580) is default
+    assert pool.get("3.58.0") is default
+    ard = pool.get(3560)
+    assert ard.imgt_version == "3560"
+    assert ard.kwargs == {"data_dir": "/tmp/pyard"}
+    assert ard.shared_with == [default]
+    assert pool.get("3560") is ard
+    assert pool.entry(3560) == (ard, 3560)
+    assert fake_init.call_count == 2
+    assert pool.loaded_versions() == ["3580", "3560"]
+    assert pool.loaded_ards() == {"3580": default, "3560": ard}
+
+
+def test_pool_evicts_least_recently_used_version(fake_init):
+    pool = ARDPool(max_versions=3)
+    pool.preload([3540, 3550])
+    evicted = pool.get(3550)
+    pool.get(3540)
+    pool.get(3560)
+    assert pool.loaded_versions() == ["3580", "3540", "3560"]
+    assert pool.evictions == 1
+    assert evicted.weakened
+    assert not pool.get(3540).weakened
+
+
+def test_pool_memory_budget_keeps_default_and_last_version(fake_init):
+    pool = ARDPool(memory_budget=1)
+    pool.preload([3540, 3550])
+    assert pool.loaded_versions() == ["3580", "3550"]
+    assert pool.memory_size() > 1
+
+
+def test_pool_versions(fake_init):
+    pool = ARDPool(versions=[3540])
+    pool.preload([3540])
+    with pytest.raises(VersionNotAvailableError):
+        pool.get(3550)
+    with pytest.raises(VersionNotAvailableError):
+        pool.get("next")
+    with pytest.raises(ValueError):
+        ARDPool(max_versions=0)
+
+
+def test_pool_loads_a_version_once_for_concurrent_requests(fake_init):
+    def slow_init(imgt_version, **kwargs):
+        time.sleep(0.05)
+        return FakeARD(imgt_version, **kwargs)
+
+    fake_init.side_effect = slow_init
+    pool = ARDPool()
+    ards = []
+    threads = [
+        threading.Thread(target=lambda: ards.append(pool.get(3560))) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(ard) for ard in ards}) == 1
+    assert fake_init.call_count == 1
+
+
+def test_pool_frees_evicted_versions():
+    init = pyard.init
+
+    def init_test_version(imgt_version, **kwargs):
+        # Real instances, of the database of the other tests
+        return init("3440", **kwargs)
+
+    gc.disable()
+    try:
+        with patch("pyard.init", side_effect=init_test_version):
+            pool = ARDPool("3440", max_versions=2, data_dir="/tmp/py-ard")
+            pool.get()
+            in_flight = pool.get(3450)
+            evicted = weakref.ref(in_flight)
+            assert in_flight.redux("A*01:01:01", "G") == "A*01:01:01G"
+            pool.get(3460)
+
+        assert pool.loaded_versions() == ["3440", "3460"]
+        # Still usable by the requests that got it before its eviction
+        assert in_flight.redux("A*01:01:01", "lgx") == "A*01:01"
+        # and freed by reference counting once they're done
+        del in_flight
+        assert evicted() is None
+    finally:
+        gc.enable()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from pyard.prefix_index import PrefixIndex
+from pyard.smart_sort import build_sort_ranks
+
+ALLELES = ["A*01:100", "A*01:29", "A*01:01", "A*02:01", "A*01:01:01:01", "B*01:01"]
+
+
+def test_search_prefix_in_smart_sort_order():
+    index = PrefixIndex(ALLELES, build_sort_ranks(ALLELES))
+    assert index.search("A*01") == ["A*01:01", "A*01:01:01:01", "A*01:29", "A*01:100"]
+    assert index.search("A*01:1") == ["A*01:100"]
+    assert index.search("C*") == []
+
+
+def test_search_limit():
+    index = PrefixIndex(ALLELES, build_sort_ranks(ALLELES))
+    assert index.search("A*01", limit=2) == ["A*01:01", "A*01:01:01:01"]
+    assert index.search("A*01", limit=10) == index.search("A*01")
+
+
+def test_search_without_ranks_is_lexicographic():
+    index = PrefixIndex(["AC", "AB", "B", "ABC"])
+    assert len(index) == 4
+    assert index.search("A") == ["AB", "ABC", "AC"]
+
+
+def test_search_predicate_stops_at_limit():
+    index = PrefixIndex(["AB", "ABC", "AC", "AD"])
+    checked = []
+
+    def predicate(code):
+        checked.append(code)
+        return len(code) == 2
+
+    assert index.search("A", limit=2, predicate=predicate) == ["AB", "AC"]
+    assert checked == ["AB", "ABC", "AC"]
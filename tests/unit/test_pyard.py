@@ -25,11 +25,17 @@
 
 import json
 import os
+import pickle
 
 import pytest
 import pyard
 from pyard.constants import DEFAULT_CACHE_SIZE
-from pyard.exceptions import InvalidAlleleError
+from pyard.exceptions import (
+    InvalidAlleleError,
+    InvalidTypingError,
+    LocusNotLoadedError,
+    PyArdError,
+)
 from pyard.misc import validate_reduction_type
 
 
@@ -209,3 +215,197 @@ def test_mac_is_reversible(ard):
     expanded_mac = ard.expand_mac(mac_code)
     lookup_mac = ard.lookup_mac(expanded_mac)
     assert mac_code == lookup_mac
+
+
+def test_redux_many(ard):
+    glstrings = ["A*01:01:01", "A*01:AB", "A*01:01:01", "HLA-A*01:01:01"]
+    assert ard.redux_many(glstrings, "G") == [
+        ard.redux(glstring, "G") for glstring in glstrings
+    ]
+
+
+def test_redux_many_multiple_redux_types(ard):
+    results = ard.redux_many(["A*01:01:01", "A*01:01:01"], ["G", "lgx"])
+    assert results == [{"G": "A*01:01:01G", "lgx": "A*01:01"}] * 2
+
+
+def test_redux_many_errors(ard):
+    glstrings = ["A*01:01:01", "A*99:99", "A*01:01:01"]
+    with pytest.raises(InvalidAlleleError):
+        ard.redux_many(glstrings, "lgx")
+
+    results = ard.redux_many(glstrings + ["A*01*01"], "lgx", return_errors=True)
+    assert results[0] == results[2] == "A*01:01"
+    assert isinstance(results[1], PyArdError)
+    assert isinstance(results[3], InvalidTypingError)
+
+
+def test_redux_parallel(ard):
+    glstrings = ["A*01:01:01", "A*01:AB", "B*07:02", "A*01:01:01", "HLA-A*01:01:01"]
+    assert ard.redux_parallel(glstrings, "G", workers=2, chunk_size=1) == [
+        ard.redux(glstring, "G") for glstring in glstrings
+    ]
+    assert ard.redux_parallel(glstrings, ["G", "lgx"], workers=2) == ard.redux_many(
+        glstrings, ["G", "lgx"]
+    )
+
+
+def test_invalid_typing_error_keeps_its_cause_when_pickled():
+    error = InvalidTypingError("A*01*01", cause=ValueError("too many values"))
+    unpickled = pickle.loads(pickle.dumps(error))
+    assert unpickled.message == "A*01*01"
+    assert isinstance(unpickled.cause, ValueError)
+
+
+def test_redux_parallel_errors(ard):
+    glstrings = ["A*01:01:01", "A*99:99", "A*01:01:01", "B*07:02"]
+    with pytest.raises(InvalidAlleleError):
+        ard.redux_parallel(glstrings, "lgx", workers=2)
+
+    results = ard.redux_parallel(glstrings, "lgx", workers=2, return_errors=True)
+    assert results[0] == results[2] == "A*01:01"
+    assert isinstance(results[1], InvalidAlleleError)
+    assert results[3] == "B*07:02"
+
+    # Same exception as redux_many whatever the number of workers
+    malformed = ["A*01:01:01", "A*01*01", "B*07:02"]
+    with pytest.raises(ValueError):
+        ard.redux_many(malformed, "lgx")
+    with pytest.raises(ValueError):
+        ard.redux_parallel(malformed, "lgx", workers=2, chunk_size=1)
+
+
+def test_cwd_redux_many(ard):
+    allele_lists = [
+        "B*15:01:01/B*15:01:03/B*15:04/B*15:07/B*15:26N/B*15:27",
+        "A*01:AB",
+        "B*15:01:01/B*15:01:03/B*15:04/B*15:07/B*15:26N/B*15:27",
+    ]
+    assert ard.cwd_redux_many(allele_lists) == [
+        ard.cwd_redux(allele_list) for allele_list in allele_lists
+    ]
+    assert ard.cwd_alleles["B"] == frozenset(ard.cwd_alleles["B"])
+
+
+def test_precompute_redux(ard):
+    precomputed_ard = pyard.init("3440", data_dir="/tmp/py-ard", precompute_redux=True)
+    assert "A*01:01:01" in precomputed_ard.allele_redux["G"]
+    for allele in ("A*01:01:01", "B*07:02", "A*01:AB", "HLA-A*01:01:01"):
+        for redux_type in ("G", "lg", "lgx", "U2"):
+            assert precomputed_ard.redux(allele, redux_type) == ard.redux(
+                allele, redux_type
+            )
+
+
+def test_mac_in_memory(ard):
+    mac_ard = pyard.init("3440", data_dir="/tmp/py-ard", mac_in_memory=True)
+    assert "AB" in mac_ard.mac_handler.mac_codes
+    for mac in ("A*01:AB", "HLA-A*01:AB", "B*44:AB"):
+        assert mac_ard.is_mac(mac) == ard.is_mac(mac)
+    assert mac_ard.expand_mac("A*01:AB") == ard.expand_mac("A*01:AB")
+    assert mac_ard.redux("A*01:AB", "lgx") == ard.redux("A*01:AB", "lgx")
+
+
+def test_similar_alleles(ard):
+    similar = ard.similar_alleles("A*01:9")
+    assert similar == ard.smart_sorted(similar)
+    assert all(allele.startswith("A*01:9") for allele in similar)
+    assert ard.similar_alleles("A*01:9", limit=3) == similar[:3]
+    assert ard.similar_alleles("a*01:9") == similar
+
+    similar_macs = ard.similar_alleles("A*01:A", limit=5)
+    assert len(similar_macs) == 5
+    assert all(ard.is_mac(mac) for mac in similar_macs)
+    assert ard.similar_alleles("C*99:99") is None
+
+
+def test_smart_sorted(ard):
+    alleles = ["A*02:01:01:01", "A*01:100", "A*01:29", "A*01:01:01G"]
+    assert "A*01:29" in ard.sort_ranks
+    assert ard.smart_sorted(alleles) == [
+        "A*01:01:01G",
+        "A*01:29",
+        "A*01:100",
+        "A*02:01:01:01",
+    ]
+
+
+def test_cache_stats():
+    lfu_ard = pyard.init(
+        "3440",
+        data_dir="/tmp/py-ard",
+        cache_policy="lfu",
+        gl_cache_size=10,
+        allele_cache_size=100,
+    )
+    lfu_ard.clear_caches()
+    lfu_ard.redux("A*01:01:01", "lgx")
+    lfu_ard.redux("A*01:01:01", "lgx")
+
+    stats = lfu_ard.cache_stats()
+    assert stats["redux"].maxsize == 10
+    assert stats["redux"].hits == 1
+    assert stats["redux"].misses == 1
+    assert stats["redux_allele"].maxsize == 100
+    # Each instance has its own caches
+    assert pyard.init("3440", data_dir="/tmp/py-ard").redux.cache_info().hits == 0
+
+
+def test_persistent_cache(ard):
+    cached_ard = pyard.init("3440", data_dir="/tmp/py-ard", persistent_cache=True)
+    cached_ard.persistent_cache.clear()
+    allele = "A*01:01:01"
+    assert cached_ard.redux(allele, "G") == ard.redux(allele, "G")
+    assert cached_ard.persistent_cache.get(allele, "G") == ard.redux(allele, "G")
+    cached_ard.persistent_cache.close()
+
+
+def test_snapshot(ard):
+    assert os.path.exists("/tmp/py-ard/pyard-3440.snapshot")
+    snapshot_ard = pyard.init("3440", data_dir="/tmp/py-ard")
+    db_ard = pyard.init("3440", data_dir="/tmp/py-ard", use_snapshot=False)
+    assert snapshot_ard.ars_mappings == db_ard.ars_mappings
+    assert snapshot_ard.code_mappings == db_ard.code_mappings
+    assert snapshot_ard.allele_group == db_ard.allele_group
+    assert snapshot_ard.shortnulls == db_ard.shortnulls
+    assert snapshot_ard.sort_ranks == db_ard.sort_ranks
+    assert snapshot_ard.redux("B14", "lgx") == db_ard.redux("B14", "lgx")
+
+
+def test_mapped_tables(ard):
+    mapped_ard = pyard.init("3440", data_dir="/tmp/py-ard", mapped_tables=True)
+    assert mapped_ard.ars_mappings == ard.ars_mappings
+    assert mapped_ard.code_mappings == ard.code_mappings
+    assert mapped_ard.allele_group == ard.allele_group
+    for allele in ("A*01:01:01", "B*15:01:01", "DRB1*04:01"):
+        for redux_type in ("G", "P", "lgx", "W", "exon"):
+            assert mapped_ard.redux(allele, redux_type) == ard.redux(allele, redux_type)
+
+
+def test_allele_ids(ard):
+    ids_ard = pyard.init("3440", data_dir="/tmp/py-ard", allele_ids=True)
+    assert "A*01:01:01:01" in ids_ard.allele_ids
+    assert ids_ard.ars_mappings == ard.ars_mappings
+    assert ids_ard.code_mappings == ard.code_mappings
+    for allele in ("A*01:01:01", "B*15:01:01", "DRB1*04:01"):
+        for redux_type in ("G", "P", "lgx", "W", "exon"):
+            assert ids_ard.redux(allele, redux_type) == ard.redux(allele, redux_type)
+
+
+def test_redux_column(ard):
+    alleles = ["A*01:01:01", "B*07:02:01", "A*01:01:01", "", "DRB1*04:AB"]
+    assert ard.redux_column(alleles, "G") == ard.redux_many(alleles[:3], "G") + [
+        "",
+        ard.redux("DRB1*04:AB", "G"),
+    ]
+
+
+def test_loci(ard):
+    loci_ard = pyard.init("3440", data_dir="/tmp/py-ard", config={"loci": ["A", "B"]})
+    assert all(
+        allele.startswith(("A*", "B*")) for allele in loci_ard.allele_group.alleles
+    )
+    for glstring in ("A*01:01:01", "B*15:01:01+B*07:02", "A*01:AB", "B14"):
+        assert loci_ard.redux(glstring, "lgx") == ard.redux(glstring, "lgx")
+    with pytest.raises(LocusNotLoadedError):
+        loci_ard.redux("A*01:01^DRB1*04:01", "lgx")
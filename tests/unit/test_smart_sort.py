@@ -19,7 +19,12 @@
 #    > http://www.fsf.org/licensing/licenses/lgpl.html
 #    > http://www.opensource.org/licenses/lgpl-license.php
 #
-from pyard.smart_sort import smart_sort_comparator
+from pyard.smart_sort import (
+    build_sort_ranks,
+    smart_sort_comparator,
+    smart_sort_key,
+    smart_sorted,
+)
 
 
 def test_same_comparator():
@@ -129,3 +134,60 @@ def test_serology_eq():
     serology1 = "B70"
     serology2 = "B70"
     assert smart_sort_comparator(serology1, serology2) == 0
+
+
+def test_sort_key_ignores_expression_chars():
+    assert smart_sort_key("HLA-A*01:01G") == smart_sort_key("HLA-A*01:01N")
+
+
+def test_sort_key_numeric_fields():
+    alleles = ["A*01:100", "A*01:29", "A*01:01:01:200", "A*01:01:01:39"]
+    assert sorted(alleles, key=smart_sort_key) == [
+        "A*01:01:01:39",
+        "A*01:01:01:200",
+        "A*01:29",
+        "A*01:100",
+    ]
+
+
+def test_sort_key_serology():
+    assert sorted(["Cw10", "Cw3", "Cw1"], key=smart_sort_key) == ["Cw1", "Cw3", "Cw10"]
+
+
+def test_sort_key_one_field():
+    assert sorted(["DRB1*11", "DRB1*04"], key=smart_sort_key) == ["DRB1*04", "DRB1*11"]
+
+
+def test_sorted_ignore_suffixes():
+    alleles = ["DRB4*01:01", "DRB4*01:03N", "DRB4*02:01"]
+    assert smart_sorted(alleles, ("01:03N",)) == [
+        "DRB4*01:01",
+        "DRB4*02:01",
+        "DRB4*01:03N",
+    ]
+
+
+def test_sorted_glstrings_lexicographic():
+    gls = ["A*10:01+A*11:01", "A*02:01+A*03:01"]
+    assert smart_sorted(gls) == ["A*02:01+A*03:01", "A*10:01+A*11:01"]
+
+
+def test_sort_ranks():
+    alleles = ["A*01:100", "A*01:29", "A*01:29N", "A*01:01"]
+    sort_ranks = build_sort_ranks(alleles)
+    # Alleles that sort equal share the same rank
+    assert sort_ranks["A*01:29"] == sort_ranks["A*01:29N"]
+    assert sort_ranks["A*01:01"] < sort_ranks["A*01:29"] < sort_ranks["A*01:100"]
+
+
+def test_sorted_with_ranks_matches_key():
+    alleles = [f"B*{f1:02}:{f2:02}" for f1 in range(20, 0, -1) for f2 in (100, 7, 12)]
+    sort_ranks = build_sort_ranks(alleles)
+    assert smart_sorted(alleles, sort_ranks=sort_ranks) == sorted(
+        alleles, key=smart_sort_key
+    )
+    # Names missing from the rank table fall back to the sort key
+    assert smart_sorted(["B*99:01", "B*01:01"], sort_ranks=sort_ranks) == [
+        "B*01:01",
+        "B*99:01",
+    ]
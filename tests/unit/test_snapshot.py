@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+
+from pyard.mappings import ARSMapping
+from pyard.snapshot import (
+    load_snapshot,
+    save_snapshot,
+    snapshot_filename,
+    snapshot_key,
+)
+
+MAPPINGS = {
+    "ars_mappings": ARSMapping(
+        dup_g={},
+        g_group={"A*01:01:01": "A*01:01:01G"},
+        p_group={"A*01:01:01": "A*01:01P"},
+        lgx_group={"A*01:01:01": "A*01:01"},
+        exon_group={},
+        p_not_g={},
+    ),
+    "shortnulls": {"A*01:11N": ["A*01:11N"]},
+    "sort_ranks": {"A*01:01": 0, "A*01:02": 1},
+}
+
+
+def test_snapshot_filename():
+    assert (
+        snapshot_filename("/tmp/py-ard/pyard-3440.sqlite3")
+        == "/tmp/py-ard/pyard-3440.snapshot"
+    )
+    assert (
+        snapshot_filename("/tmp/py-ard/pyard-3440.sqlite3", ["A", "B"])
+        == "/tmp/py-ard/pyard-3440-A-B.snapshot"
+    )
+
+
+def test_snapshot_key(tmp_path):
+    db_filename = tmp_path / "pyard-3440.sqlite3"
+    assert snapshot_key(str(db_filename)) is None
+
+    db_filename.write_bytes(b"tables")
+    key = snapshot_key(str(db_filename))
+    assert key == snapshot_key(str(db_filename))
+
+    # Changes when the database is written to
+    db_filename.write_bytes(b"more tables")
+    assert snapshot_key(str(db_filename)) != key
+
+
+def test_save_load(tmp_path):
+    filename = str(tmp_path / "pyard-3440.snapshot")
+    assert load_snapshot(filename, "key") is None
+
+    assert save_snapshot(filename, "key", MAPPINGS)
+    assert load_snapshot(filename, "key") == MAPPINGS
+    assert load_snapshot(filename, "other key") is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_corrupted_snapshot(tmp_path):
+    filename = tmp_path / "pyard-3440.snapshot"
+    save_snapshot(str(filename), "key", MAPPINGS)
+    data = bytearray(filename.read_bytes())
+
+    data[-1] ^= 0xFF
+    filename.write_bytes(bytes(data))
+    assert load_snapshot(str(filename), "key") is None
+
+    filename.write_bytes(bytes(data[:10]))
+    assert load_snapshot(str(filename), "key") is None
+
+
+def test_save_to_missing_directory(tmp_path):
+    filename = str(tmp_path / "missing" / "pyard-3440.snapshot")
+    assert not save_snapshot(filename, "key", MAPPINGS)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from unittest.mock import Mock
+
+import pyard
+from pyard.exceptions import InvalidAlleleError, InvalidTypingError
+from pyard.vectorized import ReduxTable, redux_column
+
+ALLELE_REDUX = {"A*01:01:01": "A*01:01", "A*01:01:02": "A*01:01", "B*07:02": "B*07:02"}
+
+
+def scalar_redux(glstring, redux_type):
+    if glstring == "A*99:99":
+        raise InvalidAlleleError(f"{glstring} is not a valid Allele")
+    if glstring == "A*01*01":
+        raise ValueError(f"{glstring} can't be parsed")
+    return f"{glstring}-{redux_type}"
+
+
+@pytest.fixture(scope="module")
+def ard():
+    return pyard.init("3440", data_dir="/tmp/py-ard", precompute_redux=True)
+
+
+@pytest.fixture
+def mock_ard():
+    """Create mock ARD instance with precomputed lgx reductions"""
+    ard = Mock()
+    ard.allele_redux = {"lgx": ALLELE_REDUX}
+    ard._redux_tables = {}
+    ard.redux = Mock(side_effect=scalar_redux)
+    return ard
+
+
+def test_redux_table_lookup():
+    table = ReduxTable(ALLELE_REDUX)
+    reduced, not_found = table.lookup(["B*07:02", "A*01:AB", "A*01:01:01"])
+
+    assert list(reduced) == ["B*07:02", None, "A*01:01"]
+    assert list(not_found) == [1]
+
+
+def test_redux_column(mock_ard):
+    alleles = ["A*01:01:01", "A*01:AB", "A*01:01:02", "", None, "A*01:AB"]
+    result = redux_column(mock_ard, alleles, "lgx")
+
+    assert result == ["A*01:01", "A*01:AB-lgx", "A*01:01", "", None, "A*01:AB-lgx"]
+    # Only the distinct value missing from the table is reduced by redux
+    mock_ard.redux.assert_called_once_with("A*01:AB", "lgx")
+    assert "lgx" in mock_ard._redux_tables
+
+
+def test_redux_column_without_precomputed_reductions(mock_ard):
+    result = redux_column(mock_ard, iter(["B*07:02", "B*07:02"]), "G")
+
+    assert result == ["B*07:02-G", "B*07:02-G"]
+    mock_ard.redux.assert_called_once_with("B*07:02", "G")
+
+
+def test_redux_column_errors(mock_ard):
+    with pytest.raises(InvalidAlleleError):
+        redux_column(mock_ard, ["B*07:02", "A*99:99"], "lgx")
+
+    result = redux_column(mock_ard, ["B*07:02", "A*99:99"], "lgx", return_errors=True)
+    assert result[0] == "B*07:02"
+    assert isinstance(result[1], InvalidAlleleError)
+
+
+def test_redux_column_malformed_typing(mock_ard):
+    with pytest.raises(ValueError):
+        redux_column(mock_ard, ["A*01*01", "B*07:02"], "lgx")
+
+    result = redux_column(mock_ard, ["A*01*01", "B*07:02"], "lgx", return_errors=True)
+    assert isinstance(result[0], InvalidTypingError)
+    assert isinstance(result[0].cause, ValueError)
+    assert result[1] == "B*07:02"
+
+
+def test_redux_column_invalid_redux_type(mock_ard):
+    with pytest.raises(ValueError):
+        redux_column(mock_ard, ["B*07:02"], "XYZ")
+
+
+def test_redux_table_lookup_with_numpy():
+    np = pytest.importorskip("numpy")
+    table = ReduxTable(ALLELE_REDUX)
+    reduced, not_found = table.lookup(
+        ["B*07:02", "A*01:AB", "A*00:01", "A*01:01:01", "Z*99:99"]
+    )
+
+    assert isinstance(reduced, np.ndarray)
+    assert list(reduced) == ["B*07:02", None, None, "A*01:01", None]
+    assert not_found == [1, 2, 4]
+
+
+def test_redux_column_series(ard):
+    pd = pytest.importorskip("pandas")
+    alleles = pd.Series(
+        ["A*01:01:01", "A*01:AB", None, "", float("nan"), "A*01:01:01", "B*07:02"],
+        index=[10, 11, 12, 13, 14, 15, 16],
+        name="typing",
+        dtype=object,
+    )
+    result = ard.redux_column(alleles, "lgx")
+
+    assert isinstance(result, pd.Series)
+    assert list(result.index) == list(alleles.index)
+    assert result.name == "typing"
+    for i in (10, 11, 15, 16):
+        assert result[i] == ard.redux(alleles[i], "lgx")
+    # Values that aren't alleles are returned unchanged
+    assert result[12] is None
+    assert result[13] == ""
+    assert pd.isna(result[14])
+
+
+def test_redux_column_array(ard):
+    np = pytest.importorskip("numpy")
+    alleles = np.array(["A*01:01:01", "A*01:AB", "A*99:99", None], dtype=object)
+    result = ard.redux_column(alleles, "G", return_errors=True)
+
+    assert isinstance(result, np.ndarray)
+    assert result.dtype == object
+    assert result[0] == ard.redux("A*01:01:01", "G")
+    # MACs aren't in the precomputed reductions
+    assert result[1] == ard.redux("A*01:AB", "G")
+    assert isinstance(result[2], InvalidAlleleError)
+    assert result[3] is None